@@ -0,0 +1,167 @@
+import os
+import logging
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+
+from analytics import summarize_intervals
+from metrics import stage
+
+# Tablas del almacén de agregados. Todas se indexan por (máquina, fecha) y cada ejecución
+# reemplaza las filas de las fechas que procesa, por lo que volver a procesar un día no duplica datos.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily (
+    machine TEXT NOT NULL,
+    date TEXT NOT NULL,
+    operation_time REAL NOT NULL,
+    motion_time REAL NOT NULL,
+    detention_time REAL NOT NULL,
+    cycles INTEGER NOT NULL,
+    intervals INTEGER NOT NULL,
+    PRIMARY KEY (machine, date)
+);
+CREATE TABLE IF NOT EXISTS intervals (
+    machine TEXT NOT NULL,
+    date TEXT NOT NULL,
+    interval_start TEXT,
+    interval_end TEXT,
+    vel REAL,
+    g_code TEXT,
+    user TEXT,
+    duration REAL,
+    cycle_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS intervals_machine_date ON intervals (machine, date);
+CREATE TABLE IF NOT EXISTS cycles (
+    machine TEXT NOT NULL,
+    date TEXT NOT NULL,
+    cycle_id INTEGER,
+    duration REAL,
+    motion_time REAL,
+    detention_time REAL,
+    gcode TEXT
+);
+CREATE INDEX IF NOT EXISTS cycles_machine_date ON cycles (machine, date);
+CREATE TABLE IF NOT EXISTS gcodes (
+    machine TEXT NOT NULL,
+    date TEXT NOT NULL,
+    gcode TEXT,
+    ncycles INTEGER,
+    average_duration REAL,
+    average_motion REAL,
+    average_detention REAL
+);
+CREATE INDEX IF NOT EXISTS gcodes_machine_date ON gcodes (machine, date);
+"""
+
+DETAIL_TABLES = ["intervals", "cycles", "gcodes"]
+
+
+def connect(db_path):
+    """Abre (y crea si no existe) la base SQLite de agregados."""
+    folder = os.path.dirname(db_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _machine_day_rows(machine, day, df_intervals):
+    """Calcula las filas de cada tabla para una máquina en un día."""
+    key = {"machine": machine, "date": day}
+    if df_intervals.empty:
+        daily = dict(key, operation_time=0.0, motion_time=0.0, detention_time=0.0, cycles=0, intervals=0)
+        return daily, {}
+
+    summary = summarize_intervals(df_intervals)
+    df_intervals = summary.df_intervals
+    daily = dict(
+        key,
+        operation_time=float(summary.operation_time),
+        motion_time=float(summary.motion_time),
+        detention_time=float(summary.detention_time),
+        cycles=int(summary.cycles),
+        intervals=len(df_intervals),
+    )
+
+    df_intervals = pd.DataFrame({
+        "interval_start": df_intervals["INTERVAL_START"].dt.strftime('%Y-%m-%d %H:%M:%S'),
+        "interval_end": df_intervals["INTERVAL_END"].dt.strftime('%Y-%m-%d %H:%M:%S'),
+        "vel": df_intervals["VEL"],
+        "g_code": df_intervals["G_CODE"],
+        "user": df_intervals["USER"],
+        "duration": df_intervals["DURATION"],
+        "cycle_id": df_intervals["CYCLE_ID"],
+    })
+    details = {
+        "intervals": df_intervals,
+        "cycles": summary.df_cycles.rename(columns={"CYCLE_ID": "cycle_id"}),
+        "gcodes": summary.df_gcodes,
+    }
+    return daily, {table: df.assign(**key) for table, df in details.items()}
+
+
+def save_daily_aggregates(db_path, dataframes_by_date, machine_names):
+    """Guarda los intervalos, ciclos, resúmenes por código G y totales de cada (máquina, fecha) procesada.
+    Las máquinas sin movimientos en la fecha se registran con totales en cero."""
+    try:
+        with stage("aggregates") as metrics, closing(connect(db_path)) as conn, conn:
+            rows = 0
+            for report_date, dfs_machines in dataframes_by_date.items():
+                day = report_date.strftime('%Y-%m-%d')
+                intervals_by_machine = {machine: df_intervals for machine, _, df_intervals in dfs_machines}
+
+                for machine in machine_names:
+                    df_intervals = intervals_by_machine.get(machine, pd.DataFrame())
+                    daily, details = _machine_day_rows(machine, day, df_intervals)
+
+                    for table in DETAIL_TABLES:
+                        conn.execute(f"DELETE FROM {table} WHERE machine = ? AND date = ?", (machine, day))
+                    conn.execute(
+                        "INSERT OR REPLACE INTO daily VALUES "
+                        "(:machine, :date, :operation_time, :motion_time, :detention_time, :cycles, :intervals)",
+                        daily
+                    )
+                    for table, df in details.items():
+                        df.to_sql(table, conn, if_exists="append", index=False)
+                        rows += len(df)
+
+            metrics["rows_out"] = rows
+        logging.info(f"Agregados diarios guardados en {db_path}")
+
+    except Exception as e:
+        logging.error(f"Error al guardar agregados diarios: {e}")
+        raise
+
+
+def load_range_summary(db_path, machine_names, start_date, end_date):
+    """Arma el resumen de un rango de fechas (inclusive) leyendo solo el almacén de agregados.
+    Devuelve {máquina: {"daily": totales por día, "gcodes": resumen por código G del rango}}."""
+    try:
+        with stage("range_summary", start=start_date, end=end_date), closing(connect(db_path)) as conn:
+            params = {"start": start_date.strftime('%Y-%m-%d'), "end": end_date.strftime('%Y-%m-%d')}
+            df_daily = pd.read_sql_query(
+                "SELECT * FROM daily WHERE date BETWEEN :start AND :end ORDER BY machine, date",
+                conn, params=params
+            )
+            # Los promedios del rango se calculan sobre los ciclos de todos los días, no como promedio de promedios
+            df_gcodes = pd.read_sql_query(
+                "SELECT machine, gcode, COUNT(*) AS ncycles, AVG(duration) AS average_duration, "
+                "AVG(motion_time) AS average_motion, AVG(detention_time) AS average_detention "
+                "FROM cycles WHERE date BETWEEN :start AND :end GROUP BY machine, gcode ORDER BY machine, gcode",
+                conn, params=params
+            )
+
+        return {
+            machine: {
+                "daily": df_daily[df_daily["machine"] == machine].reset_index(drop=True),
+                "gcodes": df_gcodes[df_gcodes["machine"] == machine].reset_index(drop=True),
+            }
+            for machine in machine_names
+        }
+
+    except Exception as e:
+        logging.error(f"Error al leer agregados del rango: {e}")
+        raise
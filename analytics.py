@@ -0,0 +1,86 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+def clean_gcodes(gcodes, undefined):
+    """Abrevia los nombres de programa (sin extensión ni sufijo de ala) en toda la columna a la vez."""
+    return (
+        gcodes.str.replace(" (ala 2.5)", "", regex=False)
+        .str.replace(".tap", "", regex=False)
+        .str.replace("No File Loaded.", undefined, regex=False)
+    )
+
+
+def prepare_intervals(df_intervals):
+    """Agrega a los intervalos la duración en minutos, la dirección del movimiento,
+    los puntos de cambio de dirección y el identificador de ciclo."""
+    df_intervals = df_intervals[['INTERVAL_START', 'INTERVAL_END', 'VEL', 'G_CODE', 'USER']].copy()
+    df_intervals['DURATION'] = (df_intervals['INTERVAL_END'] - df_intervals['INTERVAL_START']).dt.total_seconds() / 60
+    df_intervals["DURATION"] = df_intervals["DURATION"].round(3)
+
+    # Detectar puntos donde cambia la dirección
+    df_intervals['DIRECTION'] = np.sign(df_intervals['VEL'])
+    df_intervals['DIR_CHANGE'] = df_intervals['DIRECTION'].diff(2).abs() == 2
+
+    df_intervals["CYCLE_ID"] = df_intervals["DIR_CHANGE"].cumsum()
+    return df_intervals
+
+
+@dataclass
+class IntervalSummary:
+    """Indicadores de una máquina en un día, listos para mostrar (tiempos en minutos)."""
+    df_intervals: pd.DataFrame      # intervalos con DURATION, DIRECTION, DIR_CHANGE y CYCLE_ID
+    operation_time: float
+    motion_time: float
+    detention_time: float
+    cycles: int
+    df_cycles: pd.DataFrame         # CYCLE_ID, duration, motion_time, detention_time, gcode
+    df_gcodes: pd.DataFrame         # gcode, ncycles, average_duration, average_motion, average_detention
+
+
+def summarize_intervals(df_intervals):
+    """Calcula los totales del día, el detalle de cada ciclo y el resumen por código G a partir de los
+    intervalos de una máquina. La duración se separa en columnas de movimiento y detención con una
+    única máscara, de modo que cada ciclo se resume con un solo groupby sin funciones por grupo."""
+    df_intervals = prepare_intervals(df_intervals)
+
+    duration = df_intervals['DURATION'].to_numpy()
+    moving = df_intervals['VEL'].to_numpy() != 0
+
+    df_split = pd.DataFrame({
+        'CYCLE_ID': df_intervals['CYCLE_ID'].to_numpy(),
+        'duration': duration,
+        'motion_time': np.where(moving, duration, 0.0),
+        'detention_time': np.where(moving, 0.0, duration),
+        'gcode': df_intervals['G_CODE'].to_numpy(),
+    })
+
+    df_cycles = (
+        df_split.groupby('CYCLE_ID')
+        .agg(duration=('duration', 'sum'), motion_time=('motion_time', 'sum'),
+             detention_time=('detention_time', 'sum'), gcode=('gcode', 'first'))
+        .reset_index()
+    )
+
+    df_gcodes = (
+        df_cycles.groupby('gcode')
+        .agg(
+            ncycles=('CYCLE_ID', 'count'),
+            average_duration=('duration', 'mean'),
+            average_motion=('motion_time', 'mean'),
+            average_detention=('detention_time', 'mean'),
+        )
+        .reset_index()
+    )
+
+    return IntervalSummary(
+        df_intervals=df_intervals,
+        operation_time=df_split['duration'].sum(),
+        motion_time=df_split['motion_time'].sum(),
+        detention_time=df_split['detention_time'].sum(),
+        cycles=len(df_cycles),
+        df_cycles=df_cycles,
+        df_gcodes=df_gcodes,
+    )
@@ -0,0 +1,187 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Módulos cuyo código determina cada tipo de artefacto: si cambian, las entradas anteriores dejan de usarse
+SEGMENT_MODULES = ["schema.py", "segmentation.py", "process_data.py"]
+REPORT_MODULES = ["analytics.py", "generate_report.py"]
+
+# Tamaño máximo por defecto del caché (MB)
+CACHE_MAX_MB = 1024
+
+SEGMENTS_FILE = "segments.pkl"
+REPORT_FILE = "report.pdf"
+BREAKDOWN_FILE = "desglose.csv"
+
+
+def code_version(modules):
+    """Hash del código fuente de los módulos indicados."""
+    digest = hashlib.sha256()
+    for module in modules:
+        with open(os.path.join(BASE_DIR, module), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def rows_hash(df):
+    """Hash del contenido de un DataFrame de eventos (valores de sus filas en orden, sin el índice)."""
+    digest = hashlib.sha256(",".join(df.columns).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _key(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ArtifactCache:
+    """Caché de artefactos direccionado por contenido: los intervalos procesados de cada fecha se guardan
+    con una clave calculada a partir de los registros de esa fecha, la lista de máquinas y la versión del
+    código, y el PDF con la clave de sus intervalos y las opciones del reporte. Una nueva ejecución sobre
+    los mismos datos reutiliza los artefactos y solo se recalculan las fechas nuevas o modificadas.
+
+    Cada entrada se escribe en una carpeta temporal que luego se renombra, por lo que una ejecución
+    interrumpida nunca deja entradas incompletas. Al superar max_mb se eliminan las entradas usadas
+    hace más tiempo."""
+
+    def __init__(self, cache_dir, max_mb=CACHE_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_mb * 2**20
+        self.segment_version = code_version(SEGMENT_MODULES)
+        self.report_version = code_version(REPORT_MODULES)
+        # Clave de los intervalos de cada fecha procesada en la ejecución (para las claves de los PDF)
+        self.date_keys = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # Carpetas temporales de ejecuciones interrumpidas
+        for name in os.listdir(cache_dir):
+            if name.startswith("tmp-"):
+                shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+
+    def __getstate__(self):
+        # Al enviarse a otro proceso se copian las claves de las fechas, que otro hilo puede estar agregando
+        state = self.__dict__.copy()
+        state["date_keys"] = dict(self.date_keys)
+        return state
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _get(self, key):
+        """Carpeta de la entrada si existe (marcándola como usada recientemente), o None."""
+        entry_dir = self._entry_dir(key)
+        try:
+            os.utime(entry_dir)
+        except FileNotFoundError:
+            return None
+        return entry_dir
+
+    def _put(self, key, write):
+        """Crea la entrada llamando a write(carpeta_temporal) y la publica con un renombrado atómico."""
+        entry_dir = self._entry_dir(key)
+        os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix="tmp-", dir=self.cache_dir)
+        try:
+            write(tmp_dir)
+            os.replace(tmp_dir, entry_dir)
+        except OSError:
+            # Otra ejecución publicó la misma entrada (mismo contenido) o no se pudo escribir
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        # El artefacto ya se generó: una falla al desalojar no debe hacer fallar a quien lo guarda
+        try:
+            self.evict()
+        except OSError as e:
+            logging.warning(f"Error al desalojar entradas del caché: {e}")
+
+    # --- Intervalos procesados ---
+
+    def segments_key(self, report_date, machine_names, groups):
+        """Clave de los intervalos de una fecha. groups son los eventos de la fecha por máquina."""
+        day = pd.Timestamp(report_date)
+        rows = {machine: rows_hash(groups[(day, machine)]) for machine in machine_names if (day, machine) in groups}
+        key = _key("segments", self.segment_version, report_date.strftime('%Y-%m-%d'), list(machine_names), rows)
+        self.date_keys[report_date] = key
+        return key
+
+    def load_segments(self, key):
+        """Devuelve la lista [máquina, eventos, intervalos] guardada, o None si no está en el caché."""
+        entry_dir = self._get(key)
+        if entry_dir is None:
+            return None
+        try:
+            return pd.read_pickle(os.path.join(entry_dir, SEGMENTS_FILE))
+        except FileNotFoundError:
+            # Otro proceso la desalojó mientras se leía
+            return None
+
+    def store_segments(self, key, dfs_machines):
+        self._put(key, lambda tmp_dir: pd.to_pickle(dfs_machines, os.path.join(tmp_dir, SEGMENTS_FILE)))
+
+    # --- Reportes PDF ---
+
+    def report_key(self, report_date, report_options):
+        """Clave del PDF de una fecha, o None si la fecha no se procesó con el caché en esta ejecución."""
+        if report_date not in self.date_keys:
+            return None
+        return _key("report", self.report_version, self.date_keys[report_date], report_options)
+
+    def restore_report(self, key, report_file, breakdown_file):
+        """Copia el PDF (y su desglose en CSV, si lo tiene) guardado a report_file. Devuelve True si estaba."""
+        entry_dir = self._get(key) if key is not None else None
+        if entry_dir is None:
+            return False
+        try:
+            shutil.copyfile(os.path.join(entry_dir, REPORT_FILE), report_file)
+            if os.path.exists(os.path.join(entry_dir, BREAKDOWN_FILE)):
+                shutil.copyfile(os.path.join(entry_dir, BREAKDOWN_FILE), breakdown_file)
+            elif os.path.exists(breakdown_file):
+                os.remove(breakdown_file)
+        except FileNotFoundError:
+            # Otro proceso la desalojó mientras se copiaba
+            return False
+        return True
+
+    def store_report(self, key, report_file, breakdown_file):
+        def write(tmp_dir):
+            shutil.copyfile(report_file, os.path.join(tmp_dir, REPORT_FILE))
+            if os.path.exists(breakdown_file):
+                shutil.copyfile(breakdown_file, os.path.join(tmp_dir, BREAKDOWN_FILE))
+
+        if key is not None:
+            self._put(key, write)
+
+    # --- Desalojo ---
+
+    def evict(self):
+        """Elimina las entradas usadas hace más tiempo hasta que el caché no supere el tamaño máximo."""
+        entries = []
+        total = 0
+        for prefix in os.listdir(self.cache_dir):
+            prefix_dir = os.path.join(self.cache_dir, prefix)
+            if prefix.startswith("tmp-") or not os.path.isdir(prefix_dir):
+                continue
+            for key in os.listdir(prefix_dir):
+                entry_dir = os.path.join(prefix_dir, key)
+                try:
+                    size = sum(entry.stat().st_size for entry in os.scandir(entry_dir))
+                    mtime = os.path.getmtime(entry_dir)
+                except FileNotFoundError:
+                    # Otro proceso del pool la desalojó durante el recorrido
+                    continue
+                entries.append((mtime, size, entry_dir))
+                total += size
+
+        for _, size, entry_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            logging.info(f"Entrada del caché desalojada: {os.path.basename(entry_dir)}")
@@ -0,0 +1,79 @@
+"""Benchmark de la descarga de varios sitios con el Drive falso de tests/fake_drive.py.
+
+Compara la descarga de varios archivos uno tras otro con la descarga simultánea de download_csv_files.
+
+Uso:
+    python -m benchmarks.fake_drive --sites 4 --mb 20 --latency 0.2 --workers 4
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+from download_data import DOWNLOAD_CHUNK_MB, download_csv_from_gdrive, download_csv_files
+from tests.fake_drive import FakeDriveService
+
+
+def run_downloads(sites=4, size_mb=20, latency=0.2, workers=4, chunk_mb=DOWNLOAD_CHUNK_MB):
+    """Descarga sites archivos de size_mb MB desde el Drive falso, uno tras otro y luego en simultáneo
+    con download_csv_files, y devuelve los tiempos de cada modo."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = {}
+        for i in range(sites):
+            path = os.path.join(tmp_dir, f"remoto_{i}.csv")
+            with open(path, "wb") as f:
+                f.write(os.urandom(size_mb * 2**20))
+            files[f"file_{i}"] = path
+        service = FakeDriveService(files, latency=latency)
+
+        def destinations(mode):
+            return [(file_id, os.path.join(tmp_dir, f"{mode}_{file_id}.csv")) for file_id in files]
+
+        start = time.perf_counter()
+        for file_id, dest_path in destinations("secuencial"):
+            download_csv_from_gdrive(file_id, dest_path, None, service=service, chunk_mb=chunk_mb)
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = download_csv_files(destinations("paralelo"), None, workers, service=service, chunk_mb=chunk_mb)
+        concurrent = time.perf_counter() - start
+
+        errors = [str(result) for result in results.values() if isinstance(result, Exception)]
+        identical = all(
+            _same_content(files[file_id], dest_path) for file_id, dest_path in destinations("paralelo")
+        )
+
+    return {
+        "sites": sites,
+        "size_mb": size_mb,
+        "latency_s": latency,
+        "chunk_mb": chunk_mb,
+        "workers": workers,
+        "sequential_s": round(sequential, 4),
+        "concurrent_s": round(concurrent, 4),
+        "identical": identical,
+        "errors": errors,
+    }
+
+
+def _same_content(path_a, path_b):
+    with open(path_a, "rb") as a, open(path_b, "rb") as b:
+        return a.read() == b.read()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de la descarga de varios sitios con un Drive falso")
+    parser.add_argument("--sites", type=int, default=4)
+    parser.add_argument("--mb", type=int, default=20, help="tamaño de cada archivo (MB)")
+    parser.add_argument("--latency", type=float, default=0.2, help="segundos de espera por pedido")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-mb", type=int, default=DOWNLOAD_CHUNK_MB,
+                        help="tamaño de cada parte de la descarga (MB)")
+    args = parser.parse_args()
+
+    result = run_downloads(args.sites, args.mb, args.latency, args.workers, args.chunk_mb)
+    print(json.dumps(result, indent=2))
+    if result["errors"] or not result["identical"]:
+        sys.exit("Las descargas en simultáneo no coinciden con los archivos remotos")
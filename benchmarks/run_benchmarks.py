@@ -0,0 +1,233 @@
+"""Benchmark por etapas del pipeline: ingesta, compactación, segmentación, ciclos, gráficos y armado del PDF.
+
+Genera datos sintéticos (o usa un CSV existente), mide cada etapa por separado (tiempo de reloj,
+tiempo de CPU y pico de memoria asignada) y guarda los resultados en JSON para comparar versiones.
+
+Uso:
+    python -m benchmarks.run_benchmarks --machines 3 --days 2
+    python -m benchmarks.run_benchmarks --idle-interval 1
+    python -m benchmarks.run_benchmarks --csv data/input_file_example.csv --compare benchmarks/results/anterior.json
+"""
+import os
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import subprocess
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_data import generate_events, write_events_csv
+from schema import read_events_csv
+from event_store import update_event_store
+from csv_index import update_csv_index, read_csv_dates
+from process_data import EXCLUDED_USERS, process_events_range
+from segmentation import compact_events, segment_events
+from analytics import summarize_intervals
+from generate_report import render_machine_chart, generate_pdf_report
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def measure(stage, func, *args, repeat=1, **kwargs):
+    """Ejecuta func repeat veces y devuelve su resultado junto con el mejor tiempo de reloj y de CPU.
+    El pico de memoria se mide en una ejecución adicional con tracemalloc (que agrega sobrecarga)."""
+    wall_times, cpu_times = [], []
+    for _ in range(repeat):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        result = func(*args, **kwargs)
+        wall_times.append(time.perf_counter() - wall_start)
+        cpu_times.append(time.process_time() - cpu_start)
+
+    tracemalloc.start()
+    func(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, {
+        "stage": stage,
+        "wall_s": round(min(wall_times), 4),
+        "cpu_s": round(min(cpu_times), 4),
+        "peak_mb": round(peak / 2**20, 2),
+    }
+
+
+def _for_each_machine(func, dataframes_by_date):
+    """Aplica func a cada (eventos, intervalos) no vacío de todas las fechas."""
+    return [
+        func(df_events, df_intervals)
+        for dfs_machines in dataframes_by_date.values()
+        for _, df_events, df_intervals in dfs_machines
+        if not df_intervals.empty
+    ]
+
+
+def _machine_groups(df):
+    """Eventos ordenados y filtrados de cada (fecha, máquina), como los recibe la segmentación."""
+    df = df[~df['USER'].isin(EXCLUDED_USERS)]
+    return [
+        df_machine.sort_values('DATE_TIME', kind='stable')
+        for _, df_machine in df.groupby([df['DATE_TIME'].dt.date, 'MACHINE'], observed=True, sort=True)
+    ]
+
+
+def _compact_all(groups):
+    return [compact_events(df_machine) for df_machine in groups]
+
+
+def _segment_all(df, machines, report_dates, jobs=1):
+    return process_events_range(df, machines, report_dates, jobs=jobs)
+
+
+def _build_pdfs(dataframes_by_date, charts, out_dir):
+    for report_date, dfs_machines in dataframes_by_date.items():
+        if dfs_machines:
+            report_file = os.path.join(out_dir, f"bench_{report_date}.pdf")
+            generate_pdf_report(dfs_machines, report_file, report_date, charts=charts.get(report_date))
+
+
+def _versions():
+    versions = {"python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__}
+    for module in ["matplotlib", "reportlab", "pyarrow"]:
+        try:
+            versions[module] = __import__(module).__version__
+        except ImportError:
+            pass
+    try:
+        versions["git_commit"] = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return versions
+
+
+def run_benchmarks(csv_path, repeat=1, jobs=1):
+    """Mide cada etapa del pipeline sobre el CSV indicado y devuelve la lista de resultados."""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Ingesta: lectura completa del CSV e incorporación al almacén de eventos
+        df, result = measure("ingest_csv", read_events_csv, csv_path, repeat=repeat)
+        result["rows"] = len(df)
+        result["frame_mb"] = round(df.memory_usage(deep=True).sum() / 2**20, 2)
+        results.append(result)
+
+        store_dirs = iter(os.path.join(tmp_dir, f"store_{i}") for i in range(repeat + 1))
+        _, result = measure("ingest_store", lambda: update_event_store(csv_path, next(store_dirs)), repeat=repeat)
+        results.append(result)
+
+        machines = {'machine_name': sorted(df['MACHINE'].unique().tolist())}
+        report_dates = sorted(df['DATE_TIME'].dt.date.unique())
+
+        # Índice de rangos de bytes por fecha y lectura de un único día (el último) con el índice
+        index_path = os.path.join(tmp_dir, "indexed.csv")
+        shutil.copyfile(csv_path, index_path)
+        _, result = measure("csv_index", update_csv_index, index_path)
+        results.append(result)
+        day_df, result = measure("ingest_csv_day", read_csv_dates, index_path, report_dates[-1:], repeat=repeat)
+        result["rows"] = len(day_df)
+        results.append(result)
+
+        # Compactación de los registros repetidos de cada (fecha, máquina) y verificación de que los
+        # intervalos agrupados son los mismos que sin compactar
+        groups = _machine_groups(df)
+        compacted, result = measure("compaction", _compact_all, groups, repeat=repeat)
+        rows_in = sum(len(df_machine) for df_machine in groups)
+        rows_out = sum(len(df_machine) for df_machine in compacted)
+        result["rows_in"] = rows_in
+        result["rows_out"] = rows_out
+        result["compaction_ratio"] = round(rows_in / rows_out, 3) if rows_out else 1.0
+        result["intervals_equal"] = all(
+            segment_events(raw)[1].equals(segment_events(compact)[1]) for raw, compact in zip(groups, compacted)
+        )
+        results.append(result)
+
+        # Segmentación de todas las (fecha, máquina)
+        dataframes_by_date, result = measure(
+            "segmentation", _segment_all, df, machines, report_dates, jobs=jobs, repeat=repeat
+        )
+        result["intervals"] = sum(len(i) for dfs in dataframes_by_date.values() for _, _, i in dfs)
+        result["jobs"] = jobs
+        results.append(result)
+
+        # Ciclos por cambio de dirección, totales y resumen por código G
+        _, result = measure(
+            "cycles", _for_each_machine, lambda e, i: summarize_intervals(i), dataframes_by_date, repeat=repeat
+        )
+        results.append(result)
+
+        # Gráficos de cada máquina
+        _, result = measure("chart", _for_each_machine, render_machine_chart, dataframes_by_date, repeat=repeat)
+        results.append(result)
+
+        # Armado de los PDF con los gráficos ya generados
+        charts = {
+            report_date: {
+                machine: render_machine_chart(df_events, df_intervals)
+                for machine, df_events, df_intervals in dfs_machines if not df_intervals.empty
+            }
+            for report_date, dfs_machines in dataframes_by_date.items()
+        }
+        _, result = measure("pdf_build", _build_pdfs, dataframes_by_date, charts, tmp_dir, repeat=repeat)
+        results.append(result)
+
+    return results
+
+
+def compare_results(results, previous_path):
+    """Muestra la relación de tiempos de cada etapa contra una corrida anterior."""
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = {r["stage"]: r for r in json.load(f)["stages"]}
+    for result in results:
+        before = previous.get(result["stage"])
+        if before and before["wall_s"] > 0:
+            print(f"{result['stage']:>14}: {before['wall_s']:.4f}s -> {result['wall_s']:.4f}s "
+                  f"(x{result['wall_s'] / before['wall_s']:.2f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark por etapas del reporte diario")
+    parser.add_argument("--csv", help="CSV a utilizar (por defecto se generan datos sintéticos)")
+    parser.add_argument("--machines", type=int, default=3)
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--rate", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--idle-interval", type=float, default=0,
+                        help="segundos entre registros repetidos durante las detenciones (0 = sin repetidos)")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--jobs", type=int, default=1, help="procesos para la segmentación")
+    parser.add_argument("--output", help="archivo JSON de resultados")
+    parser.add_argument("--compare", help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args()
+
+    params = vars(args).copy()
+    with tempfile.TemporaryDirectory() as data_dir:
+        csv_path = args.csv
+        if csv_path is None:
+            csv_path = os.path.join(data_dir, "synthetic.csv")
+            write_events_csv(generate_events(
+                args.machines, args.days, rate=args.rate, seed=args.seed, idle_interval=args.idle_interval
+            ), csv_path)
+        stages = run_benchmarks(csv_path, repeat=args.repeat, jobs=args.jobs)
+
+    for stage in stages:
+        print(json.dumps(stage))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "params": params,
+            "versions": _versions(),
+            "stages": stages,
+        }, f, indent=2)
+    print(f"Resultados guardados en {output}")
+
+    if args.compare:
+        compare_results(stages, args.compare)
@@ -0,0 +1,92 @@
+"""Benchmark del arranque de main.py cuando no hay reportes pendientes (el caso más frecuente).
+
+Ejecuta main.py en una carpeta temporal con una configuración sin fechas pendientes, mide el tiempo
+total del proceso y, con `python -X importtime`, el costo de importación de cada módulo. También
+verifica que no se carguen las librerías pesadas del pipeline.
+
+Uso:
+    python -m benchmarks.startup --repeat 5
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from datetime import date, timedelta
+
+import yaml
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Librerías que no deberían importarse en una ejecución sin reportes pendientes
+HEAVY_MODULES = ["pandas", "numpy", "pyarrow", "matplotlib", "reportlab", "googleapiclient"]
+
+
+def _prepare_workdir(work_dir):
+    """Copia main.py y arma una configuración cuya última fecha de reporte es ayer (nada pendiente)."""
+    shutil.copy(os.path.join(BASE_DIR, "main.py"), work_dir)
+    with open(os.path.join(BASE_DIR, "config_example.yaml"), "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+
+    today = date.today()
+    config["last_report_date"] = (today - timedelta(days=1)).strftime('%Y-%m-%d')
+    with open(os.path.join(work_dir, "config.yaml"), "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f, default_flow_style=False, allow_unicode=True)
+    with open(os.path.join(work_dir, config["paths"]["last_sync_file_path"]), "w") as f:
+        f.write(today.strftime('%Y-%m-%d'))
+
+
+def parse_importtime(stderr):
+    """Convierte la salida de -X importtime en una lista de (módulo, propio_us, acumulado_us, nivel)."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        level = (len(name) - len(name.lstrip())) // 2
+        imports.append((name.strip(), int(self_us), int(cumulative_us), level))
+    return imports
+
+
+def run_startup(repeat=5):
+    """Ejecuta main.py repeat veces y devuelve el mejor tiempo total y el detalle de importaciones."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        _prepare_workdir(work_dir)
+        env = dict(os.environ, PYTHONPATH=BASE_DIR)
+
+        wall_times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "main.py"], cwd=work_dir, env=env, check=True)
+            wall_times.append(time.perf_counter() - start)
+
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "main.py"],
+            cwd=work_dir, env=env, check=True, capture_output=True, text=True
+        )
+
+    imports = parse_importtime(process.stderr)
+    top_level = sorted((i for i in imports if i[3] == 0), key=lambda i: i[2], reverse=True)
+    loaded = {name.split(".")[0] for name, *_ in imports}
+
+    return {
+        "wall_s": round(min(wall_times), 4),
+        "import_s": round(sum(i[2] for i in top_level) / 1e6, 4),
+        "modules": len(imports),
+        "top_imports": [{"module": name, "cumulative_ms": round(cum / 1000, 1)} for name, _, cum, _ in top_level[:10]],
+        "heavy_loaded": [module for module in HEAVY_MODULES if module in loaded],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del arranque sin reportes pendientes")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    result = run_startup(repeat=args.repeat)
+    print(json.dumps(result, indent=2))
+    if result["heavy_loaded"]:
+        sys.exit(f"Se importaron librerías pesadas sin reportes pendientes: {result['heavy_loaded']}")
@@ -0,0 +1,145 @@
+"""Generador de eventos sintéticos con el mismo esquema de 7 columnas del CSV de la ETL.
+
+Uso:
+    python -m benchmarks.synthetic_data --machines 5 --days 7 --rate 1.0 --output data/synthetic.csv
+    python -m benchmarks.synthetic_data --idle-interval 2 --output data/synthetic_repetido.csv
+"""
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+
+COLUMNS = ['DATE_TIME', 'G-CODE', 'X_POS', 'Y_POS', 'FRO', 'USER', 'MACHINE']
+
+GCODES = ["PIEZA N50.tap", "PIEZA N60.tap", "PIEZA N70 (ala 2.5).tap", "PIEZA N80.tap"]
+NO_FILE_LOADED = "No File Loaded."
+USERS = ["Juan Perez", "Carlos Díaz", "Ana Gómez", "Lucía Fernández"]
+ADMIN_USERS = ["ADMIN", "Pc-Corte-1"]
+FRO_VALUES = [80.0, 90.0, 100.0, 120.0, 160.0]
+
+# Jornada de trabajo (segundos desde el inicio del día)
+SHIFT_START = 7 * 3600 + 30 * 60
+SHIFT_END = 16 * 3600
+
+
+def _pass(rng, t, x, y, x_target, rate):
+    """Genera una pasada de corte desde x hasta x_target. Devuelve tiempos, posiciones y el tiempo final."""
+    speed = rng.uniform(12, 25)
+    duration = abs(x_target - x) / speed
+    # Eventos cada 1 o 2 segundos (rate=1) o más espaciados si rate < 1
+    steps = rng.choice([1, 1, 1, 2], size=max(int(duration * rate), 2)) / rate
+    times = t + np.cumsum(steps)
+    xs = np.linspace(x, x_target, len(times)) + rng.normal(0, 0.5, len(times))
+    ys = np.full(len(times), y) + rng.normal(0, 0.05, len(times))
+    return times, np.round(xs, 3), np.round(ys, 3), times[-1]
+
+
+def _idle_times(t_from, t_to, interval):
+    """Tiempos de los registros que la ETL repite cada interval segundos mientras la máquina está detenida."""
+    if not interval:
+        return np.array([])
+    return np.arange(t_from + interval, t_to, interval)
+
+
+def generate_machine_day(rng, day, machine, user, rate=1.0, idle_interval=0):
+    """Genera los eventos de una máquina durante una jornada: ciclos de ida y vuelta en X,
+    detenciones cortas y largas, cambios de programa y de FRO y registros de usuarios administradores.
+    Con idle_interval > 0, durante las detenciones se repite el último registro cada idle_interval segundos."""
+    times, xs, ys, gcodes, fros = [], [], [], [], []
+
+    def repeat_last(t_from, t_to):
+        idle = _idle_times(t_from, t_to, idle_interval)
+        if len(idle) and times:
+            times.append(idle)
+            xs.append(np.full(len(idle), xs[-1][-1]))
+            ys.append(np.full(len(idle), ys[-1][-1]))
+            gcodes.append([gcodes[-1][-1]] * len(idle))
+            fros.append([fros[-1][-1]] * len(idle))
+
+    t = SHIFT_START + rng.uniform(0, 1800)
+    x, y = 0.0, 0.0
+    gcode = NO_FILE_LOADED
+    fro = 100.0
+
+    while t < SHIFT_END:
+        # Cambio de trabajo: detención larga, nuevo programa y nuevo FRO
+        if gcode == NO_FILE_LOADED or rng.random() < 0.05:
+            stop = rng.uniform(60, 900)
+            repeat_last(t, t + stop)
+            t += stop
+            times.append(np.array([t]))
+            xs.append(np.array([0.0]))
+            ys.append(np.array([0.0]))
+            gcodes.append([NO_FILE_LOADED])
+            fros.append([fro])
+            gcode = str(rng.choice(GCODES))
+            fro = float(rng.choice(FRO_VALUES))
+            x, y = rng.uniform(-500, 500), rng.uniform(-20, 20)
+
+        # Ciclo: ida y vuelta en X con un pequeño avance en Y
+        for x_target in [rng.uniform(2000, 4000), rng.uniform(-500, 500)]:
+            p_times, p_xs, p_ys, t = _pass(rng, t, x, y, x_target, rate)
+            times.append(p_times)
+            xs.append(p_xs)
+            ys.append(p_ys)
+            gcodes.append([gcode] * len(p_times))
+            fros.append([fro] * len(p_times))
+            x = x_target
+            # Detención corta entre pasadas
+            stop = rng.choice([rng.uniform(1, 3), rng.uniform(5, 60)])
+            repeat_last(t, t + stop)
+            t += stop
+        y = min(y + rng.uniform(5, 15), 4000)
+
+    df = pd.DataFrame({
+        'DATE_TIME': pd.Timestamp(day) + pd.to_timedelta(np.floor(np.concatenate(times)), unit='s'),
+        'G-CODE': np.concatenate([np.asarray(g, dtype=object) for g in gcodes]),
+        'X_POS': np.concatenate(xs),
+        'Y_POS': np.concatenate(ys),
+        'FRO': np.concatenate([np.asarray(f, dtype=float) for f in fros]),
+        'USER': user,
+        'MACHINE': machine,
+    })
+    df = df[df['DATE_TIME'] < pd.Timestamp(day) + pd.Timedelta(days=1)]
+
+    # Registros de usuarios administradores intercalados
+    admin = rng.random(len(df)) < 0.005
+    df.loc[admin, 'USER'] = rng.choice(ADMIN_USERS, size=admin.sum())
+    return df
+
+
+def generate_events(n_machines=3, n_days=1, start_date=date(2025, 1, 1), rate=1.0, seed=0, idle_interval=0):
+    """Genera eventos sintéticos para n_machines máquinas durante n_days días, ordenados por DATE_TIME.
+    rate es la cantidad de eventos por segundo de movimiento (1.0 equivale a la ETL actual) e idle_interval
+    los segundos entre registros repetidos durante las detenciones (0 = sin repetidos)."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for d in range(n_days):
+        day = start_date + timedelta(days=d)
+        for m in range(n_machines):
+            frames.append(generate_machine_day(rng, day, f"MAQUINA {m + 1}", USERS[m % len(USERS)], rate, idle_interval))
+
+    df = pd.concat(frames, ignore_index=True)
+    return df.sort_values('DATE_TIME', kind='stable').reset_index(drop=True)[COLUMNS]
+
+
+def write_events_csv(df, csv_path):
+    """Guarda los eventos con el mismo formato del CSV de la ETL."""
+    df.to_csv(csv_path, index=False, date_format='%Y-%m-%d %H:%M:%S')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generador de eventos sintéticos de pantógrafos")
+    parser.add_argument("--machines", type=int, default=3)
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--start-date", type=date.fromisoformat, default=date(2025, 1, 1))
+    parser.add_argument("--rate", type=float, default=1.0, help="eventos por segundo de movimiento")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--idle-interval", type=float, default=0,
+                        help="segundos entre registros repetidos durante las detenciones (0 = sin repetidos)")
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+
+    events = generate_events(args.machines, args.days, args.start_date, args.rate, args.seed, args.idle_interval)
+    write_events_csv(events, args.output)
+    print(f"{len(events)} eventos generados en {args.output}")
@@ -0,0 +1,126 @@
+import io
+import os
+import json
+import mmap
+import logging
+
+import numpy as np
+
+from metrics import stage
+from schema import EVENT_COLUMNS, read_events_csv, empty_events, csv_tail_hash
+
+# Índice guardado junto al CSV con los rangos de bytes de cada fecha
+INDEX_SUFFIX = ".index.json"
+
+# Bytes del CSV que se recorren por vez al actualizar el índice
+INDEX_BLOCK_SIZE = 8 * 2**20
+
+# Largo de la fecha (AAAA-MM-DD) al inicio de DATE_TIME
+DATE_LENGTH = 10
+
+
+def _read_index(csv_path):
+    index_path = csv_path + INDEX_SUFFIX
+    if not os.path.exists(index_path):
+        return {}
+    with open(index_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_index(csv_path, index):
+    """Escribe el índice de forma atómica."""
+    index_path = csv_path + INDEX_SUFFIX
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path)
+
+
+def _line_dates(data, date_column):
+    """Fecha de cada línea completa de un bloque y la posición donde termina cada línea."""
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    line_ends = np.flatnonzero(buffer == ord("\n")) + 1
+    line_starts = np.r_[0, line_ends[:-1]]
+
+    if date_column == 0:
+        # DATE_TIME es la primera columna: la fecha son los primeros bytes de cada línea
+        positions = np.minimum(line_starts[:, None] + np.arange(DATE_LENGTH), len(buffer) - 1)
+        dates = buffer[positions].copy().view(f"S{DATE_LENGTH}").ravel()
+    else:
+        lines = data[:line_ends[-1]].split(b"\n")[:-1] if len(line_ends) else []
+        dates = np.array([line.split(b",")[date_column][:DATE_LENGTH] for line in lines], dtype=f"S{DATE_LENGTH}")
+    return dates, line_ends
+
+
+def update_csv_index(csv_path, block_size=INDEX_BLOCK_SIZE):
+    """Actualiza el índice {fecha: [[inicio, fin], ...]} de rangos de bytes del CSV recorriendo solo las líneas
+    completas agregadas desde la actualización anterior. Si el archivo no es una extensión del indexado
+    (se achicó o cambiaron sus últimos bytes) el índice se vuelve a construir desde el inicio."""
+    try:
+        with stage("csv_index") as metrics, open(csv_path, "rb") as f:
+            size = os.path.getsize(csv_path)
+            index = _read_index(csv_path)
+            if index and (index["size"] > size or csv_tail_hash(f, index["size"]) != index["tail_hash"]):
+                logging.warning("El CSV no es una extensión del archivo indexado, se vuelve a construir el índice.")
+                index = {}
+
+            if not index:
+                f.seek(0)
+                header = f.readline()
+                columns = header.decode("utf-8").strip().split(",")
+                index = {"size": f.tell(), "header_size": f.tell(), "date_column": columns.index("DATE_TIME"), "dates": {}}
+
+            offset = start_offset = index["size"]
+            dates_index = index["dates"]
+            f.seek(offset)
+            while offset < size:
+                data = f.read(min(block_size, size - offset))
+                dates, line_ends = _line_dates(data, index["date_column"])
+                if len(line_ends) == 0:
+                    # Una línea incompleta al final se indexa en la próxima actualización
+                    break
+
+                # Tramos de líneas consecutivas con la misma fecha
+                changes = np.flatnonzero(dates[1:] != dates[:-1]) + 1
+                run_starts = np.r_[0, changes]
+                run_ends = np.r_[changes, len(dates)]
+                for first, last in zip(run_starts.tolist(), run_ends.tolist()):
+                    day = dates[first].decode()
+                    start = offset + (int(line_ends[first - 1]) if first else 0)
+                    end = offset + int(line_ends[last - 1])
+                    ranges = dates_index.setdefault(day, [])
+                    if ranges and ranges[-1][1] == start:
+                        ranges[-1][1] = end
+                    else:
+                        ranges.append([start, end])
+
+                offset += int(line_ends[-1])
+                f.seek(offset)
+
+            if offset != start_offset or "tail_hash" not in index:
+                index["size"] = offset
+                index["tail_hash"] = csv_tail_hash(f, offset)
+                _write_index(csv_path, index)
+            metrics["bytes"] = offset - start_offset
+        return index
+
+    except Exception as e:
+        logging.error(f"Error al actualizar el índice del CSV: {e}")
+        raise
+
+
+def read_csv_dates(csv_path, report_dates, columns=EVENT_COLUMNS):
+    """Lee del CSV solo las líneas de las fechas indicadas: actualiza el índice, mapea el archivo en memoria
+    e interpreta únicamente los rangos de bytes de esas fechas (junto con el encabezado)."""
+    index = update_csv_index(csv_path)
+    ranges = sorted(
+        tuple(byte_range)
+        for report_date in report_dates
+        for byte_range in index["dates"].get(report_date.strftime('%Y-%m-%d'), [])
+    )
+    if not ranges:
+        return empty_events(columns)
+
+    with open(csv_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        content = b"".join([mapped[:index["header_size"]]] + [mapped[start:end] for start, end in ranges])
+    return read_events_csv(io.BytesIO(content), columns=columns)
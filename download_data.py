@@ -1,24 +1,201 @@
+import os
+import json
+import hashlib
 import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest, MediaIoBaseDownload
 from google.oauth2 import service_account
 
-def download_csv_from_gdrive(file_id, dest_path, credentials_file):
-    """Descarga un archivo CSV desde Google Drive usando una cuenta de servicio."""
+from metrics import stage
+
+# Manifiesto local con los metadatos del archivo remoto descargado
+MANIFEST_SUFFIX = ".manifest.json"
+
+# Bytes finales del archivo local que se vuelven a pedir para verificar que el remoto solo creció
+TAIL_OVERLAP = 4096
+
+# Tamaño de cada parte de una descarga completa (MB): partes grandes evitan pedidos de más en archivos grandes
+DOWNLOAD_CHUNK_MB = 256
+
+# Descargas simultáneas por defecto al actualizar los CSV de varios sitios
+DOWNLOAD_WORKERS = 4
+
+
+# Clientes de Google Drive ya creados, por archivo de credenciales (un proceso de larga duración
+# los reutiliza en cada descarga en lugar de volver a autenticarse y armar el cliente)
+_drive_services = {}
+_drive_services_lock = threading.Lock()
+
+
+def build_drive_service(credentials_file):
+    """Crea el cliente de Google Drive autenticado con la cuenta de servicio. El cliente puede usarse desde
+    varios hilos a la vez: las credenciales (y su token) se comparten, pero cada hilo envía sus pedidos por
+    una conexión HTTP propia, ya que las de httplib2 no admiten uso concurrente."""
+    creds = service_account.Credentials.from_service_account_file(credentials_file)
+    connections = threading.local()
+
+    def build_request(http, *args, **kwargs):
+        if not hasattr(connections, "http"):
+            connections.http = AuthorizedHttp(creds, http=httplib2.Http())
+        return HttpRequest(connections.http, *args, **kwargs)
+
+    return build('drive', 'v3', credentials=creds, cache_discovery=False, requestBuilder=build_request)
+
+
+def get_drive_service(credentials_file):
+    """Devuelve el cliente de Google Drive del archivo de credenciales, creándolo la primera vez."""
+    with _drive_services_lock:
+        if credentials_file not in _drive_services:
+            _drive_services[credentials_file] = build_drive_service(credentials_file)
+        return _drive_services[credentials_file]
+
+
+def _read_manifest(dest_path):
+    """Lee el manifiesto de la última descarga. Devuelve un diccionario vacío si no existe."""
+    manifest_path = dest_path + MANIFEST_SUFFIX
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_manifest(dest_path, metadata):
+    """Guarda de forma atómica los metadatos del archivo remoto descargado."""
+    manifest_path = dest_path + MANIFEST_SUFFIX
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def _file_md5(path):
+    """Calcula el MD5 de un archivo local leyéndolo por bloques."""
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            md5.update(block)
+    return md5.hexdigest()
+
+
+def _download_full(service, file_id, dest_path, chunk_mb=DOWNLOAD_CHUNK_MB):
+    """Descarga el archivo completo por partes."""
+    request = service.files().get_media(fileId=file_id)
+    with open(dest_path, "wb") as f:
+        downloader = MediaIoBaseDownload(f, request, chunksize=chunk_mb * 2**20)
+        done = False
+        while not done:
+            status, done = downloader.next_chunk()
+            if status:
+                logging.info(f"Progreso descarga: {int(status.progress() * 100)}%")
+
+
+def _download_tail(service, file_id, dest_path, local_size):
+    """Descarga con un pedido por rango solo los bytes agregados al final del archivo remoto.
+    Devuelve False si el solapamiento no coincide o el rango ya no existe, es decir, si el remoto no es
+    una extensión del local."""
+    overlap = min(TAIL_OVERLAP, local_size)
+    request = service.files().get_media(fileId=file_id)
+    request.headers["Range"] = f"bytes={local_size - overlap}-"
+    try:
+        content = request.execute()
+    except HttpError as e:
+        # 416: el remoto se achicó (fue reemplazado) después de consultar sus metadatos
+        if e.resp.status == 416:
+            return False
+        raise
+
+    with open(dest_path, "rb+") as f:
+        f.seek(local_size - overlap)
+        if f.read(overlap) != content[:overlap]:
+            return False
+        f.write(content[overlap:])
+        f.truncate()
+    return True
+
+
+def remote_modified_date(file_id, credentials_file, service=None):
+    """Fecha (local) de la última modificación del archivo en Google Drive, consultando solo sus metadatos."""
+    try:
+        if service is None:
+            service = get_drive_service(credentials_file)
+        remote = service.files().get(fileId=file_id, fields="modifiedTime").execute()
+        return datetime.fromisoformat(remote["modifiedTime"].replace("Z", "+00:00")).astimezone().date()
+
+    except Exception as e:
+        logging.error(f"Error al consultar los metadatos del archivo: {e}")
+        raise
+
+
+def download_csv_from_gdrive(file_id, dest_path, credentials_file, service=None, chunk_mb=DOWNLOAD_CHUNK_MB):
+    """Descarga un archivo CSV desde Google Drive usando una cuenta de servicio.
+    Omite la descarga si el archivo remoto no cambió y, si solo se le agregaron registros,
+    descarga únicamente los bytes nuevos. Devuelve True si el archivo local fue actualizado."""
     try:
         logging.info("Iniciando descarga de CSV desde Google Drive...")
-        creds = service_account.Credentials.from_service_account_file(credentials_file)
-        service = build('drive', 'v3', credentials=creds, cache_discovery=False)
-
-        request = service.files().get_media(fileId=file_id)
-        with open(dest_path, "wb") as f:
-            downloader = MediaIoBaseDownload(f, request)
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-                if status:
-                    logging.info(f"Progreso descarga: {int(status.progress() * 100)}%")
-        logging.info(f"Archivo descargado correctamente.")
+        with stage("download", file=os.path.basename(dest_path)) as metrics:
+            if service is None:
+                service = get_drive_service(credentials_file)
+
+            remote = service.files().get(fileId=file_id, fields="md5Checksum,modifiedTime,size").execute()
+            remote_size = int(remote["size"])
+            manifest = _read_manifest(dest_path)
+            local_size = os.path.getsize(dest_path) if os.path.exists(dest_path) else 0
+
+            if (
+                local_size == remote_size
+                and manifest.get("md5Checksum") == remote.get("md5Checksum")
+                and manifest.get("modifiedTime") == remote.get("modifiedTime")
+            ):
+                logging.info("El archivo remoto no cambió, se omite la descarga.")
+                metrics.update(mode="skip", bytes=0)
+                return False
+
+            if (
+                0 < local_size < remote_size
+                and _download_tail(service, file_id, dest_path, local_size)
+                and _file_md5(dest_path) == remote.get("md5Checksum")
+            ):
+                logging.info(f"Descarga incremental: {remote_size - local_size} bytes nuevos.")
+                metrics.update(mode="tail", bytes=remote_size - local_size)
+            else:
+                _download_full(service, file_id, dest_path, chunk_mb)
+                metrics.update(mode="full", bytes=remote_size)
+
+            _write_manifest(dest_path, remote)
+            logging.info(f"Archivo descargado correctamente.")
+            return True
+
     except Exception as e:
         logging.error(f"Error al descargar archivo: {e}")
         raise
+
+
+def download_csv_files(downloads, credentials_file, max_workers=DOWNLOAD_WORKERS, service=None,
+                       chunk_mb=DOWNLOAD_CHUNK_MB):
+    """Descarga a la vez varios CSV, con hasta max_workers descargas simultáneas sobre un mismo cliente
+    autenticado. downloads es una lista de (file_id, ruta_destino). Devuelve {ruta_destino: resultado},
+    donde el resultado es el de download_csv_from_gdrive o la excepción de esa descarga, para que la falla
+    de un archivo no impida usar los demás."""
+    if service is None:
+        service = get_drive_service(credentials_file)
+
+    with ThreadPoolExecutor(max(1, min(max_workers, len(downloads)))) as pool:
+        futures = {
+            dest_path: pool.submit(download_csv_from_gdrive, file_id, dest_path, credentials_file, service, chunk_mb)
+            for file_id, dest_path in downloads
+        }
+
+    results = {}
+    for dest_path, future in futures.items():
+        try:
+            results[dest_path] = future.result()
+        except Exception as e:
+            results[dest_path] = e
+    return results
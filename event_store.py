@@ -0,0 +1,179 @@
+import io
+import os
+import json
+import shutil
+import logging
+import pandas as pd
+from datetime import datetime
+
+from metrics import stage
+from schema import EVENT_COLUMNS, read_events_csv, apply_event_schema, empty_events, csv_tail_hash
+
+MANIFEST_FILE = "manifest.json"
+
+# Bytes del CSV que se interpretan por vez al incorporar registros nuevos al almacén
+CSV_BLOCK_SIZE = 8 * 2**20
+
+
+def _partition_dir(store_dir, day, machine):
+    """Devuelve la carpeta de la partición (fecha, máquina) dentro del almacén."""
+    return os.path.join(store_dir, day.strftime('%Y-%m-%d'), machine.replace(' ', '_'))
+
+
+def read_manifest(store_dir):
+    """Lee el manifiesto del almacén de eventos. Devuelve un diccionario vacío si aún no existe."""
+    manifest_path = os.path.join(store_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_manifest(store_dir, manifest):
+    """Escribe el manifiesto de forma atómica para no dejarlo corrupto si se interrumpe la ejecución."""
+    manifest_path = os.path.join(store_dir, MANIFEST_FILE)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def _discard_pending(store_dir, manifest):
+    """Elimina las partes de una ingesta interrumpida (escritas sin llegar a registrar su avance en el
+    manifiesto) para que la siguiente ingesta no duplique sus registros."""
+    pending = manifest.pop("pending", None)
+    if pending is None:
+        return
+    logging.warning("Se descartan las partes de una ingesta interrumpida.")
+    for root, _, files in os.walk(store_dir):
+        for name in files:
+            if name.startswith(f"part-{pending}-"):
+                os.remove(os.path.join(root, name))
+    _write_manifest(store_dir, manifest)
+
+
+def _clear_store(store_dir):
+    """Elimina todas las particiones del almacén (conservando el manifiesto)."""
+    for name in os.listdir(store_dir):
+        path = os.path.join(store_dir, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+
+
+def update_event_store(csv_path, store_dir, block_size=CSV_BLOCK_SIZE):
+    """Incorpora al almacén de eventos (Parquet particionado por fecha y máquina) solo las líneas completas
+    agregadas al CSV desde la ingesta anterior, cuya posición en bytes queda registrada en el manifiesto.
+    Si el CSV no es una extensión del ya ingresado (se achicó o cambiaron los bytes anteriores a esa posición,
+    por ejemplo al descargarse completo un remoto reescrito) el almacén se vuelve a construir desde el inicio.
+    Devuelve la cantidad de registros nuevos."""
+    try:
+        with stage("ingest") as metrics:
+            logging.info("Actualizando almacén de eventos...")
+            os.makedirs(store_dir, exist_ok=True)
+            manifest = read_manifest(store_dir)
+            _discard_pending(store_dir, manifest)
+
+            # Los almacenes anteriores solo registraban el tamaño del CSV, leído completo en cada ingesta
+            offset = manifest.get("offset", manifest.get("source_size", 0))
+            source_size = os.path.getsize(csv_path)
+            with open(csv_path, "rb") as f:
+                if source_size < offset or (
+                    "tail_hash" in manifest and csv_tail_hash(f, offset) != manifest["tail_hash"]
+                ):
+                    logging.warning("El CSV fue reemplazado, se vuelve a construir el almacén.")
+                    _clear_store(store_dir)
+                    manifest, offset = {}, 0
+
+                if offset == source_size:
+                    logging.info("No hay registros nuevos para incorporar.")
+                    metrics.update(rows_in=0, rows_out=0, bytes=0)
+                    return 0
+
+                # Las partes de esta ingesta llevan su marca, registrada como pendiente hasta guardar el avance:
+                # si la ejecución se interrumpe antes, la siguiente las elimina y vuelve a leer desde offset
+                stamp = datetime.now().strftime('%Y%m%d%H%M%S%f')
+                manifest["pending"] = stamp
+                _write_manifest(store_dir, manifest)
+
+                # Cada ejecución agrega nuevos archivos por partición, sin reescribir los anteriores. El CSV se
+                # lee por bloques desde la posición ingresada, por lo que ni el tiempo ni la memoria dependen
+                # del tamaño del histórico.
+                new_rows = 0
+                max_date_time = None
+                start_offset = offset
+                f.seek(0)
+                header = f.readline()
+                offset = max(offset, f.tell())
+                f.seek(offset)
+                i = 0
+                while offset < source_size:
+                    data = f.read(min(block_size, source_size - offset))
+                    # Una línea incompleta al final se incorpora en la próxima ingesta
+                    end = data.rfind(b"\n") + 1
+                    if end == 0:
+                        break
+                    offset += end
+                    f.seek(offset)
+
+                    chunk = read_events_csv(io.BytesIO(header + data[:end]))
+                    if chunk.empty:
+                        continue
+                    part_name = f"part-{stamp}-{i:05d}.parquet"
+                    i += 1
+                    for (day, machine), df_part in chunk.groupby([chunk["DATE_TIME"].dt.normalize(), "MACHINE"], sort=False, observed=True):
+                        partition_dir = _partition_dir(store_dir, day, machine)
+                        os.makedirs(partition_dir, exist_ok=True)
+                        df_part.to_parquet(os.path.join(partition_dir, part_name), index=False)
+
+                    new_rows += len(chunk)
+                    chunk_max = chunk["DATE_TIME"].max()
+                    max_date_time = chunk_max if max_date_time is None else max(max_date_time, chunk_max)
+
+                tail_hash = csv_tail_hash(f, offset)
+
+            if max_date_time is not None:
+                if manifest.get("last_date_time"):
+                    max_date_time = max(max_date_time, pd.Timestamp(manifest["last_date_time"]))
+                manifest["last_date_time"] = max_date_time.isoformat()
+            manifest["rows"] = manifest.get("rows", 0) + new_rows
+            manifest["offset"] = offset
+            manifest["source_size"] = source_size
+            manifest["tail_hash"] = tail_hash
+            del manifest["pending"]
+            _write_manifest(store_dir, manifest)
+
+            metrics.update(rows_in=new_rows, rows_out=new_rows, bytes=offset - start_offset)
+            if new_rows == 0:
+                logging.info("No hay registros nuevos para incorporar.")
+            else:
+                logging.info(f"Registros nuevos incorporados al almacén: {new_rows}")
+            return new_rows
+
+    except Exception as e:
+        logging.error(f"Error al actualizar almacén de eventos: {e}")
+        raise
+
+
+def load_events(store_dir, report_dates, machine_names, columns=EVENT_COLUMNS):
+    """Lee del almacén únicamente las particiones de las fechas y máquinas indicadas,
+    cargando solo las columnas solicitadas."""
+    # Las partes de una ingesta en curso o interrumpida no se leen
+    pending = read_manifest(store_dir).get("pending")
+    frames = []
+    for report_date in report_dates:
+        for machine in machine_names:
+            partition_dir = _partition_dir(store_dir, report_date, machine)
+            if not os.path.isdir(partition_dir):
+                continue
+            for part_name in sorted(os.listdir(partition_dir)):
+                if pending is not None and part_name.startswith(f"part-{pending}-"):
+                    continue
+                frames.append(pd.read_parquet(
+                    os.path.join(partition_dir, part_name), columns=columns, memory_map=True
+                ))
+
+    if not frames:
+        return empty_events(columns)
+
+    # Las categorías de cada parte difieren, por lo que se vuelven a aplicar los tipos tras unirlas
+    return apply_event_schema(pd.concat(frames, ignore_index=True))
@@ -1,20 +1,355 @@
+import io
 import os
 import logging
 import numpy as np
+import pandas as pd
 
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, LongTable, TableStyle, Image, PageBreak
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm
+from reportlab.graphics.shapes import Drawing, Line, String
+from reportlab.graphics.charts.lineplots import LinePlot
 from datetime import datetime
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
 
-
-def generate_pdf_report(dfs_machines, report_file, report_date):
-    """"""
+from metrics import stage, worker_pool
+from schema import CHART_EVENT_COLUMNS
+from analytics import prepare_intervals, summarize_intervals, clean_gcodes
+
+# Opciones por defecto del gráfico de operaciones
+CHART_FORMAT = "png"        # "png" (rasterizado en memoria) o "vector" (dibujo de reportlab)
+CHART_DPI = 200
+CHART_MAX_POINTS = 1500     # columnas de píxel (pares mínimo/máximo) por serie
+
+# Opciones por defecto del desglose de ciclos
+TABLE_CHUNK_ROWS = 40           # filas de cada tabla parcial (con el encabezado repetido)
+TABLE_MAX_ROWS = None           # por encima de esta cantidad de filas el desglose se adjunta en CSV
+TABLE_COLLAPSE_BELOW = None     # minutos: los intervalos consecutivos más cortos se agrupan en una fila
+
+# Estilo compartido por todas las tablas (encabezado en la primera fila)
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#003366")),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.whitesmoke)
+])
+
+GCODES_HEADER = ['Código G', "Ciclos", "Duración\nPromedio\n(min)", "Tiempo prom.\nen Movimiento\n(min)", 'Tiempo prom.\nDetención\n(min)']
+CYCLES_HEADER = ['Ciclo N°', 'Inicio', 'Fin', 'Duración\n(min)', 'Estado', 'Usuario', 'Código G']
+CYCLES_COL_WIDTHS = [50, 40, 40, 60, 80, 100, 150]
+
+
+def decimate_minmax(times, values, n_columns):
+    """Reduce una serie temporal (ordenada por tiempo) a los puntos mínimo y máximo de cada columna de
+    píxel, de modo que el gráfico se vea igual pero la cantidad de puntos no dependa de los eventos del día.
+    Devuelve los índices de los puntos a conservar."""
+    n = len(values)
+    if n <= 2 * n_columns:
+        return np.arange(n)
+
+    t = times.astype('int64')
+    columns = (t - t[0]) * n_columns // (t[-1] - t[0] + 1)
+
+    # Ordenar por (columna, valor): el primero de cada columna es el mínimo y el último el máximo
+    order = np.lexsort((values, columns))
+    starts = np.flatnonzero(np.diff(columns, prepend=-1) != 0)
+    ends = np.r_[starts[1:], n] - 1
+    return np.unique(np.r_[order[starts], order[ends]])
+
+
+# Figura reutilizada entre máquinas (una por proceso). Se crea con la API de Figure, sin pyplot,
+# por lo que no depende del backend interactivo y puede dibujarse desde un hilo dedicado
+_chart_figure = None
+
+
+def _chart_axes():
+    """Devuelve la figura del gráfico y sus dos ejes, limpios y listos para volver a dibujar."""
+    global _chart_figure
+    if _chart_figure is None:
+        # matplotlib se importa recién al dibujar el primer gráfico PNG (el modo vectorial no lo usa)
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=(8.0, 4.5))
+        ax1 = fig.subplots()
+        _chart_figure = (fig, ax1, ax1.twinx())
+
+    fig, ax1, ax2 = _chart_figure
+    ax1.clear()
+    ax2.clear()
+
+    # clear() restablece la configuración de eje gemelo
+    ax2.yaxis.tick_right()
+    ax2.yaxis.set_label_position('right')
+    ax2.xaxis.set_visible(False)
+    ax2.patch.set_visible(False)
+    return fig, ax1, ax2
+
+
+def render_machine_chart(df_events, df_intervals, dpi=CHART_DPI, max_points=CHART_MAX_POINTS):
+    """Genera el gráfico de operaciones de una máquina (coordenadas, velocidad y cambios de dirección)
+    en memoria y devuelve los bytes del PNG."""
+    import matplotlib.dates as mdates
+
+    if 'DIR_CHANGE' not in df_intervals.columns:
+        df_intervals = prepare_intervals(df_intervals)
+
+    fig, ax1, ax2 = _chart_axes()
+
+    # Primer eje vertical: Coordenadas X e Y (decimadas por columna de píxel)
+    times = df_events['DATE_TIME'].to_numpy()
+    for column in ['X_POS', 'Y_POS']:
+        values = df_events[column].to_numpy()
+        keep = decimate_minmax(times, values, max_points)
+        ax1.scatter(times[keep], values[keep], label=column, s=0.5)
+    ax1.set_ylabel("Posición (mm)")
+    ax1.set_xlabel("Hora")
+    ax1.xaxis.set_major_formatter(mdates.DateFormatter("%H:%M"))
+    ax1.tick_params(axis='x', labelrotation=45)
+
+    # Marcar puntos de cambio de dirección
+    turning_points = df_intervals[df_intervals['DIR_CHANGE']]
+    ax1.vlines(turning_points['INTERVAL_START'], ymin=-5000, ymax=5000, linestyle='--', color='green')
+
+    # Segundo eje vertical: Velocidad compuesta
+    ax2.step(df_intervals['INTERVAL_START'], df_intervals['VEL'], where='post', label='VEL', alpha=0.6, color='red')
+    ax2.set_ylabel("Velocidad (mm/s)")
+
+    # Título y leyendas)
+    ax1.legend(loc='upper left')
+    ax2.legend(loc='upper right')
+    ax1.set_ylim(-4500, 4500)
+    ax2.set_ylim(-30, 30)
+    fig.tight_layout()
+    ax1.grid(True)
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+    return buffer.getvalue()
+
+
+def _seconds_of_day(values):
+    """Convierte fechas y horas a segundos desde el inicio del día."""
+    values = pd.to_datetime(pd.Series(values))
+    return ((values - values.dt.normalize()).dt.total_seconds()).to_numpy()
+
+
+def _format_hour(seconds):
+    return f"{int(seconds // 3600):02d}:{int(seconds % 3600 // 60):02d}"
+
+
+def render_machine_drawing(df_events, df_intervals, max_points=CHART_MAX_POINTS, width=18*cm, height=10.125*cm):
+    """Genera el gráfico de operaciones de una máquina como dibujo vectorial de reportlab:
+    coordenadas X e Y (decimadas) arriba y velocidad compuesta abajo."""
+    if 'DIR_CHANGE' not in df_intervals.columns:
+        df_intervals = prepare_intervals(df_intervals)
+
+    times = df_events['DATE_TIME'].to_numpy()
+    seconds = _seconds_of_day(times)
+    x_min, x_max = float(seconds.min()), float(seconds.max()) + 1
+
+    drawing = Drawing(width, height)
+    plots = []
+    for y, plot_height in [(height * 0.45, height * 0.5), (30, height * 0.3)]:
+        plot = LinePlot()
+        plot.x, plot.y, plot.width, plot.height = 40, y, width - 60, plot_height
+        plot.xValueAxis.valueMin, plot.xValueAxis.valueMax = x_min, x_max
+        plot.xValueAxis.labelTextFormat = _format_hour
+        plot.xValueAxis.labels.fontSize = 6
+        plot.yValueAxis.labels.fontSize = 6
+        plots.append(plot)
+    pos_plot, vel_plot = plots
+
+    # Coordenadas X e Y
+    pos_plot.data = []
+    for column in ['X_POS', 'Y_POS']:
+        values = df_events[column].to_numpy()
+        keep = decimate_minmax(times, values, max_points)
+        pos_plot.data.append(list(zip(seconds[keep], values[keep])))
+    pos_plot.lines[0].strokeColor = colors.HexColor("#1f77b4")
+    pos_plot.lines[1].strokeColor = colors.HexColor("#ff7f0e")
+    pos_plot.lines[0].strokeWidth = pos_plot.lines[1].strokeWidth = 0.3
+    pos_plot.yValueAxis.valueMin, pos_plot.yValueAxis.valueMax = -4500, 4500
+
+    # Velocidad compuesta como escalones
+    starts = _seconds_of_day(df_intervals['INTERVAL_START'])
+    vel = df_intervals['VEL'].fillna(0).to_numpy()
+    step_x = np.repeat(starts, 2)[1:]
+    step_y = np.repeat(vel, 2)[:-1]
+    vel_plot.data = [list(zip(step_x, step_y))]
+    vel_plot.lines[0].strokeColor = colors.red
+    vel_plot.lines[0].strokeWidth = 0.3
+    vel_plot.yValueAxis.valueMin, vel_plot.yValueAxis.valueMax = -30, 30
+
+    drawing.add(pos_plot)
+    drawing.add(vel_plot)
+
+    # Marcar puntos de cambio de dirección
+    turning_points = _seconds_of_day(df_intervals.loc[df_intervals['DIR_CHANGE'], 'INTERVAL_START'])
+    for t in turning_points:
+        x = pos_plot.x + (t - x_min) / (x_max - x_min) * pos_plot.width
+        drawing.add(Line(x, pos_plot.y, x, pos_plot.y + pos_plot.height,
+                         strokeColor=colors.green, strokeWidth=0.3, strokeDashArray=[2, 2]))
+
+    drawing.add(String(pos_plot.x, pos_plot.y + pos_plot.height + 4, "Posición X (azul) / Y (naranja) (mm)", fontSize=7))
+    drawing.add(String(vel_plot.x, vel_plot.y + vel_plot.height + 4, "Velocidad (mm/s)", fontSize=7))
+    return drawing
+
+
+def gcodes_table(df_gcodes):
+    """Tabla del resumen por código G."""
+    rows = zip(
+        clean_gcodes(df_gcodes['gcode'], "Sin definir"),
+        df_gcodes['ncycles'].tolist(),
+        df_gcodes['average_duration'].round(2).tolist(),
+        df_gcodes['average_motion'].round(2).tolist(),
+        df_gcodes['average_detention'].round(2).tolist(),
+    )
+    return Table([GCODES_HEADER] + [list(row) for row in rows], colWidths=[150, 80, 100, 100, 100], style=TABLE_STYLE)
+
+
+def collapse_short_intervals(df_intervals, min_duration):
+    """Agrupa en una sola fila los intervalos consecutivos de un mismo ciclo que duran menos de
+    min_duration minutos, sean de movimiento o de detención (los intervalos agrupados alternan entre ambos
+    estados, por lo que nunca hay dos detenciones seguidas). La columna COLLAPSED indica cuántos intervalos
+    representa cada fila."""
+    short = (df_intervals['DURATION'] < min_duration).to_numpy()
+    cycle_ids = df_intervals['CYCLE_ID'].to_numpy()
+
+    # Empieza una fila nueva en cada intervalo largo, en el primero de una serie de cortos y al cambiar de ciclo
+    new_row = ~short | ~np.r_[False, short[:-1]] | (np.diff(cycle_ids, prepend=-1) != 0)
+    groups = np.cumsum(new_row) - 1
+
+    grouped = df_intervals.groupby(groups)
+    df_collapsed = grouped.agg(
+        INTERVAL_START=('INTERVAL_START', 'first'),
+        INTERVAL_END=('INTERVAL_END', 'last'),
+        DURATION=('DURATION', 'sum'),
+        VEL=('VEL', 'first'),
+        USER=('USER', 'first'),
+        G_CODE=('G_CODE', 'first'),
+        CYCLE_ID=('CYCLE_ID', 'first'),
+    )
+    df_collapsed['COLLAPSED'] = grouped.size().to_numpy()
+    return df_collapsed.reset_index(drop=True)
+
+
+def cycles_table_rows(df_intervals):
+    """Celdas del desglose de ciclos, formateadas columna por columna (sin recorrer los intervalos)."""
+    state = pd.Series(np.where(df_intervals['VEL'].to_numpy() != 0, 'MOVIMIENTO', 'DETENIDO'), index=df_intervals.index)
+    if 'COLLAPSED' in df_intervals.columns:
+        collapsed = df_intervals['COLLAPSED']
+        state = state.where(collapsed == 1, collapsed.astype(str) + " INTERV.")
+
+    rows = zip(
+        (df_intervals['CYCLE_ID'] + 1).tolist(),
+        df_intervals['INTERVAL_START'].dt.strftime('%H:%M').tolist(),
+        df_intervals['INTERVAL_END'].dt.strftime('%H:%M').tolist(),
+        df_intervals['DURATION'].round(2).tolist(),
+        state.tolist(),
+        df_intervals['USER'].tolist(),
+        clean_gcodes(df_intervals['G_CODE'], "-").tolist(),
+    )
+    return [list(row) for row in rows]
+
+
+def chunked_tables(header, rows, col_widths, chunk_rows=TABLE_CHUNK_ROWS):
+    """Divide una tabla extensa en LongTables de chunk_rows filas, cada una con el encabezado repetido.
+    reportlab parte una tabla enorme entre páginas con un costo que crece más que linealmente;
+    con tablas acotadas el armado del PDF crece en forma lineal con la cantidad de filas."""
+    return [
+        LongTable([header] + rows[i:i + chunk_rows], colWidths=col_widths, repeatRows=1, style=TABLE_STYLE)
+        for i in range(0, max(len(rows), 1), chunk_rows)
+    ]
+
+
+def breakdown_file(report_file):
+    """CSV con el desglose completo de ciclos que acompaña al reporte cuando alguna máquina supera TABLE_MAX_ROWS."""
+    return os.path.splitext(report_file)[0] + "_desglose.csv"
+
+
+# Hoja de estilos reutilizada entre reportes (una por proceso)
+_report_stylesheet = None
+
+
+def _report_styles():
+    """Hoja de estilos del reporte con los estilos de títulos y texto propios.
+    Se arma una sola vez por proceso: los estilos no se modifican al construir los documentos."""
+    global _report_stylesheet
+    if _report_stylesheet is not None:
+        return _report_stylesheet
+
+    styles = getSampleStyleSheet()
+
+    styles.add(ParagraphStyle(
+        name="TituloPrincipal",
+        fontSize=20,
+        leading=24,
+        alignment=1,  # centrado
+        textColor=colors.HexColor("#003366"),
+        spaceAfter=20
+    ))
+
+    styles.add(ParagraphStyle(
+        name="Subtitulo1",
+        fontSize=14,
+        leading=18,
+        textColor=colors.HexColor("#006699"),
+        spaceAfter=12
+    ))
+
+    styles.add(ParagraphStyle(
+        name="Subtitulo2",
+        fontSize=12,
+        leading=16,
+        textColor=colors.HexColor("#006699"),
+        spaceAfter=12
+    ))
+
+    styles.add(ParagraphStyle(
+        name="TextoNormal",
+        fontSize=11,
+        leading=14
+    ))
+    _report_stylesheet = styles
+    return styles
+
+
+def warm_up():
+    """Carga matplotlib y arma la hoja de estilos por adelantado, para que un proceso de larga duración
+    no pague ese costo al generar su primer reporte."""
+    _chart_axes()
+    _report_styles()
+
+
+def generate_pdf_report(dfs_machines, report_file, report_date, charts=None,
+                        chart_format=CHART_FORMAT, chart_dpi=CHART_DPI, chart_max_points=CHART_MAX_POINTS,
+                        table_chunk_rows=TABLE_CHUNK_ROWS, table_max_rows=TABLE_MAX_ROWS,
+                        table_collapse_below=TABLE_COLLAPSE_BELOW):
+    """Genera el reporte PDF de la fecha indicada. Si se indica charts ({máquina: bytes PNG}) se usan
+    esos gráficos ya generados en lugar de generarlos nuevamente.
+    Si el desglose de ciclos de una máquina supera table_max_rows filas se escribe completo en
+    breakdown_file(report_file) en lugar de incluirlo en el PDF."""
+    with stage("pdf", date=report_date) as metrics:
+        metrics["rows_in"] = sum(len(df_intervals) for _, _, df_intervals in dfs_machines)
+        _build_pdf_report(
+            dfs_machines, report_file, report_date, charts, chart_format, chart_dpi, chart_max_points,
+            table_chunk_rows, table_max_rows, table_collapse_below
+        )
+        metrics["bytes"] = os.path.getsize(report_file)
+
+
+def _build_pdf_report(dfs_machines, report_file, report_date, charts, chart_format, chart_dpi, chart_max_points,
+                      table_chunk_rows, table_max_rows, table_collapse_below):
     try:
+        # El desglose en CSV de una ejecución anterior no debe adjuntarse a este reporte
+        csv_file = breakdown_file(report_file)
+        if os.path.exists(csv_file):
+            os.remove(csv_file)
+        breakdowns = []
+
         # ======================
         # 1. CONFIGURACIÓN PDF
         # ======================
@@ -23,44 +358,12 @@ def generate_pdf_report(dfs_machines, report_file, report_date):
         # ======================
         # 2. ESTILOS PERSONALIZADOS
         # ======================
-        styles = getSampleStyleSheet()
-
-        styles.add(ParagraphStyle(
-            name="TituloPrincipal",
-            fontSize=20,
-            leading=24,
-            alignment=1,  # centrado
-            textColor=colors.HexColor("#003366"),
-            spaceAfter=20
-        ))
-
-        styles.add(ParagraphStyle(
-            name="Subtitulo1",
-            fontSize=14,
-            leading=18,
-            textColor=colors.HexColor("#006699"),
-            spaceAfter=12
-        ))
-
-        styles.add(ParagraphStyle(
-            name="Subtitulo2",
-            fontSize=12,
-            leading=16,
-            textColor=colors.HexColor("#006699"),
-            spaceAfter=12
-        ))
-
-        styles.add(ParagraphStyle(
-            name="TextoNormal",
-            fontSize=11,
-            leading=14
-        ))
+        styles = _report_styles()
 
         # ======================
         # 3. LISTA DE ELEMENTOS
         # ======================
         elements = []
-        temp_files = []
 
         # Portada
         fecha_actual = datetime.now().strftime("%d/%m/%Y")
@@ -77,23 +380,16 @@ def generate_pdf_report(dfs_machines, report_file, report_date):
             elements.append(Paragraph(F"{machine}", styles['Subtitulo1']))
             
             if not df_intervals.empty:
-                df_intervals = df_intervals[['INTERVAL_START', 'INTERVAL_END', 'VEL', 'G_CODE', 'USER']].copy()
-                df_intervals['DURATION'] = (df_intervals['INTERVAL_END'] - df_intervals['INTERVAL_START']).dt.total_seconds() / 60
-                df_intervals["DURATION"] = df_intervals["DURATION"].round(3)
-                
-                # Detectar puntos donde cambia la dirección
-                df_intervals['DIRECTION'] = np.sign(df_intervals['VEL'])
-                df_intervals['DIR_CHANGE'] = df_intervals['DIRECTION'].diff(2).abs() == 2
+                summary = summarize_intervals(df_intervals)
+                df_intervals = summary.df_intervals
 
-                df_intervals["CYCLE_ID"] = df_intervals["DIR_CHANGE"].cumsum()
-
-                operation_time = df_intervals['DURATION'].sum().round(2)
+                operation_time = summary.operation_time.round(2)
                 operation_time_hr = round((operation_time / 60), 2)
-                motion_time = df_intervals[df_intervals['VEL'] != 0]['DURATION'].sum().round(2)
+                motion_time = summary.motion_time.round(2)
                 motion_time_hr = round((motion_time / 60), 2)
-                detention_time = df_intervals[df_intervals['VEL'] == 0]['DURATION'].sum().round(2)
+                detention_time = summary.detention_time.round(2)
                 detention_time_hr = round((detention_time / 60), 2)
-                ciclos = df_intervals['CYCLE_ID'].nunique()
+                ciclos = summary.cycles
 
                 elements.append(Paragraph(
                     f"Tiempo de operación: {operation_time} min. ({operation_time_hr} hs.)", styles['TextoNormal']
@@ -109,55 +405,7 @@ def generate_pdf_report(dfs_machines, report_file, report_date):
 
                 elements.append(Paragraph(F"Resumen por Código G", styles['Subtitulo2']))
 
-                df_cycles = (
-                    df_intervals.groupby("CYCLE_ID")
-                    .agg(
-                        duration=('DURATION', 'sum'),
-                        motion_time=('DURATION', lambda x: x[df_intervals["VEL"] != 0].sum()),
-                        detention_time=('DURATION', lambda x: x[df_intervals["VEL"] == 0].sum()),
-                        gcode=('G_CODE', 'first')
-                    )
-                    .reset_index()
-                )
-
-                df_gcodes = (
-                    df_cycles.groupby('gcode')
-                    .agg(
-                        ncycles=('CYCLE_ID', 'count'),
-                        average_duration=('duration', 'mean'),
-                        average_motion=('motion_time', 'mean'),
-                        average_detention=('detention_time', 'mean'),
-                    )
-                    .reset_index()
-                )
-
-                gcode_summary = [
-                    ['Código G', "Ciclos", "Duración\nPromedio\n(min)", "Tiempo prom.\nen Movimiento\n(min)", 'Tiempo prom.\nDetención\n(min)']
-                    ]
-                
-                for gcode_row in df_gcodes.itertuples(index=False):
-                    gcode = gcode_row.gcode
-                    gcode = gcode.replace(" (ala 2.5)", "").replace(".tap", "").replace("No File Loaded.", "Sin definir")
-                    ncycles = gcode_row.ncycles
-                    average_duration = round(gcode_row.average_duration, 2)
-                    average_motion = round(gcode_row.average_motion, 2)
-                    average_detention = round(gcode_row.average_detention, 2)
-
-                    gcode_summary.append([gcode, ncycles, average_duration, average_motion, average_detention])
-
-
-                gcodes_table = Table(gcode_summary, colWidths=[150, 80, 100, 100, 100])
-                gcodes_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#003366")),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.whitesmoke)
-                ]))
-
-                elements.append(gcodes_table)
+                elements.append(gcodes_table(summary.df_gcodes))
                 elements.append(Spacer(1, 30))
 
                 # ===================================
@@ -165,69 +413,38 @@ def generate_pdf_report(dfs_machines, report_file, report_date):
                 # ===================================        
                 elements.append(Paragraph(F"Desglose de Ciclos", styles['Subtitulo2']))
                 
-                cycles_table = [['Ciclo N°', 'Inicio', 'Fin', 'Duración\n(min)', 'Estado', 'Usuario', 'Código G']]
-
-                for interval in df_intervals.itertuples(index=False):
-                    cycle_id = interval.CYCLE_ID + 1
-                    start_time = interval.INTERVAL_START.strftime('%H:%M')
-                    end_time = interval.INTERVAL_END.strftime('%H:%M')
-                    duration = round(interval.DURATION, 2)
-                    state = 'MOVIMIENTO' if interval.VEL != 0 else 'DETENIDO'
-                    user = interval.USER
-                    gcode = interval.G_CODE
-                    gcode = gcode.replace(" (ala 2.5)", "").replace(".tap", "").replace("No File Loaded.", "-")
-
-                    cycles_table.append([cycle_id, start_time, end_time, duration, state, user, gcode])
-
-                table2 = Table(cycles_table, colWidths=[50, 40, 40, 60, 80, 100, 150])
-                table2.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#003366")),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.whitesmoke)
-                ]))
-                elements.append(table2)
+                if table_max_rows is not None and len(df_intervals) > table_max_rows:
+                    # Desglose demasiado extenso: se adjunta completo en CSV
+                    df_breakdown = pd.DataFrame(
+                        cycles_table_rows(df_intervals), columns=[column.replace("\n", " ") for column in CYCLES_HEADER]
+                    )
+                    df_breakdown.insert(0, "Máquina", machine)
+                    breakdowns.append(df_breakdown)
+                    elements.append(Paragraph(
+                        f"El desglose de los {len(df_intervals)} intervalos se adjunta en el archivo {os.path.basename(csv_file)}.",
+                        styles['TextoNormal']
+                    ))
+                else:
+                    df_rows = df_intervals
+                    if table_collapse_below:
+                        df_rows = collapse_short_intervals(df_intervals, table_collapse_below)
+                    elements.extend(chunked_tables(
+                        CYCLES_HEADER, cycles_table_rows(df_rows), CYCLES_COL_WIDTHS, table_chunk_rows
+                    ))
                 elements.append(Spacer(1, 30))
 
 
-                fig, ax1 = plt.subplots(figsize=(8.0, 4.5))
-
-                # Primer eje vertical: Coordenadas X e Y
-                ax1.scatter(df_events['DATE_TIME'], df_events['X_POS'], label='X_POS', s=0.5)
-                ax1.scatter(df_events['DATE_TIME'], df_events['Y_POS'], label='Y_POS', s=0.5)
-                ax1.set_ylabel("Posición (mm)")
-                ax1.set_xlabel("Hora")
-                ax1.xaxis.set_major_formatter(mdates.DateFormatter("%H:%M"))
-                plt.xticks(rotation=45)
-
-                # Marcar puntos de cambio de dirección
-                turning_points = df_intervals[df_intervals['DIR_CHANGE']].copy()
-                turning_points = turning_points.reset_index()
-                ax1.vlines(turning_points['INTERVAL_START'], ymin=-5000, ymax=5000, linestyle='--', color='green')
-
-                # Segundo eje vertical: Velocidad compuesta
-                ax2 = ax1.twinx()
-                ax2.step(df_intervals['INTERVAL_START'], df_intervals['VEL'], where='post', label='VEL', alpha=0.6, color='red')
-                ax2.set_ylabel("Velocidad (mm/s)")
-
-                # Título y leyendas)
-                ax1.legend(loc='upper left')
-                ax2.legend(loc='upper right')
-                ax1.set_ylim(-4500, 4500)
-                ax2.set_ylim(-30, 30)
-                fig.tight_layout()
-                ax1.grid(True)
-
-                grafico_path = f"grafico_{machine.replace(' ', '_')}_{report_date.strftime('%d-%m-%Y')}.png"
-                plt.savefig(grafico_path, dpi=600, bbox_inches='tight')
-                temp_files.append(grafico_path)
-                plt.close()
-
                 elements.append(Paragraph(f"Operaciones de máquina", styles['Subtitulo2']))
-                elements.append(Image(grafico_path, width=18*cm, height=10.125*cm))
+                if chart_format == "vector":
+                    elements.append(render_machine_drawing(df_events, df_intervals, max_points=chart_max_points))
+                else:
+                    if charts and machine in charts:
+                        chart_png = charts[machine]
+                    else:
+                        chart_png = _render_chart_task(
+                            report_date, machine, df_events, df_intervals, chart_dpi, chart_max_points
+                        )
+                    elements.append(Image(io.BytesIO(chart_png), width=18*cm, height=10.125*cm))
                 elements.append(PageBreak())
 
             else:
@@ -241,14 +458,134 @@ def generate_pdf_report(dfs_machines, report_file, report_date):
         # 6. GENERAR PDF
         # ================
         doc.build(elements)
-        
-        # --- Eliminar el gráfico temporal ---
-        for f in temp_files:
-            if os.path.exists(f):
-                os.remove(f)
+
+        if breakdowns:
+            pd.concat(breakdowns, ignore_index=True).to_csv(csv_file, index=False, encoding="utf-8-sig")
 
         logging.info(f"Reporte generado correctamente.")
 
     except Exception as e:
         logging.error(f"Error al generar reporte: {e}")
         raise
+
+
+def _render_chart_task(report_date, machine, df_events, df_intervals, dpi, max_points):
+    """Genera el gráfico de una máquina registrando las métricas de la etapa."""
+    with stage("chart", date=report_date, machine=machine) as metrics:
+        metrics["rows_in"] = len(df_events)
+        chart_png = render_machine_chart(df_events, df_intervals, dpi=dpi, max_points=max_points)
+        metrics["bytes"] = len(chart_png)
+    return chart_png
+
+
+def report_pool(jobs, log_file=None, warm=False):
+    """Crea el pool de procesos que segmentan las máquinas y generan gráficos y PDF. Un proceso de larga
+    duración puede crearlo una vez (con warm=True) y reutilizarlo en cada ejecución."""
+    return worker_pool(jobs, log_file, warm, warm_up=warm_up if warm else None)
+
+
+def render_report(report_date, dfs_machines, report_files, cache=None, pool=None, **chart_options):
+    """Genera el PDF de una fecha (o lo copia del caché si ya se generó con los mismos intervalos y opciones)
+    y devuelve su archivo, o None si no se registraron movimientos en la fecha.
+    Con pool, los gráficos de cada máquina se generan en paralelo en sus procesos y luego el PDF en uno de
+    ellos (el dibujo de matplotlib y reportlab no libera el GIL); quien llama solo espera los resultados,
+    por lo que puede generar varias fechas a la vez desde distintos hilos."""
+    if dfs_machines == []:
+        return None
+    report_file = report_files[report_date]
+    key = cache.report_key(report_date, chart_options) if cache is not None else None
+    if cache is not None and cache.restore_report(key, report_file, breakdown_file(report_file)):
+        logging.info(f"Reporte del {report_date.strftime('%d-%m-%Y')} recuperado del caché.")
+        return report_file
+
+    if pool is None:
+        generate_pdf_report(dfs_machines, report_file, report_date, **chart_options)
+    else:
+        # A los procesos solo se envían las columnas de los eventos que usan los gráficos
+        dfs_machines = [
+            [machine, df_events[CHART_EVENT_COLUMNS], df_intervals] for machine, df_events, df_intervals in dfs_machines
+        ]
+        # Los dibujos vectoriales son livianos y se arman junto con el PDF
+        charts = None
+        if chart_options.get("chart_format", CHART_FORMAT) != "vector":
+            chart_futures = {
+                machine: pool.submit(
+                    _render_chart_task, report_date, machine, df_events, df_intervals,
+                    chart_options.get("chart_dpi", CHART_DPI), chart_options.get("chart_max_points", CHART_MAX_POINTS)
+                )
+                for machine, df_events, df_intervals in dfs_machines if not df_intervals.empty
+            }
+            charts = {machine: future.result() for machine, future in chart_futures.items()}
+        pool.submit(generate_pdf_report, dfs_machines, report_file, report_date, charts, **chart_options).result()
+
+    if cache is not None:
+        cache.store_report(key, report_file, breakdown_file(report_file))
+    return report_file
+
+
+def generate_range_report(summary, report_file, start_date, end_date):
+    """Genera el reporte PDF de un período a partir del resumen del almacén de agregados
+    ({máquina: {"daily": ..., "gcodes": ...}}), sin volver a procesar los eventos."""
+    try:
+        with stage("range_pdf", start=start_date, end=end_date) as metrics:
+            doc = SimpleDocTemplate(report_file, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=18)
+            styles = _report_styles()
+
+            elements = []
+            elements.append(Paragraph("Reporte de Pantógrafos por Período", styles["TituloPrincipal"]))
+            elements.append(Paragraph(f"Fecha de generación: {datetime.now().strftime('%d/%m/%Y')}", styles['TextoNormal']))
+            elements.append(Paragraph(
+                f"Período: {start_date.strftime('%d/%m/%Y')} - {end_date.strftime('%d/%m/%Y')}", styles['TextoNormal']
+            ))
+            elements.append(Spacer(1, 30))
+
+            for machine, machine_summary in summary.items():
+                df_daily = machine_summary["daily"]
+                df_gcodes = machine_summary["gcodes"]
+                elements.append(Paragraph(f"{machine}", styles['Subtitulo1']))
+
+                if df_daily.empty or df_daily['operation_time'].sum() == 0:
+                    elements.append(Paragraph("No se registraron movimientos en el período.", styles['TextoNormal']))
+                    elements.append(Spacer(1, 40))
+                    continue
+
+                operation_time = round(df_daily['operation_time'].sum(), 2)
+                motion_time = round(df_daily['motion_time'].sum(), 2)
+                detention_time = round(df_daily['detention_time'].sum(), 2)
+                active_days = int((df_daily['operation_time'] > 0).sum())
+
+                elements.append(Paragraph(
+                    f"Tiempo de operación: {operation_time} min. ({round(operation_time / 60, 2)} hs.)", styles['TextoNormal']
+                    ))
+                elements.append(Paragraph(
+                    f"Tiempo en movimiento: {motion_time} min. ({round(motion_time / 60, 2)} hs.)", styles['TextoNormal']
+                    ))
+                elements.append(Paragraph(
+                    f"Tiempo en detención: {detention_time} min. ({round(detention_time / 60, 2)} hs.)", styles['TextoNormal']
+                    ))
+                elements.append(Paragraph(f"N° de ciclos: {int(df_daily['cycles'].sum())}", styles['TextoNormal']))
+                elements.append(Paragraph(f"Días con actividad: {active_days} de {len(df_daily)}", styles['TextoNormal']))
+                elements.append(Spacer(1, 30))
+
+                elements.append(Paragraph("Resumen por Código G", styles['Subtitulo2']))
+                elements.append(gcodes_table(df_gcodes))
+                elements.append(Spacer(1, 30))
+
+                elements.append(Paragraph("Resumen Diario", styles['Subtitulo2']))
+                daily_summary = [['Fecha', 'Operación\n(min)', 'Movimiento\n(min)', 'Detención\n(min)', 'Ciclos']]
+                for day in df_daily.itertuples(index=False):
+                    daily_summary.append([
+                        datetime.strptime(day.date, '%Y-%m-%d').strftime('%d/%m/%Y'), round(day.operation_time, 2),
+                        round(day.motion_time, 2), round(day.detention_time, 2), day.cycles
+                    ])
+                elements.extend(chunked_tables(daily_summary[0], daily_summary[1:], [100, 100, 100, 100, 80]))
+                elements.append(PageBreak())
+
+            doc.build(elements)
+            metrics["bytes"] = os.path.getsize(report_file)
+
+        logging.info(f"Reporte del período generado correctamente.")
+
+    except Exception as e:
+        logging.error(f"Error al generar reporte del período: {e}")
+        raise
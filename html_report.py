@@ -0,0 +1,167 @@
+import html
+import logging
+from string import Template
+from datetime import datetime
+
+import numpy as np
+
+from metrics import stage
+from analytics import summarize_intervals, clean_gcodes
+
+# Reporte diario como cuerpo HTML del email: los mismos totales y resumen por código G del PDF y un gráfico
+# SVG de la velocidad de cada máquina, armados con plantillas de texto (sin matplotlib ni reportlab)
+
+# Tamaño del gráfico de velocidad (px): cada columna de píxel es a lo sumo un escalón del trazo
+SVG_WIDTH = 600
+SVG_HEIGHT = 120
+SVG_MARGIN = 14
+
+PAGE = Template("""<!DOCTYPE html>
+<html lang="es"><head><meta charset="utf-8"><title>$title</title></head>
+<body style="font-family:Helvetica,Arial,sans-serif;font-size:13px;color:#222;max-width:${width}px">
+<h1 style="font-size:20px;text-align:center">Reporte Diario de Pantógrafos</h1>
+<p>Fecha de generación: $generated<br>Fecha de Informe: $report_date</p>
+$machines
+<p style="color:#888">--- Email generado de forma automática ---</p>
+</body></html>
+""")
+
+MACHINE = Template("""<h2 style="font-size:16px;border-bottom:1px solid #ccc">$machine</h2>
+$content
+""")
+
+SUMMARY = Template("""<p>Tiempo de operación: $operation_time min. ($operation_time_hr hs.)<br>
+Tiempo en movimiento: $motion_time min. ($motion_time_hr hs.)<br>
+Tiempo en detención: $detention_time min. ($detention_time_hr hs.)<br>
+N° de ciclos: $cycles</p>
+<h3 style="font-size:14px">Resumen por Código G</h3>
+<table style="border-collapse:collapse;font-size:12px" border="1" cellpadding="3">
+<tr style="background:#3b5998;color:#fff"><th>Código G</th><th>Ciclos</th><th>Duración Promedio (min)</th><th>Tiempo prom. en Movimiento (min)</th><th>Tiempo prom. Detención (min)</th></tr>
+$gcode_rows
+</table>
+<h3 style="font-size:14px">Velocidad</h3>
+$chart
+""")
+
+GCODE_ROW = Template("<tr><td>$gcode</td><td align=\"right\">$ncycles</td><td align=\"right\">$duration</td>"
+                     "<td align=\"right\">$motion</td><td align=\"right\">$detention</td></tr>")
+
+CHART = Template("""<svg xmlns="http://www.w3.org/2000/svg" width="$width" height="$height" viewBox="0 0 $width $height">
+<line x1="0" y1="$axis" x2="$width" y2="$axis" stroke="#999" stroke-width="1"/>
+<path d="$path" fill="none" stroke="#1f77b4" stroke-width="1"/>
+<text x="2" y="10" font-size="10" fill="#555">$max_vel mm/s</text>
+<text x="2" y="$labels" font-size="10" fill="#555">$start</text>
+<text x="$width" y="$labels" font-size="10" fill="#555" text-anchor="end">$end</text>
+</svg>""")
+
+
+def velocity_steps(df_intervals, width=SVG_WIDTH):
+    """Velocidad por columna de píxel a lo largo de la jornada (de la primera a la última marca de tiempo).
+    Cada columna toma la mayor velocidad absoluta de los intervalos que la cubren, por lo que un movimiento
+    breve no desaparece del gráfico. Devuelve (valores, inicio, fin)."""
+    starts = df_intervals['INTERVAL_START'].to_numpy().astype('datetime64[ms]').astype(np.int64)
+    ends = df_intervals['INTERVAL_END'].to_numpy().astype('datetime64[ms]')
+    # El último intervalo del día no tiene fin (ni velocidad) si su evento sigue a una detención:
+    # ocupa solo la columna de su inicio, con velocidad 0 (como en el gráfico del PDF)
+    ends = np.where(np.isnat(ends), starts, ends.astype(np.int64))
+    velocities = np.nan_to_num(np.abs(df_intervals['VEL'].to_numpy(dtype=float)))
+    first, last = starts.min(), ends.max()
+    span = max(last - first, 1)
+
+    start_cols = np.clip((starts - first) * width // span, 0, width - 1)
+    end_cols = np.clip((ends - first) * width // span, 0, width - 1)
+    end_cols = np.maximum(end_cols, start_cols)
+
+    # Columnas cubiertas por cada intervalo, sin recorrerlos uno por uno
+    lengths = end_cols - start_cols + 1
+    owners = np.repeat(np.arange(len(lengths)), lengths)
+    offsets = np.arange(len(owners)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    columns = np.zeros(width)
+    np.maximum.at(columns, start_cols[owners] + offsets, velocities[owners])
+    return columns, first, last
+
+
+def _svg_path(values, height):
+    """Trazo escalonado de los valores: un tramo horizontal por cada serie de columnas con el mismo valor."""
+    top = max(values.max(), 1e-9)
+    ys = np.round(height - SVG_MARGIN - values / top * (height - 2 * SVG_MARGIN), 1)
+    changes = np.flatnonzero(np.diff(ys) != 0) + 1
+    steps = "".join(f"H{x}V{y:g}" for x, y in zip(changes.tolist(), ys[changes].tolist()))
+    return f"M0 {ys[0]:g}{steps}H{len(values)}"
+
+
+def render_velocity_svg(df_intervals, width=SVG_WIDTH, height=SVG_HEIGHT):
+    """Gráfico SVG compacto (unos pocos KB) de la velocidad de la máquina en función del tiempo."""
+    values, first, last = velocity_steps(df_intervals, width)
+    return CHART.substitute(
+        width=width,
+        height=height,
+        axis=height - SVG_MARGIN,
+        labels=height - 2,
+        path=_svg_path(values, height),
+        max_vel=round(float(values.max()), 1),
+        start=np.datetime64(int(first), 'ms').astype(datetime).strftime('%H:%M'),
+        end=np.datetime64(int(last), 'ms').astype(datetime).strftime('%H:%M'),
+    )
+
+
+def _machine_summary(df_intervals, chart_width, chart_height):
+    summary = summarize_intervals(df_intervals)
+    df_gcodes = summary.df_gcodes
+    gcode_rows = "\n".join(
+        GCODE_ROW.substitute(
+            gcode=html.escape(str(gcode)), ncycles=ncycles, duration=duration, motion=motion, detention=detention
+        )
+        for gcode, ncycles, duration, motion, detention in zip(
+            clean_gcodes(df_gcodes['gcode'], "Sin definir"),
+            df_gcodes['ncycles'].tolist(),
+            df_gcodes['average_duration'].round(2).tolist(),
+            df_gcodes['average_motion'].round(2).tolist(),
+            df_gcodes['average_detention'].round(2).tolist(),
+        )
+    )
+    operation_time = summary.operation_time.round(2)
+    motion_time = summary.motion_time.round(2)
+    detention_time = summary.detention_time.round(2)
+    return SUMMARY.substitute(
+        operation_time=operation_time,
+        operation_time_hr=round(operation_time / 60, 2),
+        motion_time=motion_time,
+        motion_time_hr=round(motion_time / 60, 2),
+        detention_time=detention_time,
+        detention_time_hr=round(detention_time / 60, 2),
+        cycles=summary.cycles,
+        gcode_rows=gcode_rows,
+        chart=render_velocity_svg(summary.df_intervals, chart_width, chart_height),
+    )
+
+
+def render_html_report(report_date, dfs_machines, chart_width=SVG_WIDTH, chart_height=SVG_HEIGHT):
+    """Arma el reporte de una fecha como cuerpo HTML del email y lo devuelve, o None si no se registraron
+    movimientos en la fecha (como render_report, para usarse como etapa de generación del pipeline)."""
+    if dfs_machines == []:
+        return None
+    try:
+        with stage("html", date=report_date) as metrics:
+            metrics["rows_in"] = sum(len(df_intervals) for _, _, df_intervals in dfs_machines)
+            machines = "".join(
+                MACHINE.substitute(
+                    machine=html.escape(str(machine)),
+                    content=_machine_summary(df_intervals, chart_width, chart_height) if not df_intervals.empty
+                    else "<p>No se registraron movimientos en la fecha de reporte.</p>",
+                )
+                for machine, _, df_intervals in dfs_machines
+            )
+            content = PAGE.substitute(
+                title=f"Reporte Pantógrafos ({report_date.strftime('%d-%m-%Y')})",
+                width=chart_width + 40,
+                generated=datetime.now().strftime("%d/%m/%Y"),
+                report_date=report_date.strftime('%d/%m/%Y'),
+                machines=machines,
+            )
+            metrics["bytes"] = len(content.encode("utf-8"))
+        return content
+
+    except Exception as e:
+        logging.error(f"Error al generar reporte HTML: {e}")
+        raise
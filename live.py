@@ -0,0 +1,219 @@
+import io
+import os
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+from schema import read_events_csv, csv_tail_hash
+from segmentation import segment_events_with_bounds
+from process_data import EXCLUDED_USERS
+
+# Bytes del CSV que se interpretan por vez al leer registros nuevos
+CSV_BLOCK_SIZE = 8 * 2**20
+
+
+def _interval_counters(df_intervals, previous_directions):
+    """Totales (en minutos) y cambios de dirección de un tramo de intervalos, con el mismo cálculo que
+    analytics.prepare_intervals. previous_directions son las direcciones de los (hasta) dos intervalos
+    anteriores al tramo, necesarias para detectar los cambios de dirección en sus primeros intervalos.
+    Devuelve los contadores y las direcciones de los dos últimos intervalos."""
+    duration = (df_intervals['INTERVAL_END'] - df_intervals['INTERVAL_START']).dt.total_seconds().to_numpy() / 60
+    duration = np.round(duration, 3)
+    vel = df_intervals['VEL'].to_numpy(dtype=float)
+    moving = vel != 0
+
+    directions = np.r_[previous_directions, np.sign(vel)]
+    changes = np.abs(directions[2:] - directions[:-2]) == 2
+
+    counters = {
+        "intervals": len(df_intervals),
+        "operation_time": np.nansum(duration),
+        "motion_time": np.nansum(duration[moving]),
+        "detention_time": np.nansum(duration[~moving]),
+        "dir_changes": int(changes[max(len(previous_directions) - 2, 0):].sum()),
+    }
+    return counters, directions[-2:]
+
+
+class MachineSegmenter:
+    """Segmentación incremental de los eventos de una máquina en un día.
+
+    Los intervalos que ya no pueden cambiar al llegar nuevos registros se cierran y solo se conservan sus
+    contadores; los eventos desde el inicio del primer intervalo abierto se vuelven a segmentar junto con
+    los registros nuevos. Solo el último evento cambia de estado al recibir el siguiente, por lo que a lo
+    sumo cambian las dos últimas corridas de estado y el intervalo agrupado que contiene a la antepenúltima:
+    todos los intervalos anteriores a ese quedan cerrados, y el resultado coincide con la segmentación
+    del día completo."""
+
+    def __init__(self, machine, day):
+        self.machine = machine
+        self.day = day
+        self.closed_intervals = []
+        self.closed_counters = {"intervals": 0, "operation_time": 0.0, "motion_time": 0.0, "detention_time": 0.0, "dir_changes": 0}
+        self.last_directions = np.array([])
+        self.open_intervals = None
+        self.tail = None
+        self.events = []
+        self.rows = 0
+
+    def _reset(self):
+        self.closed_intervals = []
+        self.closed_counters = dict.fromkeys(self.closed_counters, 0)
+        self.last_directions = np.array([])
+
+    def append(self, df_new):
+        """Incorpora registros nuevos de la máquina en el día."""
+        df_new = df_new[~df_new['USER'].isin(EXCLUDED_USERS)]
+        if df_new.empty:
+            return
+        self.events.append(df_new)
+        self.rows += len(df_new)
+
+        if self.tail is not None and df_new['DATE_TIME'].min() < self.tail['DATE_TIME'].iloc[-1]:
+            # Registros fuera de orden: se vuelve a segmentar el día completo
+            logging.warning(f"Registros fuera de orden en {self.machine}, se vuelve a segmentar el día.")
+            self._reset()
+            tail = pd.concat(self.events)
+        else:
+            tail = df_new if self.tail is None else pd.concat([self.tail, df_new])
+
+        self._update(tail.sort_values('DATE_TIME', kind='stable'))
+
+    def _update(self, tail):
+        _, df_intervals, bounds = segment_events_with_bounds(tail)
+        run_starts, run_intervals = bounds["run_starts"], bounds["run_intervals"]
+
+        # Primer intervalo que aún puede cambiar: el que contiene a la antepenúltima corrida
+        n_runs = len(run_starts)
+        first_open = run_intervals[n_runs - 3] if n_runs >= 3 else 0
+        if first_open > 0:
+            closed = df_intervals.iloc[:first_open]
+            counters, self.last_directions = _interval_counters(closed, self.last_directions)
+            for key, value in counters.items():
+                self.closed_counters[key] += value
+            self.closed_intervals.append(closed)
+
+            first_event = run_starts[np.searchsorted(run_intervals, first_open)]
+            tail = tail.iloc[first_event:]
+
+        self.tail = tail
+        self.open_intervals = df_intervals.iloc[first_open:]
+
+    def intervals(self):
+        """Intervalos del día hasta el momento, con el mismo formato que la segmentación por lotes."""
+        return pd.concat(self.closed_intervals + [self.open_intervals], ignore_index=True)
+
+    def snapshot(self):
+        """Resumen compacto del estado actual de la máquina en el día."""
+        if self.open_intervals is None:
+            return {"machine": self.machine, "date": self.day.strftime('%Y-%m-%d'), "events": 0}
+
+        counters, _ = _interval_counters(self.open_intervals, self.last_directions)
+        totals = {key: self.closed_counters[key] + value for key, value in counters.items()}
+        current = self.open_intervals.iloc[-1]
+        last_event = self.tail.iloc[-1]
+
+        return {
+            "machine": self.machine,
+            "date": self.day.strftime('%Y-%m-%d'),
+            "state": 'MOVIMIENTO' if current['VEL'] != 0 else 'DETENIDO',
+            "state_since": current['INTERVAL_START'].isoformat(),
+            "last_event": last_event['DATE_TIME'].isoformat(),
+            "g_code": last_event['G-CODE'],
+            "user": last_event['USER'],
+            "x_pos": round(float(last_event['X_POS']), 3),
+            "y_pos": round(float(last_event['Y_POS']), 3),
+            "operation_time": round(float(totals["operation_time"]), 2),
+            "motion_time": round(float(totals["motion_time"]), 2),
+            "detention_time": round(float(totals["detention_time"]), 2),
+            "cycles": totals["dir_changes"] + 1 if totals["intervals"] else 0,
+            "intervals": totals["intervals"],
+            "events": self.rows,
+        }
+
+
+class LiveEngine:
+    """Mantiene la segmentación del día en curso de cada máquina a partir de los registros que se van
+    agregando al CSV, leyendo solo los bytes nuevos del archivo en cada actualización."""
+
+    def __init__(self, machine_names, since=None):
+        self.machine_names = list(machine_names)
+        self.since = pd.Timestamp(since) if since is not None else None
+        self.machines = {}
+        self.offset = 0
+        self.tail_hash = None
+        self.header = None
+
+    def consume(self, df):
+        """Incorpora registros nuevos (de cualquier máquina y fecha). Devuelve la cantidad considerada."""
+        df = df[df['MACHINE'].isin(self.machine_names)]
+        if self.since is not None:
+            df = df[df['DATE_TIME'] >= self.since]
+
+        for (day, machine), df_part in df.groupby([df['DATE_TIME'].dt.normalize(), 'MACHINE'], observed=True):
+            current = self.machines.get(machine)
+            if current is None or day > current.day:
+                # Nuevo día: la segmentación del día anterior ya está completa
+                self.machines[machine] = MachineSegmenter(machine, day)
+            elif day < current.day:
+                logging.warning(f"Se descartan {len(df_part)} registros de {machine} de un día ya cerrado.")
+                continue
+            self.machines[machine].append(df_part)
+
+        return len(df)
+
+    def consume_csv(self, csv_path, block_size=CSV_BLOCK_SIZE):
+        """Lee del CSV únicamente las líneas completas agregadas desde la lectura anterior.
+        Si el archivo no es una extensión del ya leído (se achicó o cambiaron los bytes anteriores a la posición
+        leída, como al descargarse completo un remoto reescrito) se descarta el estado y se vuelve a leer
+        desde el inicio."""
+        size = os.path.getsize(csv_path)
+        rows = 0
+        with open(csv_path, "rb") as f:
+            if size < self.offset or (self.tail_hash is not None and csv_tail_hash(f, self.offset) != self.tail_hash):
+                logging.warning("El CSV fue reemplazado, se vuelve a leer desde el inicio.")
+                self.machines, self.offset = {}, 0
+
+            if self.offset == 0:
+                f.seek(0)
+                header = f.readline()
+                if not header.endswith(b"\n"):
+                    # El encabezado aún no terminó de escribirse
+                    return 0
+                self.header = header
+                self.offset = f.tell()
+
+            f.seek(self.offset)
+            while self.offset < size:
+                data = f.read(min(block_size, size - self.offset))
+                # Una línea incompleta al final se lee en la próxima actualización
+                end = data.rfind(b"\n") + 1
+                if end == 0:
+                    break
+                self.offset += end
+                f.seek(self.offset)
+                rows += self.consume(read_events_csv(io.BytesIO(self.header + data[:end])))
+
+            self.tail_hash = csv_tail_hash(f, self.offset)
+        return rows
+
+    def intervals(self):
+        """{máquina: intervalos del día en curso}."""
+        return {machine: segmenter.intervals() for machine, segmenter in self.machines.items()}
+
+    def snapshot(self):
+        """{máquina: resumen compacto del estado actual}."""
+        return {
+            machine: self.machines[machine].snapshot()
+            for machine in self.machine_names if machine in self.machines
+        }
+
+
+def write_snapshot(snapshot_path, snapshot):
+    """Escribe el resumen en JSON de forma atómica, para que quien lo lea nunca vea un archivo a medio escribir."""
+    tmp_path = snapshot_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, indent=2, ensure_ascii=False, default=str)
+    os.replace(tmp_path, snapshot_path)
@@ -1,19 +1,23 @@
 import os
+import time
+import signal
 import logging
+import argparse
+import threading
 import yaml
 from datetime import datetime, date, timedelta
 
-from download_data import download_csv_from_gdrive
-from process_data import process_csv
-from generate_report import generate_pdf_report
-from send_email import send_email_report
+# Solo módulos livianos al inicio: pandas, numpy, reportlab, matplotlib y googleapiclient se
+# importan dentro de main() cuando hay reportes pendientes (la mayoría de las ejecuciones no tiene)
 
 # =========================
 # 1. Cargar configuración
 # =========================
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-with open(os.path.join(BASE_DIR, "config.yaml"), "r", encoding="utf-8") as f:
+CONFIG_FILE = os.path.join(BASE_DIR, "config.yaml")
+
+with open(CONFIG_FILE, "r", encoding="utf-8") as f:
     config = yaml.safe_load(f)
 
 # Rutas
@@ -22,11 +26,7 @@ REPORTS_DIR = os.path.join(BASE_DIR, config["paths"]["reports_dir"])
 LOGS_DIR = os.path.join(BASE_DIR, config["paths"]["logs_dir"])
 CREDENTIALS_FILE = os.path.join(BASE_DIR, config["google_drive"]["credentials_file"])
 
-try:
-    with open(os.path.join(BASE_DIR, config["paths"]["last_sync_file_path"]), "r") as file:
-        LAST_SYNC_DATE = datetime.strptime(file.read().strip(), "%Y-%m-%d").date()
-except (FileNotFoundError, ValueError) as e:
-    LAST_SYNC_DATE = f"Error al leer la fecha de última sincronización: {e}"
+LAST_SYNC_FILE = os.path.join(BASE_DIR, config["paths"]["last_sync_file_path"])
 
 for folder in [DATA_DIR, REPORTS_DIR, LOGS_DIR, os.path.dirname(CREDENTIALS_FILE)]:
     os.makedirs(folder, exist_ok=True)
@@ -34,18 +34,33 @@ for folder in [DATA_DIR, REPORTS_DIR, LOGS_DIR, os.path.dirname(CREDENTIALS_FILE
 # Archivos
 INPUT_CSV_FILE = os.path.join(DATA_DIR, config["paths"]["input_csv_file"])
 REPORT_FILE_BASE_NAME = config["paths"]["report_file_base_name"]
-
-# Máquinas
-MACHINES = config["machines"]
-
-# Última fecha de reporte
-LAST_REPORT_DATE = datetime.strptime(config['last_report_date'], '%Y-%m-%d').date()
+EVENT_STORE_DIR = os.path.join(BASE_DIR, config["paths"].get("event_store_dir", "data/event_store"))
+AGGREGATES_DB = os.path.join(BASE_DIR, config["paths"].get("aggregates_db", "data/aggregates.sqlite"))
+CACHE_DIR = os.path.join(BASE_DIR, config["paths"].get("cache_dir", "data/cache"))
 
 # Días en que se envían reportes
 REPORT_DAYS = config["report_days"]
 
+# Opciones del reporte PDF (formato, resolución y puntos máximos del gráfico, tablas)
+REPORT_OPTIONS = {key: value for key, value in config.get("report", {}).items() if key != "output"}
+
+# Reporte diario: "pdf" (adjunto) o "html" (cuerpo del email con gráficos SVG, sin matplotlib ni reportlab)
+REPORT_OUTPUT = config.get("report", {}).get("output", "pdf")
+
+# Caché de intervalos procesados y reportes generados (activado y tamaño máximo en MB)
+CACHE_OPTIONS = config.get("cache", {})
+
+# Modo en vivo: segundos entre actualizaciones y si se descarga el CSV en cada una
+LIVE_OPTIONS = config.get("live", {})
+
+# Modo servicio: segundos entre consultas y origen de la fecha de sincronización ("sync" o "drive")
+DAEMON_OPTIONS = config.get("daemon", {})
+
 # Logging
 LOG_FILE = os.path.join(LOGS_DIR, "daily_report.log")
+METRICS_FILE = os.path.join(LOGS_DIR, "metrics.jsonl")
+PROFILES_DIR = os.path.join(LOGS_DIR, "profiles")
+LIVE_SNAPSHOT_FILE = os.path.join(LOGS_DIR, "live_snapshot.json")
 file_handler = logging.FileHandler(LOG_FILE, encoding="utf-8")
 
 logging.basicConfig(
@@ -58,76 +73,461 @@ logging.basicConfig(
 # =========================
 # 2. Main
 # =========================
-def main():
-    if not isinstance(LAST_SYNC_DATE, date):
-        logging.error(LAST_SYNC_DATE)
-
-    elif LAST_REPORT_DATE < LAST_SYNC_DATE - timedelta(days=1): 
-        logging.info("== INICIO DEL SCRIPT ==")
-        
-        # Generar lista de fechas de reportes pendientes
-        pending_reports = [
-            LAST_REPORT_DATE + timedelta(days=i+1)
-            for i in range((LAST_SYNC_DATE - timedelta(days=1) - LAST_REPORT_DATE).days)
-            if (LAST_REPORT_DATE + timedelta(days=i+1)).weekday() in REPORT_DAYS
-            ]
-        
-        logging.info(f"Fechas de reportes pendientes: {[d.strftime('%Y-%m-%d') for d in pending_reports]}")
+def save_config():
+    """Guarda la configuración (con la fecha del último reporte enviado) de forma atómica, para que una
+    interrupción nunca deje el archivo a medio escribir."""
+    tmp_file = CONFIG_FILE + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f, default_flow_style=False, allow_unicode=True)
+    os.replace(tmp_file, CONFIG_FILE)
 
-        try:
-            download_csv_from_gdrive(
-                config["google_drive"]["file_id"],
-                INPUT_CSV_FILE,
-                CREDENTIALS_FILE
+
+def read_last_sync_date():
+    """Fecha de la última sincronización del CSV. Devuelve el mensaje de error si no se pudo leer."""
+    try:
+        with open(LAST_SYNC_FILE, "r") as file:
+            return datetime.strptime(file.read().strip(), "%Y-%m-%d").date()
+    except (FileNotFoundError, ValueError) as e:
+        return f"Error al leer la fecha de última sincronización: {e}"
+
+
+def get_sites():
+    """Sitios a reportar: cada uno con su archivo en Google Drive (file_id), sus máquinas (machines) y los
+    destinatarios de sus reportes (recipients). Sin la sección sites se usa un único sitio con
+    google_drive.file_id, machines y smtp.recipients, que conserva las rutas y la fecha de último reporte
+    de la configuración general."""
+    if config.get("sites"):
+        return config["sites"]
+    return [{
+        "name": None,
+        "file_id": config["google_drive"]["file_id"],
+        "machines": config["machines"]["machine_name"],
+        "recipients": config["smtp"]["recipients"],
+    }]
+
+
+def get_site(name=None):
+    """Sitio con el nombre indicado (por defecto, el primero)."""
+    sites = get_sites()
+    if name is None:
+        return sites[0]
+    for site in sites:
+        if site["name"] == name:
+            return site
+    raise ValueError(f"No existe el sitio {name}")
+
+
+def site_paths(site):
+    """Rutas del CSV, el almacén de eventos, la base de agregados y los reportes de un sitio. Cada sitio
+    con nombre guarda sus datos en una subcarpeta con ese nombre y lo agrega al inicio de sus reportes."""
+    name = site["name"]
+    if not name:
+        return {
+            "input_csv": INPUT_CSV_FILE,
+            "event_store": EVENT_STORE_DIR,
+            "aggregates_db": AGGREGATES_DB,
+            "report_file_base_name": REPORT_FILE_BASE_NAME,
+        }
+    return {
+        "input_csv": os.path.join(DATA_DIR, name, config["paths"]["input_csv_file"]),
+        "event_store": os.path.join(EVENT_STORE_DIR, name),
+        "aggregates_db": os.path.join(os.path.dirname(AGGREGATES_DB), name, os.path.basename(AGGREGATES_DB)),
+        "report_file_base_name": f"{name}_{REPORT_FILE_BASE_NAME}",
+    }
+
+
+def site_label(site):
+    return f" {site['name']}" if site["name"] else ""
+
+
+def site_last_report_date(site):
+    """Fecha del último reporte enviado del sitio (los sitios sin fecha propia usan la general)."""
+    return datetime.strptime(site.get("last_report_date", config['last_report_date']), '%Y-%m-%d').date()
+
+
+def set_site_last_report_date(site, report_date):
+    """Registra en la configuración la fecha del último reporte enviado del sitio."""
+    (site if site["name"] else config)['last_report_date'] = report_date.strftime('%Y-%m-%d')
+    save_config()
+
+
+def pending_report_dates(last_sync_date, site=None):
+    """Fechas de reporte posteriores al último reporte enviado y anteriores a la fecha de sincronización."""
+    last_report_date = site_last_report_date(site or get_site())
+    return [
+        last_report_date + timedelta(days=i+1)
+        for i in range((last_sync_date - timedelta(days=1) - last_report_date).days)
+        if (last_report_date + timedelta(days=i+1)).weekday() in REPORT_DAYS
+        ]
+
+
+def report_site(site, pending_reports, jobs=1, cache=None, pool=None):
+    """Procesa las fechas pendientes de un sitio y envía sus reportes a los destinatarios del sitio."""
+    from concurrent.futures import ThreadPoolExecutor
+    from event_store import update_event_store
+    from process_data import process_event_store
+    from aggregates import save_daily_aggregates
+    from send_email import SmtpMailer, send_email_report
+    from pipeline import run_pipeline
+    if REPORT_OUTPUT == "html":
+        from html_report import render_html_report
+
+    paths = site_paths(site)
+    machines = {'machine_name': site["machines"]}
+    smtp_config = dict(config["smtp"], recipients=site["recipients"])
+
+    # Incorporar al almacén de eventos solo los registros nuevos
+    update_event_store(paths["input_csv"], paths["event_store"])
+
+    report_files = {
+        report_date: os.path.join(
+            REPORTS_DIR, paths["report_file_base_name"].replace("date", report_date.strftime('%d-%m-%Y'))
+        )
+        for report_date in pending_reports
+    }
+
+    def compute(report_date):
+        """Procesa la fecha leyendo solo sus particiones y guarda sus agregados para los reportes por período
+        (con jobs > 1 las máquinas se segmentan en paralelo)."""
+        dataframes_by_date = process_event_store(
+            paths["event_store"], machines, [report_date], cache=cache, jobs=jobs, pool=pool
+        )
+        save_daily_aggregates(paths["aggregates_db"], dataframes_by_date, machines['machine_name'])
+        if REPORT_OUTPUT != "html" or pool is None:
+            return dataframes_by_date[report_date]
+        # El reporte HTML se genera en los procesos del pool y solo usa los intervalos
+        return [
+            [machine, df_events[[]], df_intervals]
+            for machine, df_events, df_intervals in dataframes_by_date[report_date]
+        ]
+
+    def deliver(report_date, report):
+        """Envía el reporte de la fecha (archivo PDF o HTML) y registra que fue enviado."""
+        subject = f"Reporte Pantógrafos{site_label(site)} ({report_date.strftime('%d-%m-%Y')})"
+        if report is not None and REPORT_OUTPUT == "html":
+            send_email_report(
+                subject=subject,
+                body="El reporte se muestra en formato HTML.\n--- Email generado de forma automática ---",
+                attachment_path=None,
+                smtp_config=smtp_config,
+                mailer=mailer,
+                html_body=report
             )
-            
-            temp_files = []
-
-            for report_date in pending_reports:
-                machines_dataframes = process_csv(INPUT_CSV_FILE, MACHINES, report_date)
-                report_file_name = f"{REPORT_FILE_BASE_NAME.replace("date", report_date.strftime('%d-%m-%Y'))}"
-                report_file = os.path.join(REPORTS_DIR, report_file_name)
-
-                
-                if machines_dataframes != []:
-                    generate_pdf_report(machines_dataframes, report_file, report_date)
-                    send_email_report(
-                        subject=f"Reporte Pantógrafos ({report_date.strftime('%d-%m-%Y')})",
-                        body="--- Email generado de forma automática ---",
-                        attachment_path=report_file,
-                        smtp_config=config["smtp"]
-                    )
-                    temp_files.append(report_file)
-                
-                else:
-                    send_email_report(
-                        subject=f"Reporte Pantógrafos ({report_date.strftime('%d-%m-%Y')})",
-                        body="No se registraron movimientos en la fecha.\n" \
-                        "--- Email generado de forma automática ---",
-                        attachment_path=None,
-                        smtp_config=config["smtp"]
-                    )
-
-                # Modificar fecha de último reporte enviado
-                config['last_report_date'] = report_date.strftime('%Y-%m-%d')
-
-                # Guardar cambios en archivo de configuración
-                with open("config.yaml", "w", encoding="utf-8") as f:
-                    yaml.safe_dump(config, f, default_flow_style=False, allow_unicode=True)
-                
-
-            # --- Eliminar informe generados de la carpeta local ---
-            for f in temp_files:
+
+        elif report is not None:
+            report_file = report
+            # Desglose completo en CSV de las máquinas cuya tabla de ciclos no entra en el PDF
+            breakdown = os.path.splitext(report_file)[0] + "_desglose.csv"
+            extra_attachments = [breakdown] if os.path.exists(breakdown) else []
+            send_email_report(
+                subject=subject,
+                body="--- Email generado de forma automática ---",
+                attachment_path=report_file,
+                smtp_config=smtp_config,
+                mailer=mailer,
+                extra_attachments=extra_attachments
+            )
+
+            # --- Eliminar informe generado de la carpeta local (el caché conserva una copia) ---
+            # (el CSV descargado se conserva para que la próxima descarga sea incremental)
+            for f in [report_file] + extra_attachments:
                 if os.path.exists(f):
                     os.remove(f)
 
-            if os.path.exists(INPUT_CSV_FILE):
-                os.remove(INPUT_CSV_FILE)
+        else:
+            send_email_report(
+                subject=subject,
+                body="No se registraron movimientos en la fecha.\n" \
+                "--- Email generado de forma automática ---",
+                attachment_path=None,
+                smtp_config=smtp_config,
+                mailer=mailer
+            )
+
+        # Modificar fecha de último reporte enviado
+        set_site_last_report_date(site, report_date)
+
+    def render_pdf(report_date, dfs_machines):
+        """Genera el PDF de la fecha. Con pool, los gráficos de sus máquinas se generan en paralelo."""
+        if dfs_machines == []:
+            return None
+        # generate_report (reportlab y matplotlib) se carga recién al generar un reporte con movimientos
+        from generate_report import render_report
+        return render_report(report_date, dfs_machines, report_files, cache=cache, pool=pool, **REPORT_OPTIONS)
 
-        except Exception as e:
-            logging.critical(f"Ejecución interrumpida: {e}")
+    # Mientras se envía el reporte de una fecha se genera el de la siguiente y se procesa la posterior.
+    # Los PDF se generan desde hilos que reparten los gráficos y el armado de cada fecha en el pool de
+    # procesos si jobs > 1 (varias fechas a la vez); los reportes HTML, directamente en el pool. Los emails
+    # se envían en otro hilo por una única sesión SMTP, estrictamente en orden de fecha
+    if REPORT_OUTPUT == "html":
+        render = render_html_report
+        render_executor = pool or ThreadPoolExecutor(1)
+    else:
+        render = render_pdf
+        render_executor = ThreadPoolExecutor(jobs if pool is not None else 1)
+    try:
+        with SmtpMailer(smtp_config) as mailer, \
+                ThreadPoolExecutor(1) as compute_executor, ThreadPoolExecutor(1) as deliver_executor:
+            run_pipeline(
+                pending_reports, compute, render, deliver,
+                (compute_executor, render_executor, deliver_executor)
+            )
+    finally:
+        if render_executor is not pool:
+            render_executor.shutdown()
+
+
+def main(jobs=1, profile=False, last_sync_date=None, pool=None):
+    """Genera y envía los reportes pendientes de todos los sitios. last_sync_date es la fecha de
+    sincronización común a todos o un diccionario {nombre del sitio: fecha}."""
+    if last_sync_date is None:
+        last_sync_date = read_last_sync_date()
+
+    if not isinstance(last_sync_date, (date, dict)):
+        logging.error(last_sync_date)
+        return
+
+    pending_by_site = []
+    for site in get_sites():
+        sync_date = last_sync_date.get(site["name"]) if isinstance(last_sync_date, dict) else last_sync_date
+        if sync_date is not None and site_last_report_date(site) < sync_date - timedelta(days=1):
+            pending_by_site.append((site, pending_report_dates(sync_date, site)))
+
+    if not pending_by_site:
+        return
+
+    logging.info("== INICIO DEL SCRIPT ==")
+    for site, pending_reports in pending_by_site:
+        logging.info(
+            f"Fechas de reportes pendientes{site_label(site)}: {[d.strftime('%Y-%m-%d') for d in pending_reports]}"
+        )
+    pending_by_site = [(site, pending_reports) for site, pending_reports in pending_by_site if pending_reports]
+
+    if not pending_by_site:
+        logging.info("== FIN DEL SCRIPT ==")
+        return
+
+    from concurrent.futures.process import BrokenProcessPool
+    try:
+        from metrics import configure_metrics, worker_pool
+        from download_data import DOWNLOAD_CHUNK_MB, DOWNLOAD_WORKERS, download_csv_files
+        from artifact_cache import ArtifactCache
+
+        configure_metrics(METRICS_FILE, profile_dir=PROFILES_DIR if profile else None)
+
+        # Con el caché, una nueva ejecución tras una falla reutiliza los intervalos y PDF ya generados
+        cache = ArtifactCache(CACHE_DIR, CACHE_OPTIONS.get("max_mb", 1024)) if CACHE_OPTIONS.get("enabled", True) else None
+
+        # Los CSV de todos los sitios se descargan a la vez por un mismo cliente autenticado
+        for site, _ in pending_by_site:
+            os.makedirs(os.path.dirname(site_paths(site)["input_csv"]), exist_ok=True)
+        downloads = download_csv_files(
+            [(site["file_id"], site_paths(site)["input_csv"]) for site, _ in pending_by_site],
+            CREDENTIALS_FILE,
+            max_workers=config["google_drive"].get("max_workers", DOWNLOAD_WORKERS),
+            chunk_mb=config["google_drive"].get("chunk_mb", DOWNLOAD_CHUNK_MB)
+        )
+
+        # Con jobs > 1 un mismo pool de procesos segmenta las máquinas y genera los reportes de todos los sitios
+        # (sus procesos cargan reportlab y matplotlib recién al recibir un gráfico o PDF)
+        process_pool = pool or (worker_pool(jobs, LOG_FILE) if jobs > 1 else None)
+        try:
+            # Cada sitio se procesa por separado: la falla de uno no impide enviar los reportes de los demás
+            for site, pending_reports in pending_by_site:
+                try:
+                    downloaded = downloads[site_paths(site)["input_csv"]]
+                    if isinstance(downloaded, Exception):
+                        raise downloaded
+                    report_site(site, pending_reports, jobs=jobs, cache=cache, pool=process_pool)
+                except BrokenProcessPool:
+                    # Un proceso del pool terminó abruptamente: los sitios restantes también fallarían
+                    raise
+                except Exception as e:
+                    logging.critical(f"Ejecución interrumpida{site_label(site)}: {e}")
         finally:
-            logging.info("== FIN DEL SCRIPT ==")
+            if process_pool is not None and process_pool is not pool:
+                process_pool.shutdown()
+
+    except BrokenProcessPool as e:
+        logging.critical(f"Ejecución interrumpida: {e}")
+        if pool is not None:
+            # El pool es del servicio, que debe reemplazarlo por uno nuevo
+            raise
+    except Exception as e:
+        logging.critical(f"Ejecución interrumpida: {e}")
+    finally:
+        logging.info("== FIN DEL SCRIPT ==")
+
+def last_period(period, today=None):
+    """Devuelve (inicio, fin) de la última semana (lunes a domingo) o del último mes completo."""
+    today = today or date.today()
+    if period == "semana":
+        end_date = today - timedelta(days=today.weekday() + 1)
+        return end_date - timedelta(days=6), end_date
+    end_date = today.replace(day=1) - timedelta(days=1)
+    return end_date.replace(day=1), end_date
+
+
+def range_report(start_date, end_date, send=False, profile=False, site_name=None):
+    """Genera el reporte de un período de un sitio (por defecto, el primero) leyendo únicamente el almacén
+    de agregados diarios (no descarga ni vuelve a procesar el CSV). Si send es True lo envía por email."""
+    logging.info(f"== REPORTE DEL PERÍODO {start_date} - {end_date} ==")
+    try:
+        from metrics import configure_metrics
+        from aggregates import load_range_summary
+        from generate_report import generate_range_report
+        from send_email import send_email_report
+
+        configure_metrics(METRICS_FILE, profile_dir=PROFILES_DIR if profile else None)
+
+        site = get_site(site_name)
+        paths = site_paths(site)
+        summary = load_range_summary(paths["aggregates_db"], site["machines"], start_date, end_date)
+        period = f"{start_date.strftime('%d-%m-%Y')}_{end_date.strftime('%d-%m-%Y')}"
+        report_file = os.path.join(REPORTS_DIR, paths["report_file_base_name"].replace("date", period))
+        generate_range_report(summary, report_file, start_date, end_date)
+
+        if send:
+            send_email_report(
+                subject=f"Reporte Pantógrafos{site_label(site)} "
+                        f"({start_date.strftime('%d-%m-%Y')} al {end_date.strftime('%d-%m-%Y')})",
+                body="--- Email generado de forma automática ---",
+                attachment_path=report_file,
+                smtp_config=dict(config["smtp"], recipients=site["recipients"])
+            )
+            os.remove(report_file)
+        else:
+            logging.info(f"Reporte del período guardado en {report_file}")
+
+    except Exception as e:
+        logging.critical(f"Ejecución interrumpida: {e}")
+    finally:
+        logging.info("== FIN DEL SCRIPT ==")
+
+
+def live_mode(profile=False, site_name=None):
+    """Actualiza periódicamente la segmentación del día en curso de un sitio (por defecto, el primero) leyendo
+    solo los registros nuevos del CSV (descargados de forma incremental) y escribe el estado de cada máquina
+    en LIVE_SNAPSHOT_FILE."""
+    from metrics import configure_metrics
+    from download_data import download_csv_from_gdrive
+    from live import LiveEngine, write_snapshot
+
+    configure_metrics(METRICS_FILE, profile_dir=PROFILES_DIR if profile else None)
+    poll_seconds = LIVE_OPTIONS.get("poll_seconds", 300)
+    site = get_site(site_name)
+    input_csv = site_paths(site)["input_csv"]
+    os.makedirs(os.path.dirname(input_csv), exist_ok=True)
+    engine = LiveEngine(site["machines"], since=date.today())
+
+    logging.info("== INICIO DEL MODO EN VIVO ==")
+    try:
+        while True:
+            try:
+                if LIVE_OPTIONS.get("download", True):
+                    download_csv_from_gdrive(site["file_id"], input_csv, CREDENTIALS_FILE)
+                rows = engine.consume_csv(input_csv)
+                write_snapshot(LIVE_SNAPSHOT_FILE, engine.snapshot())
+                logging.info(f"Estado en vivo actualizado ({rows} registros nuevos).")
+            except Exception as e:
+                logging.error(f"Error al actualizar el estado en vivo: {e}")
+            time.sleep(poll_seconds)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logging.info("== FIN DEL MODO EN VIVO ==")
+
+
+def daemon_mode(jobs=1, profile=False):
+    """Servicio de larga duración: mantiene cargadas las librerías del pipeline, el cliente de Google Drive,
+    los estilos del reporte y (con jobs > 1) el pool de procesos, y genera los reportes pendientes en cuanto
+    avanza la fecha de sincronización (del archivo last_sync o de la modificación del CSV en Google Drive).
+    Con SIGTERM o Ctrl+C termina la ejecución en curso antes de salir."""
+    from concurrent.futures.process import BrokenProcessPool
+    from metrics import configure_metrics
+    from download_data import get_drive_service, remote_modified_date
+    # Módulos del pipeline (con pandas, numpy, pyarrow y reportlab) cargados una sola vez
+    import event_store, process_data, aggregates, send_email
+    if REPORT_OUTPUT == "html":
+        from metrics import worker_pool as report_pool
+    else:
+        from generate_report import warm_up, report_pool
+
+    configure_metrics(METRICS_FILE, profile_dir=PROFILES_DIR if profile else None)
+    poll_seconds = DAEMON_OPTIONS.get("poll_seconds", 300)
+    watch = DAEMON_OPTIONS.get("watch", "sync")
+
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        logging.info("Se recibió la señal de detención, el servicio termina al completar la ejecución en curso.")
+        stop.set()
+
+    for name in ["SIGINT", "SIGTERM", "SIGBREAK"]:
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), request_stop)
+
+    logging.info("== INICIO DEL SERVICIO ==")
+    if REPORT_OUTPUT != "html":
+        warm_up()
+    pool = report_pool(jobs, LOG_FILE, warm=True) if jobs > 1 else None
+    try:
+        while not stop.is_set():
+            try:
+                if watch == "drive":
+                    # Fecha de modificación del archivo de cada sitio
+                    service = get_drive_service(CREDENTIALS_FILE)
+                    last_sync_date = {
+                        site["name"]: remote_modified_date(site["file_id"], CREDENTIALS_FILE, service)
+                        for site in get_sites()
+                    }
+                    sync_dates = [(site, last_sync_date[site["name"]]) for site in get_sites()]
+                else:
+                    last_sync_date = read_last_sync_date()
+                    sync_dates = [(site, last_sync_date) for site in get_sites()]
+
+                if not isinstance(last_sync_date, (date, dict)):
+                    logging.error(last_sync_date)
+                elif any(pending_report_dates(sync_date, site) for site, sync_date in sync_dates):
+                    main(jobs=jobs, profile=profile, last_sync_date=last_sync_date, pool=pool)
+            except BrokenProcessPool as e:
+                # Un proceso del pool terminó abruptamente (por ejemplo, por falta de memoria) y el pool ya no
+                # acepta tareas: se reemplaza por uno nuevo y las fechas pendientes se reintentan en el próximo ciclo
+                logging.error(f"El pool de procesos dejó de funcionar, se crea uno nuevo: {e}")
+                pool.shutdown()
+                pool = report_pool(jobs, LOG_FILE, warm=True)
+            except Exception as e:
+                logging.error(f"Error al consultar reportes pendientes: {e}")
+            stop.wait(poll_seconds)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        logging.info("== FIN DEL SERVICIO ==")
+
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Reporte diario de pantógrafos")
+    parser.add_argument("--jobs", type=int, default=1, help="procesos para generar reportes en paralelo")
+    parser.add_argument("--profile", action="store_true", help="guardar perfiles de cProfile de cada etapa")
+    parser.add_argument("--range", nargs=2, metavar=("INICIO", "FIN"),
+                        type=lambda value: datetime.strptime(value, "%Y-%m-%d").date(),
+                        help="generar el reporte de un período (AAAA-MM-DD) desde el almacén de agregados")
+    parser.add_argument("--period", choices=["semana", "mes"],
+                        help="generar el reporte de la última semana o del último mes completo")
+    parser.add_argument("--send", action="store_true", help="enviar por email el reporte del período")
+    parser.add_argument("--live", action="store_true",
+                        help="actualizar periódicamente el estado del día en curso de cada máquina")
+    parser.add_argument("--daemon", action="store_true",
+                        help="quedar en ejecución y generar los reportes en cuanto haya fechas pendientes")
+    parser.add_argument("--site", help="sitio del reporte del período o del modo en vivo (por defecto, el primero)")
+    args = parser.parse_args()
+
+    if args.daemon:
+        daemon_mode(jobs=args.jobs, profile=args.profile)
+    elif args.live:
+        live_mode(profile=args.profile, site_name=args.site)
+    elif args.range or args.period:
+        start_date, end_date = args.range or last_period(args.period)
+        range_report(start_date, end_date, send=args.send, profile=args.profile, site_name=args.site)
+    else:
+        main(jobs=args.jobs, profile=args.profile)
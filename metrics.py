@@ -0,0 +1,131 @@
+import os
+import re
+import sys
+import json
+import time
+import signal
+import logging
+import cProfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows no dispone del módulo resource
+    resource = None
+
+# Destino de las métricas (JSON lines) y carpeta de perfiles de cProfile (None = desactivado)
+_config = {"metrics_file": None, "profile_dir": None}
+
+# cProfile no admite perfiles anidados: solo se perfila la etapa más externa de cada hilo
+# (las etapas del pipeline corren en hilos distintos y cada una guarda su propio perfil)
+_profiling = threading.local()
+
+
+def configure_metrics(metrics_file=None, profile_dir=None):
+    """Define el archivo JSON lines donde se registran las métricas y, opcionalmente,
+    la carpeta donde se guardan los perfiles de cProfile de cada etapa."""
+    _config["metrics_file"] = metrics_file
+    _config["profile_dir"] = profile_dir
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+
+
+def get_metrics_config():
+    """Devuelve la configuración actual (para replicarla en los procesos del pool)."""
+    return dict(_config)
+
+
+def init_worker(log_file, metrics_config, warm=False, warm_up=None):
+    """Configura el logging y las métricas de un proceso del pool para que escriban en los mismos archivos.
+    Con warm=True (pool de un proceso de larga duración) el proceso ignora Ctrl+C, ya que el proceso
+    principal termina el pool de forma ordenada, termina con SIGTERM aunque haya heredado el manejador del
+    servicio (el pool lo usa para terminar sus procesos si uno de ellos muere) y ejecuta warm_up (si se
+    indica) al iniciar."""
+    configure_metrics(**metrics_config)
+    if log_file:
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s [%(levelname)s] %(message)s",
+            datefmt="%d-%m-%Y %H:%M:%S",
+            handlers=[logging.FileHandler(log_file, encoding="utf-8")]
+        )
+    if warm:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        if warm_up is not None:
+            warm_up()
+
+
+def worker_pool(jobs, log_file=None, warm=False, warm_up=None):
+    """Pool de procesos que registran sus logs y métricas en los mismos archivos que el proceso principal.
+    No importa los módulos de las tareas: cada proceso los carga al recibir la primera tarea que los usa."""
+    return ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                               initargs=(log_file, get_metrics_config(), warm, warm_up))
+
+
+def _peak_rss_mb():
+    """Pico de memoria residente del proceso hasta el momento, en MB (None si no está disponible)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB y macOS bytes
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def _write_record(record):
+    if _config["metrics_file"]:
+        with open(_config["metrics_file"], "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, default=str, ensure_ascii=False) + "\n")
+
+
+def _start_profiler():
+    """Inicia un perfil de cProfile en el hilo actual, o devuelve None si ya hay uno activo."""
+    if getattr(_profiling, "active", False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Desde Python 3.12 cProfile no admite perfiles simultáneos en distintos hilos
+        return None
+    _profiling.active = True
+    return profiler
+
+
+@contextmanager
+def stage(name, profile=True, **labels):
+    """Mide una etapa del pipeline: tiempo de reloj, tiempo de CPU y pico de memoria del proceso.
+    Devuelve un diccionario al que la etapa puede agregar datos propios (rows_in, rows_out, bytes, etc.).
+    La métrica se registra en el log y en el archivo JSON lines configurado. Con profile=False la etapa no
+    se perfila (por ejemplo, una etapa que solo espera a otras que corren en otros hilos o procesos)."""
+    record = {"stage": name, **{key: str(value) for key, value in labels.items()}}
+
+    profiler = None
+    if _config["profile_dir"] and profile:
+        profiler = _start_profiler()
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    except Exception:
+        record["error"] = True
+        raise
+    finally:
+        record["wall_s"] = round(time.perf_counter() - wall_start, 4)
+        record["cpu_s"] = round(time.process_time() - cpu_start, 4)
+        record["peak_rss_mb"] = _peak_rss_mb()
+        record["timestamp"] = datetime.now().isoformat(timespec="seconds")
+        record["pid"] = os.getpid()
+
+        if profiler is not None:
+            profiler.disable()
+            _profiling.active = False
+            suffix = re.sub(r"[^\w.-]", "_", "_".join(str(value) for value in labels.values()))
+            profile_name = f"{name}_{suffix}_{os.getpid()}.prof" if suffix else f"{name}_{os.getpid()}.prof"
+            profiler.dump_stats(os.path.join(_config["profile_dir"], profile_name))
+
+        logging.info("Métricas %s", json.dumps(record, default=str, ensure_ascii=False))
+        _write_record(record)
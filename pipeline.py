@@ -0,0 +1,69 @@
+import asyncio
+
+from metrics import stage
+
+# Fechas en espera entre etapas: limita la memoria ocupada por intervalos y reportes pendientes
+QUEUE_SIZE = 2
+
+# Marca de fin de la cola
+_DONE = object()
+
+
+async def _compute_stage(report_dates, compute, executor, output):
+    loop = asyncio.get_running_loop()
+    for report_date in report_dates:
+        result = await loop.run_in_executor(executor, compute, report_date)
+        await output.put((report_date, result))
+    await output.put(_DONE)
+
+
+async def _render_stage(render, executor, queue, output):
+    loop = asyncio.get_running_loop()
+    while (item := await queue.get()) is not _DONE:
+        report_date, result = item
+        # Se encola el futuro sin esperarlo: con un pool de varios procesos se generan varios reportes
+        # a la vez, y la entrega igualmente respeta el orden de la cola
+        await output.put((report_date, loop.run_in_executor(executor, render, report_date, result)))
+    await output.put(_DONE)
+
+
+async def _deliver_stage(deliver, executor, queue):
+    loop = asyncio.get_running_loop()
+    while (item := await queue.get()) is not _DONE:
+        report_date, rendered = item
+        await loop.run_in_executor(executor, deliver, report_date, await rendered)
+
+
+async def _run(report_dates, compute, render, deliver, executors, queue_size):
+    computed = asyncio.Queue(queue_size)
+    rendered = asyncio.Queue(queue_size)
+    compute_executor, render_executor, deliver_executor = executors
+    tasks = [
+        asyncio.create_task(_compute_stage(report_dates, compute, compute_executor, computed)),
+        asyncio.create_task(_render_stage(render, render_executor, computed, rendered)),
+        asyncio.create_task(_deliver_stage(deliver, deliver_executor, rendered)),
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+def run_pipeline(report_dates, compute, render, deliver, executors, queue_size=QUEUE_SIZE):
+    """Procesa las fechas en tres etapas encadenadas por colas acotadas, de modo que mientras se envía el
+    reporte de una fecha se genera el de la siguiente y se procesan los eventos de la posterior:
+
+    - compute(fecha) -> resultado
+    - render(fecha, resultado) -> archivo (o None)
+    - deliver(fecha, archivo)
+
+    executors son los executors (compute, render, deliver) donde corre cada etapa. deliver se llama
+    estrictamente en orden de fecha y nunca para una fecha posterior a una que falló, por lo que puede
+    registrar el avance (por ejemplo, la fecha del último reporte enviado). El primer error detiene el
+    pipeline y se propaga."""
+    # Sin perfil: el hilo principal solo espera a las etapas, que se perfilan en sus propios hilos y procesos
+    with stage("pipeline", profile=False, dates=len(report_dates)) as metrics:
+        metrics["rows_in"] = len(report_dates)
+        asyncio.run(_run(list(report_dates), compute, render, deliver, executors, queue_size))
@@ -1,153 +1,234 @@
+import os
 import logging
 import pandas as pd
 import numpy as np
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+from event_store import load_events
+from csv_index import read_csv_dates
+from schema import read_events_csv, apply_event_schema, empty_events, events_mask
+from segmentation import compact_events, segment_events
+from shared_events import SharedFrame, attach_frame
+from metrics import stage, configure_metrics, get_metrics_config
+
+# Usuarios cuyos registros no corresponden a operación de la máquina
+EXCLUDED_USERS = ['ADMIN', 'Pc-Corte-1']
+
+
+def segment_machine_events(df_machine, metrics=None):
+    """Segmenta los eventos de una máquina en intervalos de movimiento/detención y devuelve
+    los eventos filtrados (y compactados) junto con los intervalos agrupados. Si se indican las métricas
+    de la etapa se registra en ellas la compactación."""
+    # Ordenar por tiempo (orden estable: ante registros simultáneos se respeta el orden del archivo)
+    df_machine = df_machine.sort_values('DATE_TIME', kind='stable')
+
+    # Filtrar registros con USER = "ADMIN" o "Pc-Corte-1"
+    df_machine = df_machine[~df_machine['USER'].isin(EXCLUDED_USERS)]
+
+    # Quitar los registros repetidos que no cambian la segmentación (los eventos compactados son también
+    # los que se guardan en el caché y se envían a los gráficos)
+    rows = len(df_machine)
+    df_machine = compact_events(df_machine)
+    if metrics is not None:
+        metrics["rows_compacted"] = rows - len(df_machine)
+        metrics["compaction_ratio"] = round(rows / len(df_machine), 3) if len(df_machine) else 1.0
+
+    return segment_events(df_machine)
+
+
+def sort_by_day_machine(df):
+    """Ordena los eventos por (fecha, máquina) una única vez y devuelve el DataFrame ordenado junto con
+    {(fecha, máquina): (inicio, fin)}, las posiciones de cada grupo halladas con searchsorted sobre la clave
+    ordenada. El orden es estable, por lo que dentro de cada grupo se conserva el orden del archivo."""
+    df = df[df['MACHINE'].notna()]
+    day_values, day_codes = np.unique(df['DATE_TIME'].dt.normalize().to_numpy(), return_inverse=True)
+    machine_names = df['MACHINE'].cat.categories
+    n_machines = max(len(machine_names), 1)
+
+    keys = day_codes.astype(np.int64) * n_machines + df['MACHINE'].cat.codes.to_numpy()
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+
+    group_keys = np.unique(keys)
+    starts = np.searchsorted(keys, group_keys, side='left')
+    ends = np.searchsorted(keys, group_keys, side='right')
+    bounds = {
+        (pd.Timestamp(day_values[key // n_machines]), machine_names[key % n_machines]): (start, end)
+        for key, start, end in zip(group_keys.tolist(), starts.tolist(), ends.tolist())
+    }
+    return df.take(order), bounds
+
+
+def _segment_shared_task(layout, start, end, report_date, machine):
+    """Segmenta, en un proceso del pool, las filas [start, end) de los eventos compartidos."""
+    with stage("segmentation", date=report_date, machine=machine) as metrics:
+        df_machine = attach_frame(layout, start, end)
+        metrics["rows_in"] = len(df_machine)
+        df_machine, df_intervals = segment_machine_events(df_machine, metrics)
+        metrics["rows_out"] = len(df_intervals)
+    return df_machine, df_intervals
+
+
+def segment_groups_parallel(df_sorted, bounds, group_keys, jobs, pool=None):
+    """Segmenta los grupos (fecha, máquina) indicados en un pool de procesos. Los eventos ordenados se
+    copian una vez a memoria compartida y a cada proceso solo se le envían los límites de su grupo.
+    Devuelve {(fecha, máquina): (eventos, intervalos)}."""
+    with SharedFrame(df_sorted) as shared:
+        own_pool = pool is None
+        if own_pool:
+            pool = ProcessPoolExecutor(max_workers=jobs, initializer=partial(configure_metrics, **get_metrics_config()))
+        try:
+            futures = {
+                key: pool.submit(_segment_shared_task, shared.layout, *bounds[key], key[0].date(), key[1])
+                for key in group_keys
+            }
+            return {key: future.result() for key, future in futures.items()}
+        finally:
+            if own_pool:
+                pool.shutdown()
+
+
+def split_machines_by_date(df, machines, report_date, groups, segmented=None):
+    """Arma la lista [máquina, eventos, intervalos] de una fecha a partir de los grupos
+    (fecha, máquina) ya calculados sobre el DataFrame completo. Los grupos presentes en segmented
+    (ya segmentados en paralelo) no se vuelven a segmentar."""
+    dfs_machines = []
+    day = pd.Timestamp(report_date)
+
+    if not any(key[0] == day for key in groups):
+        logging.info(f"No se registraron movimientos.")
+        return dfs_machines
+
+    for machine in machines['machine_name']:
+        # Filtrar por máquina
+        df_machine = groups.get((day, machine), df.iloc[0:0])
+
+        if df_machine.empty:
+            logging.info(f"No se registraron movimientos en {machine}.")
+            dfs_machines.append([machine, df_machine, df_machine])
+            continue
+
+        if segmented is not None and (day, machine) in segmented:
+            df_machine, df_intervals = segmented[(day, machine)]
+        else:
+            with stage("segmentation", date=report_date, machine=machine) as metrics:
+                metrics["rows_in"] = len(df_machine)
+                df_machine, df_intervals = segment_machine_events(df_machine, metrics)
+                metrics["rows_out"] = len(df_intervals)
+
+        dfs_machines.append([machine, df_machine, df_intervals])
+        logging.info(f"Movimientos de {machine} procesados correctamente.")
+
+    return dfs_machines
+
+
+def process_events_range(df, machines, report_dates, cache=None, jobs=1, pool=None):
+    """Separa los eventos por (fecha, máquina) ordenándolos una única vez y devuelve un diccionario
+    {fecha: dfs_machines} con el mismo formato que devuelve process_csv.
+    Si se indica un caché de artefactos, las fechas cuyos registros ya se procesaron no se vuelven a segmentar.
+    Con jobs > 1 (o un pool) las máquinas de todas las fechas se segmentan en paralelo."""
+    # Filtrar registros por fecha comparando contra los límites de cada día
+    df = df[events_mask(df, report_dates)]
+
+    # Separar por (fecha, máquina): cada grupo es un tramo contiguo de los eventos ordenados
+    df, bounds = sort_by_day_machine(df)
+    groups = {key: df.iloc[start:end] for key, (start, end) in bounds.items()}
+
+    results = {}
+    cache_keys = {}
+    for report_date in report_dates:
+        if cache is not None:
+            cache_keys[report_date] = cache.segments_key(report_date, machines['machine_name'], groups)
+            results[report_date] = cache.load_segments(cache_keys[report_date])
+            if results[report_date] is not None:
+                logging.info("Intervalos del %s recuperados del caché.", report_date.strftime('%d-%m-%Y'))
+
+    segmented = None
+    if jobs > 1 or pool is not None:
+        days = {pd.Timestamp(d) for d in report_dates if results.get(d) is None}
+        pending = [(day, machine) for (day, machine) in bounds if day in days and machine in machines['machine_name']]
+        if pending:
+            segmented = segment_groups_parallel(df, bounds, pending, jobs, pool)
+
+    for report_date in report_dates:
+        if results.get(report_date) is not None:
+            continue
+        logging.info("Procesando fecha: %s", report_date.strftime('%d-%m-%Y'))
+        results[report_date] = split_machines_by_date(df, machines, report_date, groups, segmented)
+        if cache is not None:
+            cache.store_segments(cache_keys[report_date], results[report_date])
+
+    return results
+
+
+def read_csv_chunked(csv_path, machines, report_dates, chunksize):
+    """Lee el CSV por partes y conserva solo los registros de las fechas y máquinas indicadas,
+    de modo que la memoria depende del tamaño de cada parte y no del tamaño del archivo."""
+    selected = []
+
+    for chunk in read_events_csv(csv_path, chunksize=chunksize):
+        mask = events_mask(chunk, report_dates, machines['machine_name'])
+        if mask.any():
+            selected.append(chunk[mask])
+
+    # Los eventos de cada máquina se segmentan recién al unir todas las partes, por lo que el
+    # shift(-1) de INTERVAL_END y X_POS_END ve el registro siguiente aunque esté en otra parte
+    if not selected:
+        return empty_events()
+    return apply_event_schema(pd.concat(selected))
+
+
+def process_csv_range(csv_path, machines, report_dates, chunksize=None, indexed=None):
+    """Procesa el CSV una única vez para todas las fechas indicadas y devuelve un diccionario
+    {fecha: dfs_machines} con el mismo formato que devuelve process_csv.
+    Con indexed (por defecto, salvo que se indique chunksize) solo se interpretan los rangos de bytes de esas
+    fechas según el índice guardado junto al CSV; si no, el archivo se lee completo o, si se indica chunksize,
+    por partes. Si el índice no puede guardarse (por ejemplo, en una carpeta de solo lectura) el CSV se lee
+    completo."""
+    if indexed is None:
+        indexed = not chunksize
+    elif indexed and chunksize:
+        raise ValueError("indexed y chunksize no pueden indicarse a la vez.")
 
-def process_csv(csv_path, machines, report_date):
-    """Procesa el CSV en la fecha indicada y devuelve un DataFrame que contiene los eventos de movimiento/detención
-    detectados, hora de inicio, hora de fin, producto en proceso y máquina en cuestión."""
     try:
-        logging.info("Procesando CSV para la fecha: %s", report_date.strftime('%d-%m-%Y'))
-        df = pd.read_csv(csv_path, parse_dates=['DATE_TIME'])
+        logging.info("Procesando CSV para las fechas: %s", [d.strftime('%d-%m-%Y') for d in report_dates])
+        with stage("parse", chunked=bool(chunksize), indexed=indexed) as metrics:
+            df = None
+            if indexed:
+                try:
+                    df = read_csv_dates(csv_path, report_dates)
+                except OSError as e:
+                    logging.warning(f"No se pudo usar el índice del CSV, se lee el archivo completo: {e}")
+                    metrics["indexed"] = str(False)
+            if df is None and chunksize:
+                df = read_csv_chunked(csv_path, machines, report_dates, chunksize)
+            elif df is None:
+                df = read_events_csv(csv_path)
+            metrics.update(rows_out=len(df), bytes=os.path.getsize(csv_path))
+        return process_events_range(df, machines, report_dates)
 
-        # Filtrar registros por fecha
-        df = df[df["DATE_TIME"].dt.date == report_date]
-
-        dfs_machines = []
+    except Exception as e:
+        logging.error(f"Error al procesar CSV: {e}")
+        raise
 
-        if df.empty:
-            logging.info(f"No se registraron movimientos.")
-            return dfs_machines
 
-        else:
-            for machine in machines['machine_name']:
-                # Filtrar por máquina
-                df_machine = df[df["MACHINE"] == machine]
-
-                if df_machine.empty:
-                    logging.info(f"No se registraron movimientos en {machine}.")
-                    dfs_machines.append([machine, df_machine, df_machine])
-                    continue
-            
-                # Ordenar por tiempo
-                df_machine = df_machine.sort_values('DATE_TIME')
-
-                # Filtrar registros con USER = "ADMIN" o "Pc-Corte-1"
-                df_machine = df_machine[~df_machine['USER'].isin(['ADMIN', 'Pc-Corte-1'])]
-
-                # Definir intervalos
-                df_machine['INTERVAL_START'] = df_machine['DATE_TIME']
-                df_machine['INTERVAL_END'] = df_machine['DATE_TIME'].shift(-1)
-                df_machine['DELTA_T'] = (df_machine['INTERVAL_END'] - df_machine['INTERVAL_START']).dt.total_seconds()
-
-                df_machine['X_POS_START'] = df_machine['X_POS']
-                df_machine['Y_POS_START'] = df_machine['Y_POS']
-                df_machine['X_POS_END'] = df_machine['X_POS'].shift(-1)
-                df_machine['Y_POS_END'] = df_machine['Y_POS'].shift(-1)
-
-                df_machine['DELTA_X'] = (df_machine['X_POS_END'] - df_machine['X_POS_START']).round(3)
-                df_machine['DELTA_Y'] = (df_machine['Y_POS_END'] - df_machine['Y_POS_START']).round(3)
-
-                df_machine['X_VEL'] = (df_machine['DELTA_X'] / df_machine['DELTA_T']).round(3)
-                df_machine['Y_VEL'] = (df_machine['DELTA_Y'] / df_machine['DELTA_T']).round(3)
-
-                # Asignar estado según la duración del intervalo y la velocidad
-                # Intervalos mayores a 3 segundos se consideran "DETENIDO"
-                # Si la velocidad es mayor a 50 mm/seg se consideran "DETENIDO", ya que corresponde a un seteo manual de coordenadas
-                df_machine['STATUS'] = np.where(df_machine['DELTA_T'] > 3, 'DETENIDO', 'MOVIMIENTO')
-                df_machine['STATUS'] = np.where((df_machine['X_VEL'] > 50) | (df_machine['X_VEL'] < -50) | (df_machine['Y_VEL'] > 50) | (df_machine['Y_VEL'] < -50), 'DETENIDO', df_machine['STATUS'])
-
-                # Reasignar coordenadas a 0 si el estado es "DETENIDO"
-                df_machine['X_POS_START'] = np.where(df_machine['STATUS'] == 'DETENIDO', 0, df_machine['X_POS_START'])
-                df_machine['Y_POS_START'] = np.where(df_machine['STATUS'] == 'DETENIDO', 0, df_machine['Y_POS_START'])
-                df_machine['X_POS_END'] = np.where(df_machine['STATUS'] == 'DETENIDO', 0, df_machine['X_POS_END'])
-                df_machine['Y_POS_END'] = np.where(df_machine['STATUS'] == 'DETENIDO', 0, df_machine['Y_POS_END'])
-
-                # Crear grupos de intervalos cada vez que el estado cambia
-                df_machine['INTERVAL_GROUP'] = (df_machine['STATUS'] != df_machine['STATUS'].shift()).cumsum()
-
-                # Agrupar intervalos consecutivos con el mismo estado
-                df_intervals = df_machine.groupby('INTERVAL_GROUP').agg({
-                    'INTERVAL_START': 'first',
-                    'INTERVAL_END': 'last',
-                    'STATUS': 'first',
-                    'X_POS_START': 'first',
-                    'Y_POS_START': 'first',
-                    'X_POS_END': 'last',
-                    'Y_POS_END': 'last',
-                    'G-CODE': lambda x: x.mode()[0] if x.iloc[0] == "No File Loaded." else x.iloc[0],
-                    'USER': 'first'
-                }).reset_index(drop=True)
-
-                # Calcular duraciones y velocidades de intervalos agrupados
-                df_intervals['DELTA_T'] = (df_intervals['INTERVAL_END'] - df_intervals['INTERVAL_START']).dt.total_seconds()
-
-                # Reasignar coordenadas a 0 si el intervalo es menor a 10 segundos
-                df_intervals['X_POS_START'] = np.where(df_intervals['DELTA_T'] < 10, 0, df_intervals['X_POS_START'])
-                df_intervals['Y_POS_START'] = np.where(df_intervals['DELTA_T'] < 10, 0, df_intervals['Y_POS_START'])
-                df_intervals['X_POS_END'] = np.where(df_intervals['DELTA_T'] < 10, 0, df_intervals['X_POS_END'])
-                df_intervals['Y_POS_END'] = np.where(df_intervals['DELTA_T'] < 10, 0, df_intervals['Y_POS_END'])
-
-                df_intervals['DELTA_X'] = (df_intervals['X_POS_END'] - df_intervals['X_POS_START']).round(3)
-                df_intervals['DELTA_Y'] = (df_intervals['Y_POS_END'] - df_intervals['Y_POS_START']).round(3)
-
-                df_intervals['X_VEL'] = (df_intervals['DELTA_X'] / df_intervals['DELTA_T']).round(3)
-                df_intervals['Y_VEL'] = (df_intervals['DELTA_Y'] / df_intervals['DELTA_T']).round(3)
-
-
-                # Reasignar velocidades a 0 si son mayores a 50 mm/seg
-                df_intervals['X_VEL'] = np.where(df_intervals['X_VEL'] > 50, 0, df_intervals['X_VEL'])
-                df_intervals['Y_VEL'] = np.where(df_intervals['Y_VEL'] > 50, 0, df_intervals['Y_VEL'])
-                df_intervals['X_VEL'] = np.where(df_intervals['X_VEL'] < -50, 0, df_intervals['X_VEL'])
-                df_intervals['Y_VEL'] = np.where(df_intervals['Y_VEL'] < -50, 0, df_intervals['Y_VEL'])
-
-                # Determinar dirección de velocidades
-                df_intervals['X_DIR'] = np.sign(df_intervals['X_VEL'])
-                df_intervals['Y_DIR'] = np.sign(df_intervals['Y_VEL'])
-
-                # Calcular velocidad compuesta
-                df_intervals['VEL'] = np.sqrt(df_intervals['X_VEL']**2 + df_intervals['Y_VEL']**2).round(3)
-
-                # Asignar dirección a velocidad compuesta
-                df_intervals['VEL'] = np.where(
-                    df_intervals['X_DIR'] != 0,
-                    np.sign(df_intervals['X_DIR']) * abs(df_intervals['VEL']),
-                    np.sign(df_intervals['Y_DIR']) * abs(df_intervals['VEL'])
-                )
-
-                # Reasignar estado a "DETENIDO" si ambas velocidades son 0
-                df_intervals['STATUS'] = np.where(df_intervals['VEL'] == 0, 'DETENIDO', df_intervals['STATUS'])
-
-                # Reasignar coordenadas a 0 si el estado es "DETENIDO"
-                df_intervals['X_POS_START'] = np.where(df_intervals['STATUS'] == 'DETENIDO', 0, df_intervals['X_POS_START'])
-                df_intervals['Y_POS_START'] = np.where(df_intervals['STATUS'] == 'DETENIDO', 0, df_intervals['Y_POS_START'])
-                df_intervals['X_POS_END'] = np.where(df_intervals['STATUS'] == 'DETENIDO', 0, df_intervals['X_POS_END'])
-                df_intervals['Y_POS_END'] = np.where(df_intervals['STATUS'] == 'DETENIDO', 0, df_intervals['Y_POS_END'])                
-
-                # Crear grupos cada vez que el estado cambia
-                df_intervals['INTERVAL_GROUP'] = (df_intervals['STATUS'] != df_intervals['STATUS'].shift()).cumsum()
-
-                # Agrupar intervalos consecutivos con el mismo estado
-                df_intervals = df_intervals.groupby('INTERVAL_GROUP').agg({
-                    'INTERVAL_START': 'first',
-                    'INTERVAL_END': 'last',
-                    'X_POS_START': 'first',
-                    'Y_POS_START': 'first',
-                    'X_POS_END': 'last',
-                    'Y_POS_END': 'last',
-                    'VEL': 'mean',
-                    'G-CODE': lambda x: x.mode()[0] if x.iloc[0] == "No File Loaded." else x.iloc[0],
-                    'USER': 'first'
-                }).reset_index(drop=True)
-
-                # Renombrar la columna G-CODE para evitar conflictos al procesar CSV
-                df_machine = df_machine.rename(columns={"G-CODE": "G_CODE"})
-                df_intervals = df_intervals.rename(columns={"G-CODE": "G_CODE"})
-
-                dfs_machines.append([machine, df_machine, df_intervals])
-                logging.info(f"Movimientos de {machine} procesados correctamente.")
-
-            return dfs_machines
+def process_event_store(store_dir, machines, report_dates, cache=None, jobs=1, pool=None):
+    """Procesa las fechas indicadas leyendo del almacén de eventos solo las particiones
+    correspondientes, sin volver a leer el CSV acumulado."""
+    try:
+        logging.info("Procesando almacén de eventos para las fechas: %s", [d.strftime('%d-%m-%Y') for d in report_dates])
+        with stage("parse", source="event_store") as metrics:
+            df = load_events(store_dir, report_dates, machines['machine_name'])
+            metrics.update(rows_out=len(df))
+        return process_events_range(df, machines, report_dates, cache=cache, jobs=jobs, pool=pool)
 
     except Exception as e:
-        logging.error(f"Error al procesar CSV: {e}")
+        logging.error(f"Error al procesar almacén de eventos: {e}")
         raise
+
+
+def process_csv(csv_path, machines, report_date):
+    """Procesa el CSV en la fecha indicada y devuelve un DataFrame que contiene los eventos de movimiento/detención
+    detectados, hora de inicio, hora de fin, producto en proceso y máquina en cuestión."""
+    return process_csv_range(csv_path, machines, [report_date])[report_date]
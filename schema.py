@@ -0,0 +1,87 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+# Columnas necesarias para el procesamiento (se omite FRO)
+EVENT_COLUMNS = ['DATE_TIME', 'G-CODE', 'X_POS', 'Y_POS', 'USER', 'MACHINE']
+
+# Columnas de los eventos que usan los gráficos del reporte (el resto solo se usa al segmentar)
+CHART_EVENT_COLUMNS = ['DATE_TIME', 'X_POS', 'Y_POS']
+
+# Formato de DATE_TIME en el CSV (explícito para no inferirlo en cada lectura)
+DATE_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Los textos que se repiten en cada registro se cargan como categorías y las coordenadas en float32
+EVENT_DTYPES = {
+    'G-CODE': 'category',
+    'X_POS': 'float32',
+    'Y_POS': 'float32',
+    'USER': 'category',
+    'MACHINE': 'category',
+}
+
+# Bytes finales ya leídos de un CSV que se comparan para verificar que el archivo solo creció
+CSV_TAIL_CHECK = 4096
+
+# Decimales con que se registran las coordenadas. Al volver a float64 se redondea a esta precisión
+# para recuperar exactamente los valores del CSV (float32 conserva 7 dígitos significativos).
+POSITION_DECIMALS = 3
+
+
+def read_events_csv(csv_path, columns=EVENT_COLUMNS, chunksize=None):
+    """Lee el CSV de eventos cargando solo las columnas indicadas con tipos compactos.
+    Si se indica chunksize devuelve un iterador de partes."""
+    return pd.read_csv(
+        csv_path,
+        usecols=columns,
+        dtype={column: dtype for column, dtype in EVENT_DTYPES.items() if column in columns},
+        parse_dates=['DATE_TIME'],
+        date_format=DATE_TIME_FORMAT,
+        chunksize=chunksize,
+    )
+
+
+def csv_tail_hash(f, end):
+    """MD5 de los (hasta) CSV_TAIL_CHECK bytes del archivo abierto f que terminan en la posición end.
+    Si cambia entre dos lecturas, el archivo fue reemplazado en lugar de solo crecer."""
+    f.seek(max(end - CSV_TAIL_CHECK, 0))
+    return hashlib.md5(f.read(min(CSV_TAIL_CHECK, end))).hexdigest()
+
+
+def apply_event_schema(df):
+    """Convierte las columnas presentes a los tipos del esquema (por ejemplo, tras unir partes
+    cuyas categorías difieren, que pandas vuelve a convertir en texto)."""
+    dtypes = {column: dtype for column, dtype in EVENT_DTYPES.items() if column in df.columns}
+    if 'DATE_TIME' in df.columns:
+        dtypes['DATE_TIME'] = 'datetime64[ns]'
+    return df.astype(dtypes)
+
+
+def empty_events(columns=EVENT_COLUMNS):
+    """DataFrame de eventos vacío con los tipos del esquema."""
+    return apply_event_schema(pd.DataFrame(columns=columns))
+
+
+def date_ranges(report_dates):
+    """Agrupa las fechas en rangos [inicio, fin) de días consecutivos."""
+    ranges = []
+    for day in sorted(pd.Timestamp(d) for d in report_dates):
+        if ranges and ranges[-1][1] == day:
+            ranges[-1][1] = day + pd.Timedelta(days=1)
+        else:
+            ranges.append([day, day + pd.Timedelta(days=1)])
+    return [(np.datetime64(start, 'ns'), np.datetime64(end, 'ns')) for start, end in ranges]
+
+
+def events_mask(df, report_dates, machine_names=None):
+    """Máscara de los eventos de las fechas (y máquinas) indicadas. Compara DATE_TIME directamente contra
+    los límites de cada rango de días, sin construir objetos date por registro."""
+    values = df['DATE_TIME'].to_numpy()
+    mask = np.zeros(len(values), dtype=bool)
+    for start, end in date_ranges(report_dates):
+        mask |= (values >= start) & (values < end)
+
+    if machine_names is not None:
+        mask &= df['MACHINE'].isin(list(machine_names)).to_numpy()
+    return mask
@@ -0,0 +1,273 @@
+import numpy as np
+import pandas as pd
+
+from schema import POSITION_DECIMALS
+
+# Código G que registra la máquina cuando no hay un programa cargado
+NO_FILE_LOADED = "No File Loaded."
+
+# Intervalos mayores a 3 segundos se consideran "DETENIDO"
+MAX_MOVE_GAP = 3
+# Velocidades mayores a 50 mm/seg corresponden a un seteo manual de coordenadas
+MAX_VEL = 50
+# Intervalos agrupados menores a 10 segundos no conservan coordenadas
+MIN_POS_DURATION = 10
+
+INTERVAL_COLUMNS = [
+    'INTERVAL_START', 'INTERVAL_END', 'X_POS_START', 'Y_POS_START',
+    'X_POS_END', 'Y_POS_END', 'VEL', 'G_CODE', 'USER'
+]
+
+
+def _shift_next(values, fill):
+    """Equivalente a shift(-1): desplaza los valores una posición hacia atrás."""
+    shifted = np.empty_like(values)
+    shifted[:-1] = values[1:]
+    shifted[-1:] = fill
+    return shifted
+
+
+def _run_starts(labels):
+    """Devuelve los índices donde comienza cada corrida de valores consecutivos iguales."""
+    return np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+
+
+def _first_valid(values, valid, starts, ends):
+    """Primer valor no nulo de cada corrida (equivalente a groupby().first())."""
+    n = len(values)
+    pos = np.minimum.reduceat(np.where(valid, np.arange(n), n), starts)
+    return values[np.where(pos < ends, pos, starts)]
+
+
+def _last_valid(values, valid, starts):
+    """Último valor no nulo de cada corrida (equivalente a groupby().last())."""
+    pos = np.maximum.reduceat(np.where(valid, np.arange(len(values)), -1), starts)
+    return values[np.where(pos >= starts, pos, starts)]
+
+
+def _gcode_per_run(gcodes, starts, run_ids):
+    """Código G de cada corrida: el primero, salvo que sea "No File Loaded.", en cuyo caso se toma
+    la moda (ante empates, el menor alfabéticamente, igual que Series.mode())."""
+    codes, uniques = pd.factorize(gcodes, sort=True)
+    uniques = np.asarray(uniques, dtype=object)
+    n_codes = max(len(uniques), 1)
+
+    # Conteo de cada (corrida, código) y selección del más frecuente por corrida
+    valid = codes >= 0
+    keys, counts = np.unique(run_ids[valid].astype(np.int64) * n_codes + codes[valid], return_counts=True)
+    key_runs = keys // n_codes
+    order = np.lexsort((-counts, key_runs))
+    keys, key_runs = keys[order], key_runs[order]
+    is_first = np.diff(key_runs, prepend=-1) != 0
+
+    mode_codes = np.full(len(starts), -1)
+    mode_codes[key_runs[is_first]] = keys[is_first] % n_codes
+
+    first_codes = codes[starts]
+    needs_mode = (first_codes >= 0) & (uniques[np.maximum(first_codes, 0)] == NO_FILE_LOADED)
+    run_codes = np.where(needs_mode, mode_codes, first_codes)
+
+    return np.where(run_codes >= 0, uniques[np.maximum(run_codes, 0)], gcodes[starts])
+
+
+def _runs(stopped):
+    """Límites de las corridas de estado (DETENIDO/MOVIMIENTO) consecutivo."""
+    starts = _run_starts(stopped)
+    ends = np.r_[starts[1:], len(stopped)]
+    run_ids = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(stopped)]))
+    return starts, ends, run_ids
+
+
+def _row_motion(start, x_pos, y_pos):
+    """Intervalo de cada registro hasta el siguiente: fin, duración, coordenadas de inicio y fin,
+    desplazamientos, velocidades y si corresponde a una detención."""
+    end = _shift_next(start, np.datetime64('NaT'))
+    delta_t = (end - start) / np.timedelta64(1, 's')
+
+    # Las coordenadas se cargan en float32: al pasarlas a float64 se redondean a la precisión del CSV
+    x_start = np.round(x_pos, POSITION_DECIMALS)
+    y_start = np.round(y_pos, POSITION_DECIMALS)
+    x_end = _shift_next(x_start, np.nan)
+    y_end = _shift_next(y_start, np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta_x = np.round(x_end - x_start, 3)
+        delta_y = np.round(y_end - y_start, 3)
+        x_vel = np.round(delta_x / delta_t, 3)
+        y_vel = np.round(delta_y / delta_t, 3)
+
+    stopped = (delta_t > MAX_MOVE_GAP) | (np.abs(x_vel) > MAX_VEL) | (np.abs(y_vel) > MAX_VEL)
+    return end, delta_t, x_start, y_start, x_end, y_end, delta_x, delta_y, x_vel, y_vel, stopped
+
+
+def _same_as_previous(values):
+    """Indica para cada registro (desde el segundo) si su valor es igual al del anterior (nulos incluidos)."""
+    codes, _ = pd.factorize(values)
+    return codes[1:] == codes[:-1]
+
+
+def compact_events(df_machine):
+    """Quita los registros redundantes de los eventos ordenados y filtrados de una máquina, sin recorrerlos
+    uno por uno. Dentro de una serie de registros con la misma posición, código G y usuario (por ejemplo,
+    los que la ETL repite mientras la máquina está detenida) se eliminan los registros intermedios cuya
+    unión con el anterior no cambia el estado DETENIDO/MOVIMIENTO:
+
+    - si ambos tramos son detenciones (más de MAX_MOVE_GAP segundos), el tramo unido también lo es;
+    - si ambos son movimientos, solo se unen registros de una misma ventana de MAX_MOVE_GAP segundos.
+
+    Se conservan el primer y el último registro de cada serie (con sus marcas de tiempo y posiciones) y el
+    primero de cada corrida de estado, y no se compactan las corridas que comienzan con "No File Loaded."
+    (su código G se elige por moda). Así la clasificación y los intervalos agrupados de segment_events
+    no cambian."""
+    n = len(df_machine)
+    if n < 3:
+        return df_machine
+
+    start = df_machine['DATE_TIME'].to_numpy()
+    x_pos = df_machine['X_POS'].to_numpy(dtype=float)
+    y_pos = df_machine['Y_POS'].to_numpy(dtype=float)
+    stopped = _row_motion(start, x_pos, y_pos)[-1]
+
+    # Misma posición que el registro anterior (los nulos nunca coinciden)
+    same_position = (x_pos[1:] == x_pos[:-1]) & (y_pos[1:] == y_pos[:-1])
+    same_as_previous = (
+        same_position
+        & _same_as_previous(df_machine['G-CODE'].to_numpy())
+        & _same_as_previous(df_machine['USER'].to_numpy())
+    )
+
+    # Corridas de estado cuyo código G es la moda de sus registros
+    starts, _, run_ids = _runs(stopped)
+    gcodes = df_machine['G-CODE'].to_numpy(dtype=object)
+    by_mode = (gcodes[starts] == NO_FILE_LOADED)[run_ids]
+
+    # Registros intermedios k: iguales a k - 1, en la misma posición que k + 1 y con el mismo estado que k - 1
+    k = np.arange(1, n - 1)
+    removable = same_as_previous[:-1] & same_position[1:] & (stopped[k - 1] == stopped[k]) & ~by_mode[k]
+
+    # En movimiento, k - 1, k y k + 1 deben estar en la misma ventana para que el tramo unido no la supere
+    window = start.astype(np.int64) // (MAX_MOVE_GAP * 10**9)
+    removable &= stopped[k] | ((window[k - 1] == window[k]) & (window[k] == window[k + 1]))
+
+    if not removable.any():
+        return df_machine
+    keep = np.ones(n, dtype=bool)
+    keep[k[removable]] = False
+    return df_machine[keep]
+
+
+def segment_events(df_machine):
+    """Segmenta los eventos ordenados y filtrados de una máquina en intervalos de movimiento/detención.
+    Devuelve los eventos con las columnas calculadas por registro y el DataFrame de intervalos agrupados."""
+    df_events, df_intervals, _ = segment_events_with_bounds(df_machine)
+    return df_events, df_intervals
+
+
+def segment_events_with_bounds(df_machine):
+    """Igual que segment_events, pero devuelve además los límites de la segmentación:
+    la posición del primer evento de cada corrida de estado ("run_starts") y, para cada corrida,
+    el intervalo agrupado al que pertenece ("run_intervals"). Los usa la segmentación incremental."""
+    n = len(df_machine)
+    if n == 0:
+        bounds = {"run_starts": np.array([], dtype=int), "run_intervals": np.array([], dtype=int)}
+        return df_machine.rename(columns={"G-CODE": "G_CODE"}), pd.DataFrame(columns=INTERVAL_COLUMNS), bounds
+
+    # ===========================
+    # 1. Intervalos por registro
+    # ===========================
+    start = df_machine['DATE_TIME'].to_numpy()
+    end, delta_t, x_start, y_start, x_end, y_end, delta_x, delta_y, x_vel, y_vel, stopped = _row_motion(
+        start, df_machine['X_POS'].to_numpy(dtype=float), df_machine['Y_POS'].to_numpy(dtype=float)
+    )
+
+    # Reasignar coordenadas a 0 si el estado es "DETENIDO"
+    x_start = np.where(stopped, 0, x_start)
+    y_start = np.where(stopped, 0, y_start)
+    x_end = np.where(stopped, 0, x_end)
+    y_end = np.where(stopped, 0, y_end)
+
+    starts, ends, run_ids = _runs(stopped)
+
+    gcodes = df_machine['G-CODE'].to_numpy(dtype=object)
+    users = df_machine['USER'].to_numpy(dtype=object)
+
+    df_events = df_machine.assign(
+        INTERVAL_START=start,
+        INTERVAL_END=end,
+        DELTA_T=delta_t,
+        X_POS_START=x_start,
+        Y_POS_START=y_start,
+        X_POS_END=x_end,
+        Y_POS_END=y_end,
+        DELTA_X=delta_x,
+        DELTA_Y=delta_y,
+        X_VEL=x_vel,
+        Y_VEL=y_vel,
+        STATUS=np.where(stopped, 'DETENIDO', 'MOVIMIENTO').astype(object),
+        INTERVAL_GROUP=run_ids + 1,
+    ).rename(columns={"G-CODE": "G_CODE"})
+
+    # ==================================
+    # 2. Agrupar corridas de un estado
+    # ==================================
+    has_end = ~np.isnat(end)
+    i_start = start[starts]
+    i_end = _last_valid(end, has_end, starts)
+    i_stopped = stopped[starts]
+    i_x_start = _first_valid(x_start, ~np.isnan(x_start), starts, ends)
+    i_y_start = _first_valid(y_start, ~np.isnan(y_start), starts, ends)
+    i_x_end = _last_valid(x_end, ~np.isnan(x_end), starts)
+    i_y_end = _last_valid(y_end, ~np.isnan(y_end), starts)
+    i_gcode = _gcode_per_run(gcodes, starts, run_ids)
+    i_user = _first_valid(users, ~pd.isna(users), starts, ends)
+
+    i_delta_t = (i_end - i_start) / np.timedelta64(1, 's')
+
+    # Reasignar coordenadas a 0 si el intervalo es menor a 10 segundos
+    short = i_delta_t < MIN_POS_DURATION
+    i_x_start = np.where(short, 0, i_x_start)
+    i_y_start = np.where(short, 0, i_y_start)
+    i_x_end = np.where(short, 0, i_x_end)
+    i_y_end = np.where(short, 0, i_y_end)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        i_x_vel = np.round(np.round(i_x_end - i_x_start, 3) / i_delta_t, 3)
+        i_y_vel = np.round(np.round(i_y_end - i_y_start, 3) / i_delta_t, 3)
+
+    # Reasignar velocidades a 0 si son mayores a 50 mm/seg
+    i_x_vel = np.where(np.abs(i_x_vel) > MAX_VEL, 0, i_x_vel)
+    i_y_vel = np.where(np.abs(i_y_vel) > MAX_VEL, 0, i_y_vel)
+
+    # Velocidad compuesta con la dirección del eje X (o del Y si X no se mueve)
+    x_dir = np.sign(i_x_vel)
+    y_dir = np.sign(i_y_vel)
+    vel = np.abs(np.round(np.sqrt(i_x_vel**2 + i_y_vel**2), 3))
+    vel = np.where(x_dir != 0, np.sign(x_dir) * vel, np.sign(y_dir) * vel)
+
+    # Reasignar estado a "DETENIDO" si ambas velocidades son 0
+    i_stopped = np.where(vel == 0, True, i_stopped)
+
+    i_x_start = np.where(i_stopped, 0, i_x_start)
+    i_y_start = np.where(i_stopped, 0, i_y_start)
+    i_x_end = np.where(i_stopped, 0, i_x_end)
+    i_y_end = np.where(i_stopped, 0, i_y_end)
+
+    # ========================================
+    # 3. Unir intervalos consecutivos iguales
+    # ========================================
+    m_starts, m_ends, m_run_ids = _runs(i_stopped)
+
+    df_intervals = pd.DataFrame({
+        'INTERVAL_START': i_start[m_starts],
+        'INTERVAL_END': _last_valid(i_end, ~np.isnat(i_end), m_starts),
+        'X_POS_START': _first_valid(i_x_start, ~np.isnan(i_x_start), m_starts, m_ends),
+        'Y_POS_START': _first_valid(i_y_start, ~np.isnan(i_y_start), m_starts, m_ends),
+        'X_POS_END': _last_valid(i_x_end, ~np.isnan(i_x_end), m_starts),
+        'Y_POS_END': _last_valid(i_y_end, ~np.isnan(i_y_end), m_starts),
+        # Promedio con el mismo algoritmo de suma compensada que groupby().mean()
+        'VEL': pd.Series(vel).groupby(m_run_ids).mean().to_numpy(),
+        'G_CODE': _gcode_per_run(i_gcode, m_starts, m_run_ids),
+        'USER': _first_valid(i_user, ~pd.isna(i_user), m_starts, m_ends),
+    })
+
+    return df_events, df_intervals, {"run_starts": starts, "run_intervals": m_run_ids}
@@ -1,4 +1,5 @@
 import os
+import time
 import logging
 import smtplib
 from email.mime.text import MIMEText
@@ -6,30 +7,141 @@ from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
 
-def send_email_report(subject, body, attachment_path, smtp_config):
-    """Envía un email con el reporte adjunto."""
-    try:
-        logging.info("Enviando reporte por email...")
-        msg = MIMEMultipart()
-        msg["From"] = smtp_config["user"]
-        msg["To"] = ", ".join(smtp_config["recipients"])
-        msg["Subject"] = subject
+from metrics import stage
+
+# Reintentos ante errores transitorios y espera base entre ellos (se duplica en cada intento)
+MAX_RETRIES = 3
+RETRY_BACKOFF = 2
+
+
+def _attach(msg, content, name):
+    part = MIMEBase("application", "octet-stream")
+    part.set_payload(content)
+    encoders.encode_base64(part)
+    part.add_header("Content-Disposition", f"attachment; filename={name}")
+    msg.attach(part)
+
+
+def build_message(subject, body, smtp_config, attachment_path=None, attachment=None, attachment_name=None,
+                  extra_attachments=(), html_body=None):
+    """Arma el email. El adjunto puede indicarse como ruta de archivo o como bytes en memoria.
+    extra_attachments son rutas de archivos adicionales (por ejemplo, el desglose de ciclos en CSV).
+    Con html_body el email lleva ese HTML como cuerpo y body como alternativa en texto plano."""
+    msg = MIMEMultipart()
+    msg["From"] = smtp_config["user"]
+    msg["To"] = ", ".join(smtp_config["recipients"])
+    msg["Subject"] = subject
 
+    if html_body is not None:
+        alternative = MIMEMultipart("alternative")
+        alternative.attach(MIMEText(body, "plain"))
+        alternative.attach(MIMEText(html_body, "html"))
+        msg.attach(alternative)
+    else:
         msg.attach(MIMEText(body, "plain"))
 
-        if attachment_path is not None:
-            if os.path.exists(attachment_path):
-                with open(attachment_path, "rb") as f:
-                    part = MIMEBase("application", "octet-stream")
-                    part.set_payload(f.read())
-                    encoders.encode_base64(part)
-                    part.add_header("Content-Disposition", f"attachment; filename={os.path.basename(attachment_path)}")
-                    msg.attach(part)
-
-        with smtplib.SMTP(smtp_config["server"], smtp_config["port"]) as server:
-            server.starttls()
-            server.login(smtp_config["user"], smtp_config["app_password"])
-            server.send_message(msg)
+    if attachment is None and attachment_path is not None and os.path.exists(attachment_path):
+        with open(attachment_path, "rb") as f:
+            attachment = f.read()
+        attachment_name = attachment_name or os.path.basename(attachment_path)
+
+    if attachment is not None:
+        _attach(msg, attachment, attachment_name)
+
+    for path in extra_attachments:
+        with open(path, "rb") as f:
+            _attach(msg, f.read(), os.path.basename(path))
+
+    return msg
+
+
+def _is_transient(error):
+    """Indica si un error de SMTP amerita reconectar y reintentar (desconexiones, errores de red y respuestas 4xx)."""
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class SmtpMailer:
+    """Sesión SMTP autenticada que se reutiliza para todos los emails de una ejecución.
+    Se conecta al enviar el primer email y reconecta con espera creciente ante errores transitorios."""
+
+    def __init__(self, smtp_config, max_retries=MAX_RETRIES, retry_backoff=RETRY_BACKOFF):
+        self.smtp_config = smtp_config
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.server = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def connect(self):
+        """Abre la conexión, inicia TLS (salvo que starttls sea False) y se autentica si hay contraseña."""
+        logging.info("Conectando con el servidor SMTP...")
+        with stage("smtp_connect"):
+            server = smtplib.SMTP(self.smtp_config["server"], self.smtp_config["port"])
+            try:
+                if self.smtp_config.get("starttls", True):
+                    server.starttls()
+                if self.smtp_config.get("app_password"):
+                    server.login(self.smtp_config["user"], self.smtp_config["app_password"])
+            except Exception:
+                server.close()
+                raise
+        self.server = server
+
+    def close(self):
+        """Cierra la sesión SMTP si está abierta."""
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except smtplib.SMTPException:
+                self.server.close()
+            except OSError:
+                pass
+            self.server = None
+
+    def send(self, subject, body, attachment_path=None, attachment=None, attachment_name=None, extra_attachments=(),
+             html_body=None):
+        """Envía un email por la sesión abierta, reconectando si la conexión se perdió."""
+        msg = build_message(
+            subject, body, self.smtp_config, attachment_path, attachment, attachment_name, extra_attachments, html_body
+        )
+
+        with stage("email", subject=subject) as metrics:
+            metrics["bytes"] = len(msg.as_bytes())
+            for attempt in range(self.max_retries + 1):
+                metrics["attempts"] = attempt + 1
+                try:
+                    if self.server is None:
+                        self.connect()
+                    self.server.send_message(msg)
+                    return
+                except Exception as e:
+                    self.close()
+                    if attempt == self.max_retries or not _is_transient(e):
+                        raise
+                    wait = self.retry_backoff * 2 ** attempt
+                    logging.warning(f"Error transitorio al enviar email ({e}), reintentando en {wait} seg...")
+                    time.sleep(wait)
+
+
+def send_email_report(subject, body, attachment_path, smtp_config, mailer=None, extra_attachments=(), html_body=None):
+    """Envía un email con el reporte adjunto (o, con html_body, con el reporte HTML como cuerpo). Si se indica
+    mailer se reutiliza su sesión SMTP, si no se abre una conexión solo para este email."""
+    try:
+        logging.info("Enviando reporte por email...")
+        options = dict(attachment_path=attachment_path, extra_attachments=extra_attachments, html_body=html_body)
+        if mailer is not None:
+            mailer.send(subject, body, **options)
+        else:
+            with SmtpMailer(smtp_config) as single_mailer:
+                single_mailer.send(subject, body, **options)
 
         logging.info("Reporte enviado con éxito.")
 
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+
+
+class SharedFrame:
+    """Copia las columnas de un DataFrame de eventos (y su índice) a bloques de memoria compartida, para que
+    los procesos del pool lean las filas que necesitan sin que se serialice el DataFrame. Las columnas
+    categóricas se comparten como códigos y sus categorías viajan en layout, que es liviano y serializable.
+    Al terminar se debe llamar a close() (o usarlo como context manager) para liberar los bloques."""
+
+    def __init__(self, df):
+        self.blocks = []
+        self.layout = {"length": len(df), "columns": {}, "index": self._share(df.index.to_numpy())}
+        try:
+            for column in df.columns:
+                values = df[column]
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    self.layout["columns"][column] = {
+                        "codes": self._share(values.cat.codes.to_numpy()),
+                        "categories": list(values.cat.categories),
+                    }
+                elif values.dtype == object:
+                    raise TypeError(f"La columna {column} no tiene un tipo del esquema de eventos")
+                else:
+                    self.layout["columns"][column] = {"values": self._share(values.to_numpy())}
+        except Exception:
+            self.close()
+            raise
+
+    def _share(self, values):
+        """Copia un arreglo a un bloque nuevo y devuelve lo necesario para volver a abrirlo."""
+        shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        self.blocks.append(shm)
+        np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+        return {"name": shm.name, "dtype": values.dtype.str}
+
+    def close(self):
+        for shm in self.blocks:
+            shm.close()
+            shm.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _read_block(block, length, start, stop):
+    """Copia las posiciones [start, stop) de un bloque compartido."""
+    shm = shared_memory.SharedMemory(name=block["name"])
+    try:
+        return np.ndarray(length, dtype=np.dtype(block["dtype"]), buffer=shm.buf)[start:stop].copy()
+    finally:
+        shm.close()
+
+
+def attach_frame(layout, start, stop):
+    """Arma, en el proceso que lo llama, el DataFrame con las filas [start, stop) de un SharedFrame."""
+    length = layout["length"]
+    data = {}
+    for column, spec in layout["columns"].items():
+        if "codes" in spec:
+            data[column] = pd.Categorical.from_codes(_read_block(spec["codes"], length, start, stop), spec["categories"])
+        else:
+            data[column] = _read_block(spec["values"], length, start, stop)
+    return pd.DataFrame(data, index=pd.Index(_read_block(layout["index"], length, start, stop)))
@@ -0,0 +1,119 @@
+"""Imitación local de la API de archivos de Google Drive para las pruebas y el benchmark de descargas.
+
+FakeDriveService responde files().get(...) (metadatos) y files().get_media(...) (contenido, con pedidos
+por rango) a partir de archivos locales, con una latencia simulada por pedido. Se pasa como service a
+download_csv_from_gdrive / download_csv_files, por lo que la descarga se prueba sin red ni credenciales
+(las descargas completas pasan por el MediaIoBaseDownload real).
+"""
+import os
+import time
+import hashlib
+import threading
+from datetime import datetime, timezone
+
+from googleapiclient.errors import HttpError
+
+
+class _Response(dict):
+    """Respuesta HTTP mínima (encabezados en minúscula y status), como la de httplib2."""
+
+    def __init__(self, status, headers):
+        super().__init__(headers)
+        self.status = status
+        self.reason = ""
+
+
+class FakeDriveService:
+    """Cliente falso de Google Drive v3 que sirve archivos locales: {file_id: ruta}. latency son los segundos
+    de espera de cada pedido (simula la red). Registra los pedidos recibidos en requests."""
+
+    def __init__(self, files, latency=0.0):
+        self.files_by_id = files
+        self.latency = latency
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def files(self):
+        return _FakeFiles(self)
+
+    def _log(self, kind, file_id, byte_range=None):
+        with self._lock:
+            self.requests.append((kind, file_id, byte_range))
+        time.sleep(self.latency)
+
+    def metadata(self, file_id):
+        path = self.files_by_id[file_id]
+        md5 = hashlib.md5()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                md5.update(block)
+        modified = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc)
+        return {
+            "md5Checksum": md5.hexdigest(),
+            "modifiedTime": modified.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + "Z",
+            "size": str(os.path.getsize(path)),
+        }
+
+    def content(self, file_id, byte_range=None):
+        """Devuelve (status, encabezados, bytes) para un pedido "bytes=inicio-[fin]" (o el archivo completo)."""
+        path = self.files_by_id[file_id]
+        size = os.path.getsize(path)
+        self._log("get_media", file_id, byte_range)
+        if byte_range is None:
+            with open(path, "rb") as f:
+                return 200, {"content-length": str(size)}, f.read()
+
+        first, _, last = byte_range.split("=", 1)[1].partition("-")
+        start, end = int(first), min(int(last) if last else size - 1, size - 1)
+        if start >= size:
+            return 416, {"content-range": f"bytes */{size}"}, b""
+        with open(path, "rb") as f:
+            f.seek(start)
+            content = f.read(end - start + 1)
+        return 206, {"content-range": f"bytes {start}-{end}/{size}"}, content
+
+
+class _FakeFiles:
+    def __init__(self, service):
+        self.service = service
+
+    def get(self, fileId, fields=None):
+        return _FakeRequest(self.service, fileId, media=False)
+
+    def get_media(self, fileId):
+        return _FakeRequest(self.service, fileId, media=True)
+
+
+class _FakeHttp:
+    """Transporte usado por MediaIoBaseDownload (request.http.request)."""
+
+    def __init__(self, service, file_id):
+        self.service = service
+        self.file_id = file_id
+
+    def request(self, uri, method="GET", headers=None, **kwargs):
+        status, response_headers, content = self.service.content(self.file_id, (headers or {}).get("range"))
+        return _Response(status, response_headers), content
+
+
+class _FakeRequest:
+    def __init__(self, service, file_id, media):
+        self.service = service
+        self.file_id = file_id
+        self.media = media
+        self.uri = f"fake://drive/v3/files/{file_id}" + ("?alt=media" if media else "")
+        self.headers = {}
+        self.http = _FakeHttp(service, file_id)
+
+    def execute(self):
+        if not self.media:
+            self.service._log("get", self.file_id)
+            if self.file_id not in self.service.files_by_id:
+                raise HttpError(_Response(404, {}), b"File not found", uri=self.uri)
+            return self.service.metadata(self.file_id)
+        byte_range = self.headers.get("Range") or self.headers.get("range")
+        status, headers, content = self.service.content(self.file_id, byte_range)
+        if status >= 300:
+            # Como HttpRequest.execute ante una respuesta de error (por ejemplo, 416 fuera de rango)
+            raise HttpError(_Response(status, headers), content, uri=self.uri)
+        return content
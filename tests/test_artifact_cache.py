@@ -0,0 +1,118 @@
+import os
+
+import pandas as pd
+import pytest
+
+import artifact_cache
+from artifact_cache import ArtifactCache
+
+DAY = pd.Timestamp("2025-01-01")
+MACHINES = ["MAQUINA 1"]
+
+
+def _groups(x_values):
+    df = pd.DataFrame({
+        "DATE_TIME": pd.date_range("2025-01-01 08:00", periods=len(x_values), freq="5s"),
+        "X_POS": x_values,
+    })
+    return {(DAY, "MAQUINA 1"): df}
+
+
+def _segments(value):
+    return [["MAQUINA 1", pd.DataFrame({"X_POS": [value]}), pd.DataFrame({"VEL": [value]})]]
+
+
+def _entries(cache_dir):
+    return sorted(
+        key for prefix in os.listdir(cache_dir) if not prefix.startswith("tmp-")
+        for key in os.listdir(os.path.join(cache_dir, prefix))
+    )
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ArtifactCache(str(tmp_path / "cache"))
+
+
+def test_stored_segments_are_reused(cache):
+    key = cache.segments_key(DAY, MACHINES, _groups([1.0, 2.0]))
+    assert cache.load_segments(key) is None
+
+    cache.store_segments(key, _segments(1.0))
+    loaded = cache.load_segments(cache.segments_key(DAY, MACHINES, _groups([1.0, 2.0])))
+    pd.testing.assert_frame_equal(loaded[0][2], _segments(1.0)[0][2])
+
+
+def test_changed_rows_or_code_invalidate_segments(cache, monkeypatch):
+    key = cache.segments_key(DAY, MACHINES, _groups([1.0, 2.0]))
+    cache.store_segments(key, _segments(1.0))
+
+    assert cache.segments_key(DAY, MACHINES, _groups([1.0, 3.0])) != key
+    assert cache.segments_key(DAY, MACHINES + ["MAQUINA 2"], _groups([1.0, 2.0])) != key
+
+    # Un cambio en el código de la segmentación invalida las entradas anteriores
+    monkeypatch.setattr(artifact_cache, "code_version", lambda modules: "otra versión")
+    new_cache = ArtifactCache(cache.cache_dir)
+    assert new_cache.load_segments(new_cache.segments_key(DAY, MACHINES, _groups([1.0, 2.0]))) is None
+
+
+def test_reports_are_keyed_by_segments_and_options(cache, tmp_path):
+    assert cache.report_key(DAY, {"chart_dpi": 200}) is None
+
+    cache.segments_key(DAY, MACHINES, _groups([1.0, 2.0]))
+    key = cache.report_key(DAY, {"chart_dpi": 200})
+    report_file = str(tmp_path / "reporte.pdf")
+    breakdown_file = str(tmp_path / "reporte_desglose.csv")
+    with open(report_file, "wb") as f:
+        f.write(b"%PDF-1.4 reporte")
+    cache.store_report(key, report_file, breakdown_file)
+    os.remove(report_file)
+
+    assert not cache.restore_report(cache.report_key(DAY, {"chart_dpi": 100}), report_file, breakdown_file)
+    assert cache.restore_report(key, report_file, breakdown_file)
+    assert open(report_file, "rb").read() == b"%PDF-1.4 reporte"
+    assert not os.path.exists(breakdown_file)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"), max_mb=1)
+    payload = b"x" * 400 * 1024
+
+    keys = [f"{i:02d}" + "0" * 62 for i in range(3)]
+    for key in keys[:2]:
+        cache._put(key, lambda tmp_dir: open(os.path.join(tmp_dir, "datos"), "wb").write(payload))
+    # La primera entrada se usa de nuevo, por lo que la menos usada pasa a ser la segunda
+    os.utime(cache._entry_dir(keys[0]), (0, 1))
+    os.utime(cache._entry_dir(keys[1]), (0, 0))
+    assert cache._get(keys[0]) is not None
+
+    cache._put(keys[2], lambda tmp_dir: open(os.path.join(tmp_dir, "datos"), "wb").write(payload))
+    assert _entries(cache.cache_dir) == [keys[0], keys[2]]
+
+
+def test_entries_removed_during_eviction_are_skipped(tmp_path, monkeypatch):
+    cache = ArtifactCache(str(tmp_path / "cache"), max_mb=1)
+    key = "ab" + "0" * 62
+    cache._put(key, lambda tmp_dir: open(os.path.join(tmp_dir, "datos"), "wb").write(b"x"))
+
+    # Otro proceso elimina la entrada mientras se recorre el caché
+    getmtime = os.path.getmtime
+
+    def removed(path):
+        if path == cache._entry_dir(key):
+            raise FileNotFoundError(path)
+        return getmtime(path)
+
+    monkeypatch.setattr(artifact_cache.os.path, "getmtime", removed)
+    cache.evict()
+    cache.store_segments(cache.segments_key(DAY, MACHINES, _groups([1.0])), _segments(1.0))
+
+
+def test_eviction_errors_do_not_fail_the_store(cache, monkeypatch):
+    def fail():
+        raise OSError("sin permisos")
+
+    monkeypatch.setattr(cache, "evict", fail)
+    key = cache.segments_key(DAY, MACHINES, _groups([1.0, 2.0]))
+    cache.store_segments(key, _segments(1.0))
+    assert cache.load_segments(key) is not None
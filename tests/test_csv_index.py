@@ -0,0 +1,112 @@
+import os
+
+import pandas as pd
+import pytest
+
+import csv_index
+import process_data
+from csv_index import INDEX_SUFFIX, update_csv_index, read_csv_dates
+from process_data import process_csv_range
+
+HEADER = "DATE_TIME,G-CODE,X_POS,Y_POS,FRO,USER,MACHINE\n"
+DAY_1, DAY_2 = pd.Timestamp("2025-01-01"), pd.Timestamp("2025-01-02")
+
+SAMPLE_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "input_file_example.csv")
+SAMPLE_MACHINES = {"machine_name": ["MAQUINA 1", "MAQUINA 2", "MAQUINA 3"]}
+
+
+def _line(date_time, x):
+    return f"{date_time},a.nc,{x},1,100,u,MAQUINA 1\n"
+
+
+def _append(path, text):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(text)
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "eventos.csv"
+    path.write_text(HEADER + _line("2025-01-01 08:00:00", 1) + _line("2025-01-01 08:00:05", 2), encoding="utf-8")
+    return str(path)
+
+
+def test_appended_lines_extend_the_index(csv_path):
+    index = update_csv_index(csv_path)
+    assert list(index["dates"]) == ["2025-01-01"]
+
+    _append(csv_path, _line("2025-01-01 08:00:10", 3) + _line("2025-01-02 08:00:00", 4))
+    index = update_csv_index(csv_path)
+    assert len(index["dates"]["2025-01-01"]) == 1
+    assert index["size"] == os.path.getsize(csv_path)
+
+    assert read_csv_dates(csv_path, [DAY_1])["X_POS"].tolist() == [1, 2, 3]
+    assert read_csv_dates(csv_path, [DAY_2])["X_POS"].tolist() == [4]
+
+
+def test_partial_trailing_line_is_indexed_when_complete(csv_path):
+    update_csv_index(csv_path)
+    complete_size = os.path.getsize(csv_path)
+
+    line = _line("2025-01-02 08:00:00", 4)
+    _append(csv_path, line[:15])
+    index = update_csv_index(csv_path)
+    assert index["size"] == complete_size
+    assert "2025-01-02" not in index["dates"]
+
+    _append(csv_path, line[15:])
+    assert read_csv_dates(csv_path, [DAY_2])["X_POS"].tolist() == [4]
+
+
+def test_rewritten_csv_rebuilds_the_index(csv_path):
+    update_csv_index(csv_path)
+
+    # Mismo tamaño y más largo que el indexado, con otro contenido
+    with open(csv_path, "w", encoding="utf-8") as f:
+        f.write(HEADER + _line("2025-01-02 08:00:00", 7) + _line("2025-01-02 08:00:05", 8))
+    assert read_csv_dates(csv_path, [DAY_1]).empty
+    assert read_csv_dates(csv_path, [DAY_2])["X_POS"].tolist() == [7, 8]
+
+    with open(csv_path, "w", encoding="utf-8") as f:
+        f.write(HEADER + "".join(_line(f"2025-01-01 09:00:0{i}", 10 + i) for i in range(3)))
+    assert read_csv_dates(csv_path, [DAY_1])["X_POS"].tolist() == [10, 11, 12]
+
+
+@pytest.fixture
+def sample_csv(tmp_path):
+    path = tmp_path / "muestra.csv"
+    path.write_bytes(open(SAMPLE_CSV, "rb").read())
+    return str(path)
+
+
+def _intervals(results):
+    return [(machine, df_intervals) for machine, _, df_intervals in results[DAY_1]]
+
+
+def _assert_same_results(results, expected):
+    assert [machine for machine, _ in _intervals(results)] == [machine for machine, _ in _intervals(expected)]
+    for (_, df), (_, df_expected) in zip(_intervals(results), _intervals(expected)):
+        pd.testing.assert_frame_equal(df, df_expected)
+
+
+def test_chunksize_reads_without_index(sample_csv, monkeypatch):
+    expected = process_csv_range(sample_csv, SAMPLE_MACHINES, [DAY_1], indexed=False)
+
+    # Con chunksize se lee por partes, sin usar (ni crear) el índice
+    monkeypatch.setattr(process_data, "read_csv_dates", None)
+    _assert_same_results(process_csv_range(sample_csv, SAMPLE_MACHINES, [DAY_1], chunksize=500), expected)
+    assert not os.path.exists(sample_csv + INDEX_SUFFIX)
+
+    with pytest.raises(ValueError):
+        process_csv_range(sample_csv, SAMPLE_MACHINES, [DAY_1], chunksize=500, indexed=True)
+
+
+def test_unwritable_index_falls_back_to_plain_read(sample_csv, monkeypatch):
+    expected = process_csv_range(sample_csv, SAMPLE_MACHINES, [DAY_1], indexed=False)
+
+    def read_only(csv_path, index):
+        raise PermissionError("solo lectura")
+
+    monkeypatch.setattr(csv_index, "_write_index", read_only)
+    _assert_same_results(process_csv_range(sample_csv, SAMPLE_MACHINES, [DAY_1]), expected)
+    assert not os.path.exists(sample_csv + INDEX_SUFFIX)
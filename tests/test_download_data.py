@@ -0,0 +1,115 @@
+import os
+
+import pytest
+
+from tests.fake_drive import FakeDriveService
+from googleapiclient.errors import HttpError
+
+from download_data import TAIL_OVERLAP, download_csv_from_gdrive, download_csv_files
+
+REMOTE_ID = "remoto"
+
+
+@pytest.fixture
+def drive(tmp_path):
+    remote_path = tmp_path / "remoto.csv"
+    remote_path.write_bytes(os.urandom(3 * TAIL_OVERLAP))
+    service = FakeDriveService({REMOTE_ID: str(remote_path)})
+    return service, remote_path, str(tmp_path / "local.csv")
+
+
+def _download(service, dest_path):
+    service.requests.clear()
+    return download_csv_from_gdrive(REMOTE_ID, dest_path, None, service=service, chunk_mb=1)
+
+
+def _media_ranges(service):
+    """Rangos pedidos al descargar contenido (None si se pidió el archivo completo)."""
+    return [byte_range for kind, _, byte_range in service.requests if kind == "get_media"]
+
+
+def _same_content(path_a, path_b):
+    with open(path_a, "rb") as a, open(path_b, "rb") as b:
+        return a.read() == b.read()
+
+
+def test_unchanged_remote_skips_download(drive):
+    service, remote_path, dest_path = drive
+    assert _download(service, dest_path) is True
+    assert _same_content(remote_path, dest_path)
+
+    assert _download(service, dest_path) is False
+    assert _media_ranges(service) == []
+
+
+def test_appended_remote_downloads_only_tail(drive):
+    service, remote_path, dest_path = drive
+    _download(service, dest_path)
+    local_size = os.path.getsize(dest_path)
+
+    with open(remote_path, "ab") as f:
+        f.write(b"registros nuevos\n" * 10)
+    assert _download(service, dest_path) is True
+    assert _media_ranges(service) == [f"bytes={local_size - TAIL_OVERLAP}-"]
+    assert _same_content(remote_path, dest_path)
+
+
+def test_md5_mismatch_falls_back_to_full_download(drive):
+    service, remote_path, dest_path = drive
+    _download(service, dest_path)
+    local_size = os.path.getsize(dest_path)
+
+    # Un cambio en el remoto fuera del solapamiento pasa la verificación del rango pero no la del MD5
+    with open(remote_path, "r+b") as f:
+        f.write(b"modificado")
+    with open(remote_path, "ab") as f:
+        f.write(b"registros nuevos\n")
+    assert _download(service, dest_path) is True
+
+    ranges = _media_ranges(service)
+    assert ranges[0] == f"bytes={local_size - TAIL_OVERLAP}-"
+    assert ranges[1].startswith("bytes=0-")
+    assert _same_content(remote_path, dest_path)
+
+
+def test_rewritten_remote_falls_back_to_full_download(drive):
+    service, remote_path, dest_path = drive
+    _download(service, dest_path)
+
+    # El solapamiento no coincide: no se agrega nada al local antes de descargarlo completo
+    remote_path.write_bytes(os.urandom(4 * TAIL_OVERLAP))
+    assert _download(service, dest_path) is True
+    assert len(_media_ranges(service)) == 2
+    assert _same_content(remote_path, dest_path)
+
+
+def test_range_not_satisfiable_falls_back_to_full_download(drive, monkeypatch):
+    service, remote_path, dest_path = drive
+    _download(service, dest_path)
+
+    # Los metadatos indican que el remoto creció, pero al pedir el rango ya fue reemplazado por uno más chico
+    stale = dict(service.metadata(REMOTE_ID), size=str(4 * TAIL_OVERLAP), md5Checksum="anterior")
+    monkeypatch.setattr(service, "metadata", lambda file_id: stale)
+    remote_path.write_bytes(b"DATE_TIME,G-CODE\n")
+
+    assert _download(service, dest_path) is True
+    assert _same_content(remote_path, dest_path)
+
+
+def test_failed_site_does_not_affect_others(tmp_path):
+    files = {}
+    for i in range(3):
+        path = tmp_path / f"remoto_{i}.csv"
+        path.write_bytes(os.urandom(TAIL_OVERLAP))
+        files[f"sitio_{i}"] = str(path)
+    service = FakeDriveService(files)
+
+    downloads = [(file_id, str(tmp_path / f"local_{file_id}.csv")) for file_id in list(files) + ["inexistente"]]
+    results = download_csv_files(downloads, None, max_workers=4, service=service, chunk_mb=1)
+
+    failed = str(tmp_path / "local_inexistente.csv")
+    assert isinstance(results[failed], HttpError)
+    assert not os.path.exists(failed)
+    for file_id, dest_path in downloads[:-1]:
+        assert results[dest_path] is True
+        assert _same_content(files[file_id], dest_path)
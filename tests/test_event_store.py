@@ -0,0 +1,107 @@
+import pandas as pd
+import pytest
+
+import event_store
+from event_store import update_event_store, load_events, read_manifest
+
+HEADER = "DATE_TIME,G-CODE,X_POS,Y_POS,FRO,USER,MACHINE\n"
+MACHINES = ["MAQUINA 1", "MAQUINA 2"]
+DAY = [pd.Timestamp("2025-01-01")]
+
+
+def _append(path, text):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(text)
+
+
+@pytest.fixture
+def paths(tmp_path):
+    csv_path = tmp_path / "eventos.csv"
+    csv_path.write_text(
+        HEADER
+        + "2025-01-01 08:00:00,a.nc,1,1,100,u,MAQUINA 1\n"
+        + "2025-01-01 08:00:05,a.nc,2,1,100,u,MAQUINA 1\n",
+        encoding="utf-8",
+    )
+    return str(csv_path), str(tmp_path / "store")
+
+
+def test_appended_rows_with_same_timestamp_are_ingested(paths):
+    csv_path, store_dir = paths
+    assert update_event_store(csv_path, store_dir) == 2
+
+    # Registro de otra máquina en el mismo segundo que el último ingresado
+    _append(csv_path, "2025-01-01 08:00:05,b.nc,3,3,100,u,MAQUINA 2\n")
+    assert update_event_store(csv_path, store_dir) == 1
+    assert update_event_store(csv_path, store_dir) == 0
+
+    df = load_events(store_dir, DAY, MACHINES)
+    assert len(df) == 3
+    assert (df["MACHINE"] == "MAQUINA 2").sum() == 1
+
+
+def test_reads_only_appended_complete_lines(paths):
+    csv_path, store_dir = paths
+    update_event_store(csv_path, store_dir)
+    offset = read_manifest(store_dir)["offset"]
+
+    # La línea incompleta se incorpora cuando se termina de escribir
+    _append(csv_path, "2025-01-01 08:00:06,b.nc,3,3,100,u,MAQUINA 2\n2025-01-01 08:00:07,b.nc,3")
+    assert update_event_store(csv_path, store_dir) == 1
+    assert read_manifest(store_dir)["offset"] > offset
+    _append(csv_path, ",3,100,u,MAQUINA 2\n")
+    assert update_event_store(csv_path, store_dir) == 1
+    assert len(load_events(store_dir, DAY, MACHINES)) == 4
+
+
+def test_interrupted_ingest_does_not_duplicate_rows(paths, monkeypatch):
+    csv_path, store_dir = paths
+    update_event_store(csv_path, store_dir)
+    _append(csv_path, "2025-01-01 08:00:10,b.nc,3,3,100,u,MAQUINA 2\n")
+
+    # Falla al registrar el avance, con las partes ya escritas
+    write_manifest = event_store._write_manifest
+
+    def fail_on_commit(store_dir, manifest):
+        if "pending" not in manifest:
+            raise OSError("disco lleno")
+        write_manifest(store_dir, manifest)
+
+    monkeypatch.setattr(event_store, "_write_manifest", fail_on_commit)
+    with pytest.raises(OSError):
+        update_event_store(csv_path, store_dir)
+    assert len(load_events(store_dir, DAY, MACHINES)) == 2
+
+    monkeypatch.setattr(event_store, "_write_manifest", write_manifest)
+    assert update_event_store(csv_path, store_dir) == 1
+    assert len(load_events(store_dir, DAY, MACHINES)) == 3
+
+
+def test_replaced_csv_rebuilds_store(paths):
+    csv_path, store_dir = paths
+    update_event_store(csv_path, store_dir)
+
+    with open(csv_path, "w", encoding="utf-8") as f:
+        f.write(HEADER + "2025-01-02 08:00:00,a.nc,1,1,100,u,MAQUINA 1\n")
+    assert update_event_store(csv_path, store_dir) == 1
+    assert load_events(store_dir, DAY, MACHINES).empty
+    assert len(load_events(store_dir, [pd.Timestamp("2025-01-02")], MACHINES)) == 1
+
+
+def test_rewritten_csv_larger_than_ingested_rebuilds_store(paths):
+    csv_path, store_dir = paths
+    update_event_store(csv_path, store_dir)
+
+    # Descarga completa de un remoto reescrito con otro contenido y más registros que el ingresado
+    with open(csv_path, "w", encoding="utf-8") as f:
+        f.write(
+            HEADER
+            + "2025-01-02 09:00:00,bb.nc,10,10,100,u,MAQUINA 2\n"
+            + "2025-01-02 09:00:05,bb.nc,20,10,100,u,MAQUINA 2\n"
+            + "2025-01-02 09:00:10,bb.nc,30,10,100,u,MAQUINA 2\n"
+        )
+    assert update_event_store(csv_path, store_dir) == 3
+    assert load_events(store_dir, DAY, MACHINES).empty
+    df = load_events(store_dir, [pd.Timestamp("2025-01-02")], MACHINES)
+    assert df["X_POS"].tolist() == [10, 20, 30]
+    assert read_manifest(store_dir)["rows"] == 3
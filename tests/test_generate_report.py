@@ -0,0 +1,40 @@
+import pandas as pd
+
+from generate_report import collapse_short_intervals, cycles_table_rows
+
+
+def _intervals(durations, velocities, cycle_ids):
+    starts = pd.Timestamp("2025-01-01 08:00") + pd.to_timedelta(pd.Series(durations).cumsum().shift(fill_value=0), unit="min")
+    return pd.DataFrame({
+        "INTERVAL_START": starts,
+        "INTERVAL_END": starts + pd.to_timedelta(durations, unit="min"),
+        "DURATION": durations,
+        "VEL": velocities,
+        "USER": "u",
+        "G_CODE": "a.nc",
+        "CYCLE_ID": cycle_ids,
+    })
+
+
+def test_short_moving_and_stopped_intervals_are_collapsed():
+    # Tramo corto de movimientos y detenciones alternados entre dos intervalos largos
+    df = _intervals(
+        durations=[10.0, 0.2, 0.1, 0.3, 0.2, 12.0],
+        velocities=[0.0, 3.8, 0.0, -3.8, 0.0, 17.0],
+        cycle_ids=[0, 0, 0, 0, 0, 0],
+    )
+    collapsed = collapse_short_intervals(df, min_duration=1)
+
+    assert collapsed["COLLAPSED"].tolist() == [1, 4, 1]
+    assert collapsed["DURATION"].round(3).tolist() == [10.0, 0.8, 12.0]
+    assert collapsed["INTERVAL_START"].iloc[1] == df["INTERVAL_START"].iloc[1]
+    assert collapsed["INTERVAL_END"].iloc[1] == df["INTERVAL_END"].iloc[4]
+    assert [row[4] for row in cycles_table_rows(collapsed)] == ["DETENIDO", "4 INTERV.", "MOVIMIENTO"]
+
+
+def test_short_intervals_of_different_cycles_are_not_collapsed():
+    df = _intervals(durations=[0.2, 0.3, 0.2], velocities=[3.8, -3.8, 3.8], cycle_ids=[0, 1, 1])
+    collapsed = collapse_short_intervals(df, min_duration=1)
+
+    assert collapsed["COLLAPSED"].tolist() == [1, 2]
+    assert collapsed["CYCLE_ID"].tolist() == [0, 1]
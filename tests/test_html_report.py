@@ -0,0 +1,42 @@
+import pandas as pd
+
+from schema import apply_event_schema
+from process_data import segment_machine_events
+from html_report import render_html_report, render_velocity_svg, velocity_steps
+
+
+def _segment(times, x_pos):
+    df_machine = apply_event_schema(pd.DataFrame({
+        'DATE_TIME': pd.to_datetime(times),
+        'G-CODE': ['A.tap'] * len(times),
+        'X_POS': x_pos,
+        'Y_POS': [0.0] * len(times),
+        'USER': ['U1'] * len(times),
+        'MACHINE': ['MAQUINA 1'] * len(times),
+    }))
+    return segment_machine_events(df_machine)[1]
+
+
+def test_last_interval_without_end_or_velocity():
+    # El último evento sigue a una detención: su intervalo no tiene fin ni velocidad
+    df_intervals = _segment(['2025-01-01 08:00:00', '2025-01-01 08:00:10', '2025-01-01 08:00:20'], [0.0, 0.0, 5.0])
+    assert df_intervals['INTERVAL_END'].isna().iloc[-1] and df_intervals['VEL'].isna().iloc[-1]
+
+    values, first, last = velocity_steps(df_intervals)
+    assert not pd.isna(values).any()
+    assert last > first
+
+    svg = render_velocity_svg(df_intervals)
+    assert "nan" not in svg
+    assert ">0.0 mm/s<" in svg
+
+
+def test_html_report_with_movement():
+    df_intervals = _segment(
+        ['2025-01-01 08:00:00', '2025-01-01 08:00:01', '2025-01-01 08:00:02', '2025-01-01 08:00:30'],
+        [0.0, 10.0, 20.0, 20.0]
+    )
+    report = render_html_report(pd.Timestamp('2025-01-01').date(), [['MAQUINA 1', None, df_intervals]])
+    assert "MAQUINA 1" in report and "<svg" in report
+    assert "nan" not in report.lower()
+    assert render_html_report(pd.Timestamp('2025-01-01').date(), []) is None
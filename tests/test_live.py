@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from live import LiveEngine
+from process_data import EXCLUDED_USERS
+from schema import read_events_csv
+from segmentation import segment_events
+
+SAMPLE_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "input_file_example.csv")
+MACHINES = ["MAQUINA 1", "MAQUINA 2", "MAQUINA 3"]
+HEADER = "DATE_TIME,G-CODE,X_POS,Y_POS,FRO,USER,MACHINE\n"
+
+
+def batch_intervals(csv_path):
+    """Intervalos del día de cada máquina segmentando el archivo completo de una vez."""
+    df = read_events_csv(csv_path)
+    df = df[~df['USER'].isin(EXCLUDED_USERS)]
+    intervals = {}
+    for machine, df_machine in df.groupby('MACHINE', observed=True):
+        last_day = df_machine['DATE_TIME'].max().normalize()
+        df_machine = df_machine[df_machine['DATE_TIME'] >= last_day].sort_values('DATE_TIME', kind='stable')
+        intervals[machine] = segment_events(df_machine)[1]
+    return intervals
+
+
+def assert_same_intervals(live, batch):
+    assert sorted(live) == sorted(batch)
+    for machine, df_batch in batch.items():
+        # Las categorías de cada bloque leído difieren, por lo que se comparan los valores
+        pd.testing.assert_frame_equal(live[machine], df_batch, check_dtype=False, check_categorical=False)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_appended_blocks_match_batch_segmentation(tmp_path, seed):
+    content = open(SAMPLE_CSV, "rb").read()
+    csv_path = str(tmp_path / "eventos.csv")
+
+    # El archivo crece en bloques de tamaño aleatorio, cortados en cualquier byte (también a mitad de línea
+    # y, en el primer bloque, a mitad del encabezado)
+    rng = np.random.default_rng(seed)
+    cuts = [10] + np.sort(rng.choice(np.arange(100, len(content)), size=15, replace=False)).tolist() + [len(content)]
+    engine = LiveEngine(MACHINES)
+    with open(csv_path, "wb") as f:
+        start = 0
+        for end in cuts:
+            f.write(content[start:end])
+            f.flush()
+            start = end
+            engine.consume_csv(csv_path, block_size=int(rng.integers(5_000, 200_000)))
+
+    assert_same_intervals(engine.intervals(), batch_intervals(csv_path))
+
+
+def test_rewritten_larger_csv_is_read_again(tmp_path):
+    csv_path = str(tmp_path / "eventos.csv")
+    with open(csv_path, "w", encoding="utf-8") as f:
+        f.write(HEADER + "2025-01-01 08:00:00,a.nc,1,1,100,u,MAQUINA 1\n2025-01-01 08:00:05,a.nc,2,1,100,u,MAQUINA 1\n")
+    engine = LiveEngine(MACHINES)
+    assert engine.consume_csv(csv_path) == 2
+
+    # Descarga completa de un remoto reescrito, más largo que lo ya leído
+    with open(csv_path, "w", encoding="utf-8") as f:
+        f.write(HEADER + "".join(f"2025-01-02 09:00:0{i},bb.nc,{10 * i},5,100,u,MAQUINA 2\n" for i in range(4)))
+    assert engine.consume_csv(csv_path) == 4
+    assert list(engine.machines) == ["MAQUINA 2"]
+    assert_same_intervals(engine.intervals(), batch_intervals(csv_path))
@@ -0,0 +1,44 @@
+import os
+import signal
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from metrics import worker_pool
+
+
+def _slow_pid():
+    time.sleep(0.5)
+    return os.getpid()
+
+
+def test_warm_pool_can_be_replaced_after_a_worker_dies():
+    # Los procesos heredan el manejador de SIGTERM del servicio, que solo pide terminar la ejecución en curso
+    previous = signal.signal(signal.SIGTERM, lambda signum, frame: None)
+    try:
+        pool = worker_pool(2, warm=True)
+        # Tareas simultáneas para que se creen los dos procesos, de los cuales muere uno
+        pids = {future.result() for future in [pool.submit(_slow_pid) for _ in range(2)]}
+        assert len(pids) == 2
+        os.kill(pids.pop(), signal.SIGKILL)
+
+        # El pool queda inutilizable en cuanto detecta la muerte del proceso
+        with pytest.raises(BrokenProcessPool):
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline:
+                pool.submit(time.sleep, 0.05).result()
+        # El pool termina los procesos restantes con SIGTERM: si lo ignoraran, el shutdown no volvería nunca
+        shutdown = threading.Thread(target=pool.shutdown, daemon=True)
+        shutdown.start()
+        shutdown.join(10)
+        if shutdown.is_alive():
+            os.kill(pids.pop(), signal.SIGKILL)
+            pytest.fail("El pool no pudo terminar el proceso restante con SIGTERM")
+
+        new_pool = worker_pool(2, warm=True)
+        assert new_pool.submit(int, "3").result() == 3
+        new_pool.shutdown()
+    finally:
+        signal.signal(signal.SIGTERM, previous)
@@ -0,0 +1,257 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from schema import EVENT_COLUMNS, read_events_csv, apply_event_schema
+from segmentation import compact_events, segment_events
+from process_data import segment_machine_events
+from benchmarks.synthetic_data import generate_events, write_events_csv
+
+SAMPLE_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "input_file_example.csv")
+
+
+def reference_segment_events(df_machine):
+    """Copia congelada de la segmentación anterior al motor vectorizado (process_csv, con dos
+    groupby().agg() encadenados), que se usa como referencia para verificar que el resultado no cambió."""
+    # Definir intervalos
+    df_machine['INTERVAL_START'] = df_machine['DATE_TIME']
+    df_machine['INTERVAL_END'] = df_machine['DATE_TIME'].shift(-1)
+    df_machine['DELTA_T'] = (df_machine['INTERVAL_END'] - df_machine['INTERVAL_START']).dt.total_seconds()
+
+    df_machine['X_POS_START'] = df_machine['X_POS']
+    df_machine['Y_POS_START'] = df_machine['Y_POS']
+    df_machine['X_POS_END'] = df_machine['X_POS'].shift(-1)
+    df_machine['Y_POS_END'] = df_machine['Y_POS'].shift(-1)
+
+    df_machine['DELTA_X'] = (df_machine['X_POS_END'] - df_machine['X_POS_START']).round(3)
+    df_machine['DELTA_Y'] = (df_machine['Y_POS_END'] - df_machine['Y_POS_START']).round(3)
+
+    df_machine['X_VEL'] = (df_machine['DELTA_X'] / df_machine['DELTA_T']).round(3)
+    df_machine['Y_VEL'] = (df_machine['DELTA_Y'] / df_machine['DELTA_T']).round(3)
+
+    # Asignar estado según la duración del intervalo y la velocidad
+    df_machine['STATUS'] = np.where(df_machine['DELTA_T'] > 3, 'DETENIDO', 'MOVIMIENTO')
+    df_machine['STATUS'] = np.where((df_machine['X_VEL'] > 50) | (df_machine['X_VEL'] < -50) | (df_machine['Y_VEL'] > 50) | (df_machine['Y_VEL'] < -50), 'DETENIDO', df_machine['STATUS'])
+
+    # Reasignar coordenadas a 0 si el estado es "DETENIDO"
+    df_machine['X_POS_START'] = np.where(df_machine['STATUS'] == 'DETENIDO', 0, df_machine['X_POS_START'])
+    df_machine['Y_POS_START'] = np.where(df_machine['STATUS'] == 'DETENIDO', 0, df_machine['Y_POS_START'])
+    df_machine['X_POS_END'] = np.where(df_machine['STATUS'] == 'DETENIDO', 0, df_machine['X_POS_END'])
+    df_machine['Y_POS_END'] = np.where(df_machine['STATUS'] == 'DETENIDO', 0, df_machine['Y_POS_END'])
+
+    # Crear grupos de intervalos cada vez que el estado cambia
+    df_machine['INTERVAL_GROUP'] = (df_machine['STATUS'] != df_machine['STATUS'].shift()).cumsum()
+
+    # Agrupar intervalos consecutivos con el mismo estado
+    df_intervals = df_machine.groupby('INTERVAL_GROUP').agg({
+        'INTERVAL_START': 'first',
+        'INTERVAL_END': 'last',
+        'STATUS': 'first',
+        'X_POS_START': 'first',
+        'Y_POS_START': 'first',
+        'X_POS_END': 'last',
+        'Y_POS_END': 'last',
+        'G-CODE': lambda x: x.mode()[0] if x.iloc[0] == "No File Loaded." else x.iloc[0],
+        'USER': 'first'
+    }).reset_index(drop=True)
+
+    # Calcular duraciones y velocidades de intervalos agrupados
+    df_intervals['DELTA_T'] = (df_intervals['INTERVAL_END'] - df_intervals['INTERVAL_START']).dt.total_seconds()
+
+    # Reasignar coordenadas a 0 si el intervalo es menor a 10 segundos
+    df_intervals['X_POS_START'] = np.where(df_intervals['DELTA_T'] < 10, 0, df_intervals['X_POS_START'])
+    df_intervals['Y_POS_START'] = np.where(df_intervals['DELTA_T'] < 10, 0, df_intervals['Y_POS_START'])
+    df_intervals['X_POS_END'] = np.where(df_intervals['DELTA_T'] < 10, 0, df_intervals['X_POS_END'])
+    df_intervals['Y_POS_END'] = np.where(df_intervals['DELTA_T'] < 10, 0, df_intervals['Y_POS_END'])
+
+    df_intervals['DELTA_X'] = (df_intervals['X_POS_END'] - df_intervals['X_POS_START']).round(3)
+    df_intervals['DELTA_Y'] = (df_intervals['Y_POS_END'] - df_intervals['Y_POS_START']).round(3)
+
+    df_intervals['X_VEL'] = (df_intervals['DELTA_X'] / df_intervals['DELTA_T']).round(3)
+    df_intervals['Y_VEL'] = (df_intervals['DELTA_Y'] / df_intervals['DELTA_T']).round(3)
+
+    # Reasignar velocidades a 0 si son mayores a 50 mm/seg
+    df_intervals['X_VEL'] = np.where(df_intervals['X_VEL'] > 50, 0, df_intervals['X_VEL'])
+    df_intervals['Y_VEL'] = np.where(df_intervals['Y_VEL'] > 50, 0, df_intervals['Y_VEL'])
+    df_intervals['X_VEL'] = np.where(df_intervals['X_VEL'] < -50, 0, df_intervals['X_VEL'])
+    df_intervals['Y_VEL'] = np.where(df_intervals['Y_VEL'] < -50, 0, df_intervals['Y_VEL'])
+
+    # Determinar dirección de velocidades
+    df_intervals['X_DIR'] = np.sign(df_intervals['X_VEL'])
+    df_intervals['Y_DIR'] = np.sign(df_intervals['Y_VEL'])
+
+    # Calcular velocidad compuesta
+    df_intervals['VEL'] = np.sqrt(df_intervals['X_VEL']**2 + df_intervals['Y_VEL']**2).round(3)
+
+    # Asignar dirección a velocidad compuesta
+    df_intervals['VEL'] = np.where(
+        df_intervals['X_DIR'] != 0,
+        np.sign(df_intervals['X_DIR']) * abs(df_intervals['VEL']),
+        np.sign(df_intervals['Y_DIR']) * abs(df_intervals['VEL'])
+    )
+
+    # Reasignar estado a "DETENIDO" si ambas velocidades son 0
+    df_intervals['STATUS'] = np.where(df_intervals['VEL'] == 0, 'DETENIDO', df_intervals['STATUS'])
+
+    # Reasignar coordenadas a 0 si el estado es "DETENIDO"
+    df_intervals['X_POS_START'] = np.where(df_intervals['STATUS'] == 'DETENIDO', 0, df_intervals['X_POS_START'])
+    df_intervals['Y_POS_START'] = np.where(df_intervals['STATUS'] == 'DETENIDO', 0, df_intervals['Y_POS_START'])
+    df_intervals['X_POS_END'] = np.where(df_intervals['STATUS'] == 'DETENIDO', 0, df_intervals['X_POS_END'])
+    df_intervals['Y_POS_END'] = np.where(df_intervals['STATUS'] == 'DETENIDO', 0, df_intervals['Y_POS_END'])
+
+    # Crear grupos cada vez que el estado cambia
+    df_intervals['INTERVAL_GROUP'] = (df_intervals['STATUS'] != df_intervals['STATUS'].shift()).cumsum()
+
+    # Agrupar intervalos consecutivos con el mismo estado
+    df_intervals = df_intervals.groupby('INTERVAL_GROUP').agg({
+        'INTERVAL_START': 'first',
+        'INTERVAL_END': 'last',
+        'X_POS_START': 'first',
+        'Y_POS_START': 'first',
+        'X_POS_END': 'last',
+        'Y_POS_END': 'last',
+        'VEL': 'mean',
+        'G-CODE': lambda x: x.mode()[0] if x.iloc[0] == "No File Loaded." else x.iloc[0],
+        'USER': 'first'
+    }).reset_index(drop=True)
+
+    # Renombrar la columna G-CODE para evitar conflictos al procesar CSV
+    df_machine = df_machine.rename(columns={"G-CODE": "G_CODE"})
+    df_intervals = df_intervals.rename(columns={"G-CODE": "G_CODE"})
+
+    return df_machine, df_intervals
+
+
+def machine_days(df):
+    """Eventos ordenados y filtrados de cada (fecha, máquina), como los recibe la segmentación."""
+    df = df[~df['USER'].isin(['ADMIN', 'Pc-Corte-1'])]
+    return {
+        key: df_machine.sort_values('DATE_TIME', kind='stable')
+        for key, df_machine in df.groupby([df['DATE_TIME'].dt.date, 'MACHINE'], observed=True, sort=True)
+    }
+
+
+@pytest.fixture(scope="module")
+def sample_days():
+    # La referencia lee el CSV con los tipos por defecto, como el código anterior; el motor actual con el
+    # esquema compacto de schema.py
+    reference = machine_days(pd.read_csv(SAMPLE_CSV, parse_dates=['DATE_TIME']))
+    current = machine_days(read_events_csv(SAMPLE_CSV))
+    assert reference.keys() == current.keys()
+    return reference, current
+
+
+def test_sample_csv_intervals_match_reference(sample_days):
+    reference, current = sample_days
+    for key in reference:
+        _, expected = reference_segment_events(reference[key].copy())
+        _, df_intervals = segment_events(current[key])
+        pd.testing.assert_frame_equal(df_intervals, expected, check_exact=True, obj=str(key))
+
+
+def test_sample_csv_events_match_reference(sample_days):
+    reference, current = sample_days
+    for key in reference:
+        expected, _ = reference_segment_events(reference[key].copy())
+        df_events, _ = segment_events(current[key])
+        columns = [column for column in expected.columns if column not in ['G_CODE', 'USER', 'MACHINE', 'X_POS', 'Y_POS', 'FRO']]
+        pd.testing.assert_frame_equal(df_events[columns], expected[columns], check_exact=True, obj=str(key))
+
+
+def test_synthetic_intervals_match_reference(tmp_path):
+    csv_path = str(tmp_path / "synthetic.csv")
+    write_events_csv(generate_events(n_machines=2, n_days=1, seed=3), csv_path)
+    reference = machine_days(pd.read_csv(csv_path, parse_dates=['DATE_TIME']))
+    current = machine_days(read_events_csv(csv_path))
+    for key in reference:
+        _, expected = reference_segment_events(reference[key].copy())
+        _, df_intervals = segment_events(current[key])
+        pd.testing.assert_frame_equal(df_intervals, expected, check_exact=True, obj=str(key))
+
+
+def assert_compaction_keeps_intervals(days):
+    """Los intervalos de los eventos compactados son exactamente los de los eventos sin compactar.
+    Devuelve la cantidad de registros antes y después de compactar."""
+    rows_in = rows_out = 0
+    for key, df_machine in days.items():
+        _, expected = segment_events(df_machine)
+        compacted = compact_events(df_machine)
+        _, df_intervals = segment_events(compacted)
+        pd.testing.assert_frame_equal(df_intervals, expected, check_exact=True, obj=str(key))
+
+        # La segmentación de process_data compacta antes de segmentar
+        _, df_intervals = segment_machine_events(df_machine)
+        pd.testing.assert_frame_equal(df_intervals, expected, check_exact=True, obj=str(key))
+
+        rows_in += len(df_machine)
+        rows_out += len(compacted)
+    return rows_in, rows_out
+
+
+def test_compaction_keeps_sample_csv_intervals(sample_days):
+    _, current = sample_days
+    assert_compaction_keeps_intervals(current)
+
+
+@pytest.mark.parametrize("idle_interval", [1, 2, 5])
+def test_compaction_keeps_synthetic_intervals(idle_interval):
+    df = apply_event_schema(generate_events(n_machines=2, n_days=1, seed=1, idle_interval=idle_interval)[EVENT_COLUMNS])
+    rows_in, rows_out = assert_compaction_keeps_intervals(machine_days(df))
+    if idle_interval != 2:
+        # Con repeticiones cada 2 segundos, unir dos tramos superaría MAX_MOVE_GAP y cambiaría el estado
+        assert rows_out < rows_in
+
+
+@pytest.mark.parametrize("seed", range(2))
+def test_compaction_keeps_random_intervals(seed):
+    """Jornadas aleatorias cortas con muchas repeticiones, saltos de tiempo alrededor de MAX_MOVE_GAP,
+    códigos G "No File Loaded." (elegidos por moda) y usuarios excluidos."""
+    rng = np.random.default_rng(seed)
+    days = {}
+    for i in range(120):
+        n = int(rng.integers(3, 80))
+        gaps = rng.choice([0, 1, 2, 3, 4, 5, 10, 60], size=n, p=[.15, .2, .15, .1, .1, .1, .1, .1])
+        repeat = rng.random(n) < .6
+        x_pos = rng.choice([0.0, 1.5, 10.0, 500.0, -3.25], size=n)
+        y_pos = rng.choice([0.0, 2.0], size=n)
+        gcodes = rng.choice(['No File Loaded.', 'A.tap', 'B.tap', None], size=n, p=[.3, .3, .3, .1])
+        users = rng.choice(['U1', 'U2', None, 'ADMIN'], size=n, p=[.6, .2, .1, .1])
+        for k in range(1, n):
+            if repeat[k]:
+                x_pos[k], y_pos[k] = x_pos[k - 1], y_pos[k - 1]
+                if rng.random() < .8:
+                    gcodes[k], users[k] = gcodes[k - 1], users[k - 1]
+        gcodes[0] = 'A.tap'
+
+        df = apply_event_schema(pd.DataFrame({
+            'DATE_TIME': pd.Timestamp('2025-01-01 08:00') + pd.to_timedelta(np.cumsum(gaps), unit='s'),
+            'G-CODE': gcodes,
+            'X_POS': x_pos,
+            'Y_POS': y_pos,
+            'USER': users,
+            'MACHINE': 'MAQUINA 1',
+        }))
+        df_machine = df[~df['USER'].isin(['ADMIN', 'Pc-Corte-1'])]
+        if df_machine['G-CODE'].notna().any():
+            days[i] = df_machine
+
+    rows_in, rows_out = assert_compaction_keeps_intervals(days)
+    assert rows_out < rows_in
+
+
+def test_compaction_keeps_mode_of_no_file_loaded_runs():
+    """En una detención que comienza con "No File Loaded." el código G es la moda de sus registros,
+    por lo que quitar un registro repetido cambiaría el resultado (B.tap por A.tap)."""
+    df_machine = apply_event_schema(pd.DataFrame({
+        'DATE_TIME': pd.date_range('2025-01-01 08:00', periods=7, freq='10s'),
+        'G-CODE': ['No File Loaded.', 'B.tap', 'B.tap', 'B.tap', 'A.tap', 'A.tap', 'A.tap'],
+        'X_POS': [0.0, 1.0, 1.0, 1.0, 2.0, 3.0, 4.0],
+        'Y_POS': [0.0] * 7,
+        'USER': ['U1'] * 7,
+        'MACHINE': ['MAQUINA 1'] * 7,
+    }))
+    assert segment_events(df_machine)[1]['G_CODE'].iloc[0] == 'B.tap'
+    assert len(compact_events(df_machine)) == len(df_machine)
+    assert_compaction_keeps_intervals({"no_file_loaded": df_machine})
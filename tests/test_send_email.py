@@ -0,0 +1,125 @@
+import smtplib
+import threading
+import socketserver
+
+import pytest
+
+from send_email import SmtpMailer
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    """Diálogo SMTP mínimo (sin TLS ni autenticación) que guarda los mensajes recibidos en el servidor."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 localhost SMTP de prueba")
+        while line := self.rfile.readline():
+            command = line.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 localhost")
+            elif command.startswith("MAIL"):
+                if server.transient_failures:
+                    server.transient_failures -= 1
+                    self.reply("451 Error temporal")
+                else:
+                    self.reply("250 OK")
+            elif command.startswith("RCPT"):
+                self.reply("550 Destinatario rechazado" if server.reject_recipients else "250 OK")
+            elif command == "DATA":
+                self.reply("354 Fin con <CRLF>.<CRLF>")
+                data = b""
+                while (line := self.rfile.readline()) not in (b".\r\n", b""):
+                    data += line
+                with server.lock:
+                    server.messages.append(data)
+                self.reply("250 OK")
+                if server.close_after_message:
+                    # El servidor cierra la sesión inactiva (como los que limitan su duración)
+                    return
+            elif command == "RSET" or command == "NOOP":
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Adiós")
+                return
+            else:
+                self.reply("502 Comando no implementado")
+
+
+class _SmtpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SmtpHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = []
+        self.transient_failures = 0
+        self.reject_recipients = False
+        self.close_after_message = False
+
+
+@pytest.fixture
+def smtp_server():
+    server = _SmtpServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def mailer(smtp_server):
+    config = {
+        "server": "127.0.0.1",
+        "port": smtp_server.server_address[1],
+        "user": "reportes@example.com",
+        "recipients": ["destino@example.com"],
+        "starttls": False,
+    }
+    with SmtpMailer(config, retry_backoff=0) as mailer:
+        yield mailer
+
+
+def test_session_is_reused_for_all_emails(smtp_server, mailer):
+    for i in range(3):
+        mailer.send(f"Reporte {i}", "cuerpo")
+    assert smtp_server.connections == 1
+    assert len(smtp_server.messages) == 3
+
+
+def test_reconnects_after_server_disconnect(smtp_server, mailer):
+    smtp_server.close_after_message = True
+    mailer.send("Reporte 1", "cuerpo")
+    mailer.send("Reporte 2", "cuerpo")
+    assert smtp_server.connections == 2
+    assert len(smtp_server.messages) == 2
+
+
+def test_retries_transient_errors(smtp_server, mailer):
+    smtp_server.transient_failures = 2
+    mailer.send("Reporte", "cuerpo")
+    assert smtp_server.connections == 3
+    assert len(smtp_server.messages) == 1
+
+
+def test_gives_up_after_max_retries(smtp_server, mailer):
+    smtp_server.transient_failures = mailer.max_retries + 1
+    with pytest.raises(smtplib.SMTPSenderRefused):
+        mailer.send("Reporte", "cuerpo")
+    assert smtp_server.connections == mailer.max_retries + 1
+    assert smtp_server.messages == []
+
+
+def test_permanent_errors_are_not_retried(smtp_server, mailer):
+    smtp_server.reject_recipients = True
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        mailer.send("Reporte", "cuerpo")
+    assert smtp_server.connections == 1
+    assert smtp_server.messages == []